@@ -2,65 +2,74 @@
 """
 Aplicación Streamlit para detección de landmarks faciales.
 """
+import math
+
 import streamlit as st
-from PIL import Image
-import cv2
-import numpy as np
-import av
-from streamlit_webrtc import webrtc_streamer, VideoTransformerBase, RTCConfiguration
-import mediapipe as mp
-
-# Lazy imports to avoid initialization issues
-def get_detector():
-    from src.detector import FaceLandmarkDetector
-    return FaceLandmarkDetector()
+
+# Lazy imports: mediapipe, OpenCV y WebRTC se cargan solo cuando el modo
+# elegido los necesita, no en cada arranque ni en cada rerun.
+# Con cache_resource, los recursos sobreviven a los reruns y se comparten
+# entre sesiones.
+def get_detector_pool(max_faces=None):
+    # Sin cache_resource: src.detector ya comparte los pools y retira los
+    # que deja de usar; así cada rerun obtiene el pool vigente
+    from src.detector import get_detector_pool
+    with st.spinner("Cargando el detector..."):
+        return get_detector_pool(max_faces=max_faces)
+
+@st.cache_resource
+def get_landmark_cache(max_faces=None):
+    from src.cache import get_landmark_cache
+    return get_landmark_cache(max_faces=max_faces)
+
+def get_vector_overlay():
+    from src.config import VECTOR_OVERLAY
+    return VECTOR_OVERLAY
+
+def get_webrtc():
+    from streamlit_webrtc import webrtc_streamer, RTCConfiguration
+    return webrtc_streamer, RTCConfiguration
 
 def get_utils():
-    from src.utils import pil_to_cv2, cv2_to_pil, resize_image
-    return pil_to_cv2, cv2_to_pil, resize_image
+    from src.utils import load_image
+    return load_image
+
+@st.cache_resource(show_spinner="Iniciando los procesos de inferencia...")
+def get_serving_pool():
+    from src.serving import get_serving_pool
+    pool = get_serving_pool()
+    pool.wait_ready(timeout=60)
+    return pool
+
+@st.cache_resource(show_spinner="Midiendo el rendimiento del equipo...")
+def get_profile_costs():
+    from src.profiles import benchmark_profiles
+    return benchmark_profiles()
+
+def get_transformer_factory():
+    from src.config import SERVING_SHARED_POOL
+    from src.profiles import ProfileTuner
+    from src.realtime import FaceMeshTransformer
+    if SERVING_SHARED_POOL:
+        # Todas las sesiones comparten los mismos procesos, con una configuración
+        # fija: los perfiles no se aplican y no hay ajuste automático
+        pool = get_serving_pool()
+        return lambda: FaceMeshTransformer(pool=pool)
+    # El benchmark corre una vez por proceso; cada sesión ajusta su propio perfil
+    costos = get_profile_costs()
+    return lambda: FaceMeshTransformer(tuner=ProfileTuner(costos))
+
+def get_metrics():
+    from src import metrics
+    return metrics
 
 def get_config():
     from src.config import TOTAL_LANDMARKS
     return TOTAL_LANDMARKS
 
-
-# Configuración de MediaPipe para la detección en tiempo real
-mp_face_mesh = mp.solutions.face_mesh
-mp_drawing = mp.solutions.drawing_utils
-drawing_spec = mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1)  # Puntos verdes
-
-
-class FaceMeshTransformer(VideoTransformerBase):
-    def __init__(self):
-        # Inicializa FaceMesh DENTRO de la clase
-        self.face_mesh = mp_face_mesh.FaceMesh(
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-
-    def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
-        # Convierte el cuadro de video a un array de numpy
-        image = frame.to_ndarray(format="bgr24")
-
-        # Procesa la imagen con MediaPipe
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(image_rgb)
-
-        # Dibuja los landmarks si se detecta una cara
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                mp_drawing.draw_landmarks(
-                    image=image,
-                    landmark_list=face_landmarks,
-                    connections=mp_face_mesh.FACEMESH_TESSELATION,
-                    landmark_drawing_spec=drawing_spec,
-                    connection_drawing_spec=drawing_spec
-                )
-
-        # Devuelve el cuadro procesado
-        return av.VideoFrame.from_ndarray(image, format="bgr24")
+def get_max_faces_limit():
+    from src.config import MAX_FACES_LIMIT
+    return MAX_FACES_LIMIT
 
 
 # Configuración de la página
@@ -190,6 +199,17 @@ st.markdown("""
         padding: 20px;
     }
 
+    /* Overlay vectorial: el SVG transparente se apila sobre la imagen original */
+    .st-key-overlay_vectorial {
+        position: relative;
+    }
+    .st-key-overlay_vectorial > div:last-child {
+        position: absolute;
+        top: 0;
+        left: 0;
+        pointer-events: none;
+    }
+
     /* Nombre de desarrolladora en violeta */
     .developer-name {
         color: #764ba2;
@@ -233,6 +253,27 @@ with st.sidebar:
         🏥 **Medicina:** análisis anatómico
         """)
 
+    # Diagnóstico: tiempos por etapa de la detección (compartidos por el proceso)
+    with st.expander("🩺 Diagnóstico", expanded=False):
+        metrics = get_metrics()
+        medir = st.toggle("Medir etapas de la detección", value=metrics.enabled())
+        metrics.enable(medir)
+        resumen = metrics.REGISTRY.summary()
+        if resumen:
+            st.dataframe(
+                [{"etapa": etapa, **{k: round(v, 2) for k, v in valores.items()}}
+                 for etapa, valores in resumen.items()],
+                hide_index=True
+            )
+            st.download_button(
+                "Exportar (Prometheus)",
+                metrics.REGISTRY.prometheus_text(),
+                file_name="metrics.txt",
+                mime="text/plain"
+            )
+        elif medir:
+            st.caption("Todavía no hay mediciones: procesá una imagen.")
+
     if modo == "Cámara en tiempo real":
         with st.expander("📹 Consejos para la Cámara", expanded=True):
             st.markdown("""
@@ -255,6 +296,26 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 if modo == "Subir imagen":
+    # Cantidad máxima de rostros: con varios, se detecta primero a baja
+    # resolución y la malla corre solo sobre cada cara
+    max_rostros = st.slider(
+        "👥 Rostros máximos a detectar",
+        min_value=1,
+        max_value=get_max_faces_limit(),
+        value=1,
+        help="Subí este valor para fotos grupales"
+    )
+
+    # Con el overlay vectorial, el navegador dibuja las capas elegidas sobre
+    # la imagen original: cambiarlas no repite la detección ni recodifica
+    vectorial = get_vector_overlay()
+    if vectorial:
+        capas = st.multiselect(
+            "🧩 Capas del overlay",
+            ["puntos", "teselacion", "contornos", "iris"],
+            default=["puntos"]
+        )
+
     # Uploader de imagen con control de errores
     uploaded_file = st.file_uploader(
         "Subí una imagen con un rostro",
@@ -265,31 +326,30 @@ if modo == "Subir imagen":
     if uploaded_file is not None:
         # Control de errores: manejo de archivos inválidos
         try:
-            # Cargar imagen
-            imagen_original = Image.open(uploaded_file)
-
-            # Convertir a formato OpenCV
-            pil_to_cv2, cv2_to_pil, resize_image = get_utils()
-            imagen_cv2 = pil_to_cv2(imagen_original)
-
-            # Redimensionar si es muy grande
-            imagen_cv2 = resize_image(imagen_cv2, max_width=800)
+            # Cargar imagen directamente a 800 px de ancho (las fotos grandes se
+            # decodifican a escala reducida) y en RGB, el orden que usan
+            # MediaPipe y st.image: no hace falta pasar por BGR ni volver a PIL
+            load_image = get_utils()
+            imagen_rgb = load_image(uploaded_file, max_width=800)
 
             # Columnas para mostrar antes/después con mejor diseño
             col1, col2 = st.columns([1, 1], gap="large")
 
             with col1:
                 st.markdown("### 📸 Imagen Original")
-                st.image(cv2_to_pil(imagen_cv2), caption="Imagen subida por el usuario")
+                # st.image codifica la imagen en el momento: después se puede dibujar encima
+                st.image(imagen_rgb, caption="Imagen subida por el usuario")
 
             # Detectar landmarks con mejor feedback
             with st.spinner("🔍 Analizando imagen y detectando landmarks..."):
                 try:
-                    detector = get_detector()
-                    pil_to_cv2, cv2_to_pil, resize_image = get_utils()
                     TOTAL_LANDMARKS = get_config()
-                    imagen_procesada, landmarks, info = detector.detect(imagen_cv2)
-                    detector.close()
+                    # Las imágenes repetidas se resuelven desde la caché; si no,
+                    # se usa un detector precalentado y compartido entre sesiones.
+                    # El overlay se dibuja en el mismo buffer (sin copia).
+                    imagen_procesada, landmarks, info = get_landmark_cache(max_rostros).detect(
+                        imagen_rgb, get_detector_pool(max_faces=max_rostros),
+                        draw=not vectorial, input_format="rgb", in_place=True)
                 except Exception as e:
                     st.error(f"Error en la detección: {str(e)}")
                     st.stop()
@@ -304,7 +364,19 @@ if modo == "Subir imagen":
 
         with col2:
             st.markdown("### 🎯 Landmarks Detectados")
-            st.image(cv2_to_pil(imagen_procesada), caption="478 puntos faciales detectados")
+            if vectorial:
+                from src.vector import overlay_svg
+                alto, ancho = imagen_rgb.shape[:2]
+                # Solo viaja el overlay: la imagen es el mismo archivo de la
+                # columna original, que el navegador ya tiene
+                svg = overlay_svg(landmarks, ancho, alto,
+                                  layers=[capa for capa in capas if capa != "puntos"],
+                                  points="puntos" in capas)
+                with st.container(key="overlay_vectorial", gap=None):
+                    st.image(imagen_rgb, caption="478 puntos faciales detectados")
+                    st.image(svg)
+            else:
+                st.image(imagen_procesada, caption="478 puntos faciales detectados")
 
         # Mostrar información de detección
         st.divider()
@@ -333,6 +405,19 @@ if modo == "Subir imagen":
                         st.metric(f"{color} Precisión", f"{porcentaje:.1f}%")
                     except:
                         st.metric("📊 Estado", "Completado")
+
+            if info["rostros_detectados"] > 1:
+                with st.expander("👥 Detalle por rostro", expanded=True):
+                    st.dataframe(
+                        [{"rostro": i + 1,
+                          "caja (x0, y0, x1, y1)": tuple(int(v) for v in caja),
+                          "puntaje": None if math.isnan(puntaje) else round(float(puntaje), 2)}
+                         for i, (caja, puntaje) in enumerate(zip(landmarks["cajas"],
+                                                                 landmarks["puntajes"]))],
+                        hide_index=True
+                    )
+                    if "ms_por_rostro" in info:
+                        st.caption(f"⏱️ {info['ms_por_rostro']:.1f} ms por rostro")
         else:
             # ERROR: Mostrar mensaje rojo y sugerencias
             st.error("❌ No se detectó ningún rostro en la imagen. Por favor, sube una imagen diferente.")
@@ -349,15 +434,34 @@ elif modo == "Cámara en tiempo real":
     st.header("📹 Detección en Tiempo Real")
     st.info("Haz clic en 'START'. Tu navegador te pedirá permiso para usar la cámara. Asegúrate de seleccionar la cámara correcta cuando aparezca el selector de dispositivos.")
 
-    webrtc_streamer(
+    webrtc_streamer, RTCConfiguration = get_webrtc()
+    ctx = webrtc_streamer(
         key="face_mesh_detector",
-        video_processor_factory=FaceMeshTransformer,
+        video_processor_factory=get_transformer_factory(),
         media_stream_constraints={"video": True, "audio": False},
         rtc_configuration=RTCConfiguration(
             {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
         )
     )
 
+    # Contadores del procesamiento asíncrono (se actualizan en cada rerun)
+    if ctx.video_processor:
+        with st.expander("⏱️ Rendimiento en vivo"):
+            st.button("Actualizar")
+            estadisticas = ctx.video_processor.stats()
+            if "cuadros_procesados" in estadisticas:
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("Cuadros procesados", estadisticas["cuadros_procesados"])
+                col2.metric("Tasa de descarte", f"{estadisticas['tasa_descarte'] * 100:.1f}%")
+                latencia = estadisticas["latencia_ms_p50"]
+                col3.metric("Latencia p50", f"{latencia:.0f} ms" if latencia else "-")
+                # Cuadros sin cambios que reutilizaron el último resultado
+                reutilizados = estadisticas.get("tasa_reutilizacion")
+                col4.metric("Reutilizados",
+                            f"{reutilizados * 100:.1f}%" if reutilizados is not None else "-")
+            if "perfil" in estadisticas:
+                st.caption(f"🎚️ Perfil de rendimiento: {estadisticas['perfil']}")
+
 else:
     # Mensaje de bienvenida mejorado
     st.markdown("""
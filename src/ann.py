@@ -0,0 +1,603 @@
+"""
+Búsqueda de rostros con geometría o expresión parecida en colecciones grandes.
+
+Cada rostro se convierte en un vector comparable:
+
+1. Se centra, se lleva a escala unitaria (RMS) y se alinea en rotación con
+   una forma de referencia (Kabsch por lotes, ver features.batch_rotation),
+   así la distancia mide forma y expresión, no posición, tamaño ni pose.
+2. Opcionalmente se reduce con PCA a ANN_DIMENSIONS componentes.
+3. Se guarda en un índice IVF: k-means reparte los vectores en listas y
+   cada consulta revisa solo las nprobe listas más cercanas.
+
+El índice admite altas y bajas incrementales y se guarda en un .npz.
+
+Uso:
+    python -m src.ann build caras.flms indice.npz
+    python -m src.ann query indice.npz caras.flms --record 123 -k 10
+    python -m src.ann bench --faces 1000000 --queries 200
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from .config import (
+    ANN_DIMENSIONS, ANN_MAX_LISTS, ANN_NPROBE, ANN_KMEANS_ITERATIONS, ANN_TRAIN_SAMPLE,
+    ANN_BENCHMARK_NPROBE, ANN_MAX_PENDING, TOTAL_LANDMARKS
+)
+from .features import batch_rotation, head_pose
+
+FORMAT_VERSION = 1
+_CHUNK = 8192  # Filas por bloque al calcular distancias a los centroides
+# Del sistema de la imagen (y hacia abajo) a y hacia arriba y z hacia la cámara
+_EJES = np.array([1.0, -1.0, -1.0], dtype=np.float32)
+
+
+def _puntos(landmarks):
+    """Acepta el diccionario de detect() o un array en píxeles (rostros, landmarks, 3)."""
+    if isinstance(landmarks, dict):
+        landmarks = landmarks["pixeles"]
+    return np.asarray(landmarks, dtype=np.float32)
+
+
+def normalize_shapes(points, reference=None):
+    """
+    Quita posición, escala y rotación de un lote de rostros.
+
+    Args:
+        points (numpy.ndarray): Landmarks en píxeles (rostros, landmarks, 3);
+            la escala debe ser igual en x e y, como en landmarks["pixeles"]
+        reference (numpy.ndarray): Forma de referencia centrada y de escala
+            unitaria (landmarks, 3); sin ella, la rotación se estima con
+            features.head_pose
+
+    Returns:
+        numpy.ndarray: float32 (rostros, landmarks * 3)
+    """
+    puntos = _puntos(points) * _EJES
+    puntos -= puntos.mean(axis=1, keepdims=True)
+    escala = np.sqrt((puntos ** 2).sum(axis=2).mean(axis=1))
+    puntos /= np.maximum(escala, np.finfo(np.float32).tiny)[:, None, None]
+
+    if reference is None:
+        _, rotacion = head_pose(points)
+    else:
+        rotacion = batch_rotation(reference, puntos)
+    # R lleva la referencia al rostro: puntos @ R la devuelve al marco de la referencia
+    return np.matmul(puntos, rotacion.astype(np.float32)).reshape(len(puntos), -1)
+
+
+def _distancias(vectores, centroides, normas_centroides):
+    """Distancia al cuadrado a cada centroide, sin el término constante |v|²."""
+    return normas_centroides - 2 * vectores @ centroides.T
+
+
+def _mas_cercano(vectores, centroides):
+    """Índice del centroide más cercano a cada vector, por bloques."""
+    normas = (centroides ** 2).sum(axis=1)
+    return np.concatenate([
+        _distancias(vectores[i:i + _CHUNK], centroides, normas).argmin(axis=1)
+        for i in range(0, len(vectores), _CHUNK)
+    ]) if len(vectores) else np.empty(0, dtype=np.intp)
+
+
+def kmeans(vectors, k, iterations=ANN_KMEANS_ITERATIONS, seed=0):
+    """
+    K-means de Lloyd en NumPy.
+
+    Args:
+        vectors (numpy.ndarray): (n, d) float32
+        k (int): Cantidad de centroides (como mucho n)
+        iterations (int): Iteraciones
+        seed (int): Semilla de la inicialización
+
+    Returns:
+        numpy.ndarray: Centroides (k, d) float32
+    """
+    rng = np.random.default_rng(seed)
+    centroides = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        asignacion = _mas_cercano(vectors, centroides)
+        cantidades = np.bincount(asignacion, minlength=k)
+        sumas = np.stack([np.bincount(asignacion, weights=vectors[:, j], minlength=k)
+                          for j in range(vectors.shape[1])], axis=1)
+        vacios = cantidades == 0
+        centroides[~vacios] = sumas[~vacios] / cantidades[~vacios, None]
+        # Las listas vacías se reubican sobre vectores al azar
+        centroides[vacios] = vectors[rng.choice(len(vectors), int(vacios.sum()))]
+    return centroides.astype(np.float32)
+
+
+class LandmarkIndex:
+    """
+    Índice IVF de rostros normalizados, con altas y bajas incrementales.
+
+    Los vectores se guardan agrupados por lista (disposición CSR): cada
+    consulta junta los de sus nprobe listas y calcula distancias exactas solo
+    sobre ellos. Cada alta se asigna a su lista al llegar y queda aparte,
+    también filtrada por lista en las consultas, hasta juntar max_pending;
+    entonces se intercala con las demás sin reordenar ni reasignar lo ya
+    guardado. Las bajas solo marcan el vector y se descartan al guardar.
+    """
+
+    def __init__(self, dimensions=ANN_DIMENSIONS, lists=None, nprobe=ANN_NPROBE,
+                 max_pending=ANN_MAX_PENDING):
+        """
+        Args:
+            dimensions (int): Componentes PCA a conservar (None = sin reducir)
+            lists (int): Cantidad de listas; por defecto 4 * sqrt(muestra),
+                hasta ANN_MAX_LISTS
+            nprobe (int): Listas revisadas por consulta
+            max_pending (int): Altas que se recorren aparte antes de
+                intercalarlas en sus listas
+        """
+        self.dimensions = dimensions
+        self.lists = lists
+        self.nprobe = nprobe
+        self.max_pending = max_pending
+        self.reference = None
+        self.mean = None
+        self.components = None
+        self.centroids = None
+
+        # Vectores intercalados por lista (CSR), con su lista, norma y marca de baja
+        self._vectores = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._listas = np.empty(0, dtype=np.int32)
+        self._inicios = None
+        self._normas = np.empty(0, dtype=np.float32)
+        self._vivos = np.empty(0, dtype=bool)
+        # Altas todavía no intercaladas, en orden de llegada y con los mismos campos
+        self._pendientes = None
+        self._siguiente_id = 0
+
+    @property
+    def trained(self):
+        """True si ya se ajustaron la referencia y los centroides."""
+        return self.centroids is not None
+
+    def __len__(self):
+        return int(self._vivos.sum()) + int(self._pendientes["vivos"].sum())
+
+    def fit(self, points, iterations=ANN_KMEANS_ITERATIONS, seed=0):
+        """
+        Ajusta la forma de referencia, la PCA y los centroides con una muestra.
+
+        Args:
+            points: Landmarks en píxeles (rostros, landmarks, 3) o diccionario de detect()
+            iterations (int): Iteraciones de k-means
+            seed (int): Semilla de k-means
+
+        Returns:
+            LandmarkIndex: El mismo índice
+        """
+        puntos = _puntos(points)
+        # Primero una alineación aproximada por la pose; su media es la referencia
+        referencia = normalize_shapes(puntos).mean(axis=0).reshape(-1, 3)
+        referencia -= referencia.mean(axis=0)
+        self.reference = referencia / np.sqrt((referencia ** 2).sum(axis=1).mean())
+
+        vectores = normalize_shapes(puntos, self.reference)
+        self.mean = vectores.mean(axis=0)
+        if self.dimensions and self.dimensions < vectores.shape[1]:
+            centrados = vectores - self.mean
+            _, autovectores = np.linalg.eigh(centrados.T @ centrados)
+            # eigh ordena de menor a mayor varianza
+            self.components = np.ascontiguousarray(
+                autovectores[:, ::-1][:, :self.dimensions].T, dtype=np.float32)
+        else:
+            self.components = None
+
+        reducidos = self._proyectar(vectores)
+        listas = self.lists or min(ANN_MAX_LISTS, int(4 * np.sqrt(len(reducidos))))
+        self.centroids = kmeans(reducidos, max(1, min(listas, len(reducidos))),
+                                iterations, seed)
+        self._vectores = np.empty((0, reducidos.shape[1]), dtype=np.float32)
+        self._inicios = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        self._pendientes = self._campos(self._vectores, self._ids)
+        return self
+
+    def _campos(self, vectores, ids):
+        """Agrupa vectores con su lista, norma y marca de alta."""
+        return {
+            "vectores": vectores,
+            "ids": ids,
+            "listas": (_mas_cercano(vectores, self.centroids).astype(np.int32) if len(vectores)
+                       else np.empty(0, dtype=np.int32)),
+            "normas": (vectores ** 2).sum(axis=1),
+            "vivos": np.ones(len(ids), dtype=bool),
+        }
+
+    def _proyectar(self, vectores):
+        if self.components is None:
+            return (vectores - self.mean).astype(np.float32)
+        return (vectores - self.mean) @ self.components.T
+
+    def encode(self, points):
+        """
+        Convierte rostros al espacio del índice (normalizados y reducidos).
+
+        Args:
+            points: Landmarks en píxeles (rostros, landmarks, 3) o diccionario de detect()
+
+        Returns:
+            numpy.ndarray: float32 (rostros, dimensiones)
+        """
+        if not self.trained:
+            raise RuntimeError("El índice no está entrenado: llamar a fit() primero")
+        return self._proyectar(normalize_shapes(points, self.reference))
+
+    def add(self, points, ids=None):
+        """
+        Agrega rostros al índice.
+
+        Args:
+            points: Landmarks en píxeles (rostros, landmarks, 3) o diccionario de detect()
+            ids (array): Identificadores enteros (por defecto, consecutivos)
+
+        Returns:
+            numpy.ndarray: Identificadores asignados
+        """
+        return self.add_vectors(self.encode(points), ids)
+
+    def add_vectors(self, vectors, ids=None):
+        """Agrega vectores ya codificados con encode()."""
+        if ids is None:
+            ids = np.arange(self._siguiente_id, self._siguiente_id + len(vectors))
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids):
+            self._siguiente_id = max(self._siguiente_id, int(ids.max()) + 1)
+            # Solo las altas nuevas se asignan a su lista
+            nuevos = self._campos(np.asarray(vectors, dtype=np.float32), ids)
+            self._pendientes = {campo: np.concatenate([self._pendientes[campo], valores])
+                                for campo, valores in nuevos.items()}
+            if len(self._pendientes["ids"]) >= self.max_pending:
+                self._incorporar()
+        return ids
+
+    def remove(self, ids):
+        """
+        Da de baja rostros por identificador.
+
+        Los vectores quedan marcados y se ignoran en las consultas; se
+        descartan del todo al intercalar las altas o al guardar.
+
+        Returns:
+            int: Cantidad de rostros eliminados
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        eliminados = 0
+        for campos in (self._pendientes, {"ids": self._ids, "vivos": self._vivos}):
+            baja = np.isin(campos["ids"], ids) & campos["vivos"]
+            campos["vivos"][baja] = False
+            eliminados += int(baja.sum())
+        return eliminados
+
+    def _incorporar(self):
+        """
+        Intercala las altas pendientes en sus listas y descarta las bajas.
+
+        Lo ya guardado no se reasigna ni se reordena: cada vector se corre
+        tantos lugares como altas caen en las listas anteriores a la suya.
+        """
+        pendientes = self._pendientes
+        if not len(pendientes["ids"]) and self._vivos.all():
+            return
+        guardados = {"vectores": self._vectores, "ids": self._ids, "listas": self._listas,
+                     "normas": self._normas}
+        if not self._vivos.all():
+            guardados = {campo: valores[self._vivos] for campo, valores in guardados.items()}
+        vivos = pendientes["vivos"]
+        orden = np.argsort(pendientes["listas"][vivos], kind="stable")
+        nuevos = {campo: pendientes[campo][vivos][orden] for campo in guardados}
+
+        listas = len(self.centroids)
+        previos = np.bincount(guardados["listas"], minlength=listas)
+        agregados = np.bincount(nuevos["listas"], minlength=listas)
+        inicios = np.zeros(listas + 1, dtype=np.int64)
+        np.cumsum(previos + agregados, out=inicios[1:])
+        inicios_previos = np.concatenate([[0], np.cumsum(previos)])
+        inicios_agregados = np.concatenate([[0], np.cumsum(agregados)])
+
+        # Destino de cada vector: inicio de su lista + su posición dentro de ella
+        destino_previos = (np.arange(len(guardados["ids"]))
+                           + np.repeat(inicios[:-1] - inicios_previos[:-1], previos))
+        destino_nuevos = (np.arange(len(nuevos["ids"]))
+                          + np.repeat(inicios[:-1] + previos - inicios_agregados[:-1], agregados))
+        total = int(inicios[-1])
+        for campo, anteriores in guardados.items():
+            combinado = np.empty((total, *anteriores.shape[1:]), dtype=anteriores.dtype)
+            combinado[destino_previos] = anteriores
+            combinado[destino_nuevos] = nuevos[campo]
+            setattr(self, f"_{campo}", combinado)
+        self._inicios = inicios
+        self._vivos = np.ones(total, dtype=bool)
+        self._pendientes = self._campos(self._vectores[:0], self._ids[:0])
+
+    def search(self, points, k=10, nprobe=None):
+        """
+        Busca los k rostros más parecidos a cada consulta.
+
+        Args:
+            points: Landmarks en píxeles (rostros, landmarks, 3) o diccionario de detect()
+            k (int): Vecinos por consulta
+            nprobe (int): Listas a revisar (por defecto, self.nprobe)
+
+        Returns:
+            tuple: (ids (consultas, k) int64, distancias al cuadrado
+                (consultas, k) float32), de la más cercana a la más lejana;
+                se completa con -1 e inf si hay menos de k candidatos
+        """
+        return self.search_vectors(self.encode(points), k, nprobe)
+
+    def search_vectors(self, vectors, k=10, nprobe=None):
+        """Como search(), sobre vectores ya codificados con encode()."""
+        consultas = np.asarray(vectors, dtype=np.float32)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        cercanas = np.argpartition(
+            _distancias(consultas, self.centroids, (self.centroids ** 2).sum(axis=1)),
+            nprobe - 1, axis=1)[:, :nprobe]
+        pendientes = self._pendientes
+
+        ids = np.full((len(consultas), k), -1, dtype=np.int64)
+        distancias = np.full((len(consultas), k), np.inf, dtype=np.float32)
+        for fila, (consulta, listas) in enumerate(zip(consultas, cercanas)):
+            candidatos = np.concatenate([np.arange(self._inicios[l], self._inicios[l + 1])
+                                         for l in listas])
+            candidatos = candidatos[self._vivos[candidatos]]
+            d = self._normas[candidatos] - 2 * self._vectores[candidatos] @ consulta
+            encontrados = self._ids[candidatos]
+            if len(pendientes["ids"]):
+                extra = np.flatnonzero(np.isin(pendientes["listas"], listas)
+                                       & pendientes["vivos"])
+                d = np.concatenate(
+                    [d, pendientes["normas"][extra] - 2 * pendientes["vectores"][extra] @ consulta])
+                encontrados = np.concatenate([encontrados, pendientes["ids"][extra]])
+            if not len(d):
+                continue
+            mejores = np.argpartition(d, min(k, len(d)) - 1)[:k]
+            mejores = mejores[np.argsort(d[mejores])]
+            ids[fila, :len(mejores)] = encontrados[mejores]
+            distancias[fila, :len(mejores)] = np.maximum(d[mejores] + consulta @ consulta, 0)
+        return ids, distancias
+
+    def exact_search(self, vectors, k=10):
+        """
+        Búsqueda exhaustiva sobre todos los vectores (referencia para medir recall).
+
+        Returns:
+            numpy.ndarray: ids (consultas, k) int64, del más cercano al más
+                lejano; se completa con -1 si hay menos de k rostros
+        """
+        pendientes = self._pendientes
+        vectores = np.concatenate([self._vectores, pendientes["vectores"]])
+        todos = np.concatenate([self._ids, pendientes["ids"]])
+        consultas = np.asarray(vectors, dtype=np.float32)
+        d = (np.concatenate([self._normas, pendientes["normas"]])[None, :]
+             - 2 * consultas @ vectores.T)
+        d[:, ~np.concatenate([self._vivos, pendientes["vivos"]])] = np.inf
+
+        ids = np.full((len(consultas), k), -1, dtype=np.int64)
+        cantidad = min(k, len(todos))
+        if not cantidad:
+            return ids
+        mejores = np.argpartition(d, cantidad - 1, axis=1)[:, :cantidad]
+        mejores = np.take_along_axis(
+            mejores, np.take_along_axis(d, mejores, axis=1).argsort(axis=1), axis=1)
+        ids[:, :cantidad] = np.where(np.isinf(np.take_along_axis(d, mejores, axis=1)),
+                                     -1, todos[mejores])
+        return ids
+
+    def save(self, path):
+        """
+        Guarda el índice en un archivo .npz.
+
+        Args:
+            path (str): Ruta de destino (numpy agrega .npz si falta)
+        """
+        if not self.trained:
+            raise RuntimeError("No se puede guardar un índice sin entrenar")
+        self._incorporar()
+        opcionales = {} if self.components is None else {"components": self.components}
+        np.savez(path, version=FORMAT_VERSION, nprobe=self.nprobe,
+                 dimensions=self.dimensions or 0, reference=self.reference, mean=self.mean,
+                 centroids=self.centroids, vectores=self._vectores, ids=self._ids,
+                 inicios=self._inicios, siguiente_id=self._siguiente_id, **opcionales)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Carga un índice guardado con save().
+
+        Returns:
+            LandmarkIndex: Índice listo para consultas y nuevas altas
+        """
+        with np.load(path) as datos:
+            if int(datos["version"]) != FORMAT_VERSION:
+                raise ValueError(f"Versión de índice no soportada: {int(datos['version'])}")
+            indice = cls(int(datos["dimensions"]) or None, nprobe=int(datos["nprobe"]))
+            indice.reference = datos["reference"]
+            indice.mean = datos["mean"]
+            indice.components = datos["components"] if "components" in datos else None
+            indice.centroids = datos["centroids"]
+            indice.lists = len(indice.centroids)
+            indice._vectores = datos["vectores"]
+            indice._ids = datos["ids"]
+            indice._inicios = datos["inicios"]
+            indice._siguiente_id = int(datos["siguiente_id"])
+        indice._normas = (indice._vectores ** 2).sum(axis=1)
+        indice._listas = np.repeat(np.arange(len(indice.centroids), dtype=np.int32),
+                                   np.diff(indice._inicios))
+        indice._vivos = np.ones(len(indice._ids), dtype=bool)
+        indice._pendientes = indice._campos(indice._vectores[:0], indice._ids[:0])
+        return indice
+
+
+def synthetic_faces(count, seed=0, landmarks=TOTAL_LANDMARKS, modes=16, clusters=256):
+    """
+    Genera rostros sintéticos con pose, escala y posición al azar.
+
+    Las formas salen de una base fija más combinaciones de modos de
+    deformación agrupadas en clusters (como expresiones), así los vecinos
+    más cercanos son significativos.
+
+    Args:
+        count (int): Cantidad de rostros
+        seed (int): Semilla de los rostros (la base y los modos son fijos)
+
+    Returns:
+        numpy.ndarray: float32 (count, landmarks, 3) en píxeles
+    """
+    fijo = np.random.default_rng(1234)
+    angulos = fijo.uniform([0.3, -np.pi], [np.pi - 0.3, np.pi], (landmarks, 2))
+    base = np.stack([0.7 * np.sin(angulos[:, 0]) * np.sin(angulos[:, 1]),
+                     np.cos(angulos[:, 0]),
+                     0.5 * np.sin(angulos[:, 0]) * np.cos(angulos[:, 1])], axis=1)
+    modos = fijo.normal(0, 0.04, (modes, landmarks, 3))
+    centros = fijo.normal(0, 1, (clusters, modes))
+
+    rng = np.random.default_rng(seed)
+    coeficientes = centros[rng.integers(0, clusters, count)] + rng.normal(0, 0.3, (count, modes))
+    formas = base + np.einsum("nm,mpk->npk", coeficientes, modos)
+    formas += rng.normal(0, 0.002, formas.shape)
+
+    yaw, pitch, roll = np.radians(rng.uniform(-25, 25, (3, count)))
+    cy, sy, cp, sp, cr, sr = np.cos(yaw), np.sin(yaw), np.cos(pitch), np.sin(pitch), np.cos(roll), np.sin(roll)
+    uno, cero = np.ones(count), np.zeros(count)
+    rot_y = np.stack([cy, cero, sy, cero, uno, cero, -sy, cero, cy], axis=1).reshape(-1, 3, 3)
+    rot_x = np.stack([uno, cero, cero, cero, cp, -sp, cero, sp, cp], axis=1).reshape(-1, 3, 3)
+    rot_z = np.stack([cr, -sr, cero, sr, cr, cero, cero, cero, uno], axis=1).reshape(-1, 3, 3)
+    rotadas = np.einsum("nij,npj->npi", rot_z @ rot_x @ rot_y, formas)
+
+    escala = rng.uniform(40, 150, count)[:, None, None]
+    desplazamiento = rng.uniform(200, 800, (count, 1, 3)) * np.array([1, 1, 0])
+    return (rotadas * escala * np.array([1, -1, -1]) + desplazamiento).astype(np.float32)
+
+
+def benchmark(faces, queries=200, k=10, nprobes=ANN_BENCHMARK_NPROBE, train=20_000,
+              dimensions=ANN_DIMENSIONS, chunk=50_000):
+    """
+    Mide recall@k y latencia de consulta del índice sobre rostros sintéticos.
+
+    Args:
+        faces (int): Rostros indexados
+        queries (int): Consultas (rostros nuevos de la misma distribución)
+        k (int): Vecinos por consulta
+        nprobes (tuple): Valores de nprobe a comparar
+        train (int): Rostros de la muestra de entrenamiento
+        dimensions (int): Componentes PCA
+        chunk (int): Rostros generados y agregados por bloque
+
+    Returns:
+        dict: Tiempos de construcción y, por nprobe, recall y latencias por consulta
+    """
+    inicio = time.perf_counter()
+    indice = LandmarkIndex(dimensions).fit(synthetic_faces(min(train, faces), seed=1))
+    entrenamiento = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for desde in range(0, faces, chunk):
+        indice.add(synthetic_faces(min(chunk, faces - desde), seed=100 + desde))
+    indice._incorporar()
+    altas = time.perf_counter() - inicio
+
+    consultas = indice.encode(synthetic_faces(queries, seed=2))
+    exactos = indice.exact_search(consultas, k)
+
+    resultados = {"rostros": faces, "listas": len(indice.centroids),
+                  "entrenamiento_s": entrenamiento, "altas_s": altas, "nprobe": {}}
+    for nprobe in nprobes:
+        latencias = []
+        aciertos = 0
+        for consulta, exacto in zip(consultas, exactos):
+            comienzo = time.perf_counter()
+            ids, _ = indice.search_vectors(consulta[None], k, nprobe)
+            latencias.append((time.perf_counter() - comienzo) * 1000)
+            aciertos += len(np.intersect1d(ids[0], exacto))
+        resultados["nprobe"][nprobe] = {
+            "recall": aciertos / (len(consultas) * k),
+            "p50_ms": float(np.percentile(latencias, 50)),
+            "p95_ms": float(np.percentile(latencias, 95)),
+        }
+    return resultados
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Índice de rostros por geometría similar.")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    construir = subcomandos.add_parser("build", help="Indexar los rostros de un almacén")
+    construir.add_argument("store", help="Almacén de landmarks (ver src.store)")
+    construir.add_argument("index", help="Archivo .npz del índice")
+    construir.add_argument("--dimensions", type=int, default=ANN_DIMENSIONS)
+    construir.add_argument("--lists", type=int, default=None)
+    construir.add_argument("--train", type=int, default=ANN_TRAIN_SAMPLE,
+                           help="Rostros de la muestra de entrenamiento")
+
+    consultar = subcomandos.add_parser("query", help="Buscar rostros parecidos a un registro")
+    consultar.add_argument("index", help="Archivo .npz del índice")
+    consultar.add_argument("store", help="Almacén del que sale el rostro de consulta")
+    consultar.add_argument("--record", type=int, required=True, help="Registro de consulta")
+    consultar.add_argument("-k", type=int, default=10)
+    consultar.add_argument("--nprobe", type=int, default=None)
+
+    medir = subcomandos.add_parser("bench", help="Recall y latencia sobre rostros sintéticos")
+    medir.add_argument("--faces", type=int, default=200_000)
+    medir.add_argument("--queries", type=int, default=200)
+    medir.add_argument("-k", type=int, default=10)
+    medir.add_argument("--nprobe", type=int, nargs="+", default=list(ANN_BENCHMARK_NPROBE))
+    medir.add_argument("--dimensions", type=int, default=ANN_DIMENSIONS)
+    medir.add_argument("--train", type=int, default=20_000)
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "bench":
+        resultado = benchmark(args.faces, args.queries, args.k, args.nprobe, args.train,
+                              args.dimensions)
+        print(f"{resultado['rostros']} rostros, {resultado['listas']} listas: entrenamiento "
+              f"{resultado['entrenamiento_s']:.1f} s, altas {resultado['altas_s']:.1f} s")
+        print(f"{'nprobe':>6} {'recall@' + str(args.k):>10} {'p50':>9} {'p95':>9}")
+        for nprobe, valores in resultado["nprobe"].items():
+            print(f"{nprobe:>6} {valores['recall']:10.3f} {valores['p50_ms']:7.2f}ms "
+                  f"{valores['p95_ms']:7.2f}ms")
+        return
+
+    from .store import LandmarkStoreReader
+
+    lector = LandmarkStoreReader(args.store)
+    try:
+        if args.comando == "build":
+            rostros = np.flatnonzero(lector.faces())
+            if not len(rostros):
+                parser.error(f"{args.store} no contiene rostros")
+            rng = np.random.default_rng(0)
+            muestra = np.sort(rng.choice(rostros, min(args.train, len(rostros)), replace=False))
+            indice = LandmarkIndex(args.dimensions, args.lists).fit(lector.landmarks_px(muestra))
+            for desde in range(0, len(rostros), 50_000):
+                bloque = rostros[desde:desde + 50_000]
+                indice.add(lector.landmarks_px(bloque), ids=bloque)
+            indice.save(args.index)
+            print(f"{len(indice)} rostros indexados en {len(indice.centroids)} listas: {args.index}",
+                  file=sys.stderr)
+        else:
+            if not 0 <= args.record < len(lector) or not lector.faces()[args.record]:
+                parser.error(f"El registro {args.record} no existe o no tiene rostro")
+            indice = LandmarkIndex.load(args.index)
+            ids, distancias = indice.search(lector.landmarks_px([args.record]), args.k,
+                                            args.nprobe)
+            nombres = lector.names
+            for registro, distancia in zip(ids[0], distancias[0]):
+                if registro < 0:
+                    break
+                imagen = int(lector.records["imagen"][registro])
+                nombre = nombres[imagen] if imagen < len(nombres) else ""
+                print(f"{registro:>10} {distancia:10.5f}  {nombre}")
+    finally:
+        lector.close()
+
+
+if __name__ == "__main__":
+    main()
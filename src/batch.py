@@ -0,0 +1,409 @@
+"""
+Procesamiento por lotes de imágenes desde la línea de comandos.
+
+Uso:
+    python -m src.batch CARPETA_O_MANIFIESTO --output SALIDA [--workers N]
+
+Cada proceso trabajador mantiene su propio FaceLandmarkDetector. Los
+resultados se escriben en fragmentos .npz dentro de la carpeta de salida,
+por lo que una corrida interrumpida puede retomarse volviendo a ejecutar el
+mismo comando: las imágenes ya guardadas se omiten y las que fallaron se
+vuelven a intentar.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .config import (
+    BATCH_IMAGE_EXTENSIONS, BATCH_SHARD_SIZE, BATCH_QUEUE_PER_WORKER,
+    BATCH_REPORT_INTERVAL, ROI_MIN_FACES
+)
+
+PATRON_FRAGMENTO = "parte-*.npz"
+ARCHIVO_CONSOLIDADO = "landmarks.npz"
+# Columnas con una fila por rostro; las demás (salvo rostro_inicio) tienen una por imagen
+_COLUMNAS_ROSTRO = ("landmarks", "cajas", "puntajes")
+
+# Detector (y caché opcional) propios de cada proceso trabajador
+_detector = None
+_cache = None
+_max_width = None
+
+
+def list_images(source, recursive=False):
+    """
+    Obtiene la lista de imágenes a procesar.
+
+    Args:
+        source (str): Carpeta con imágenes o manifiesto de texto (una ruta por línea)
+        recursive (bool): Si True, recorre también las subcarpetas
+
+    Returns:
+        list: Rutas de imágenes en orden estable
+    """
+    if os.path.isdir(source):
+        rutas = []
+        for raiz, carpetas, archivos in os.walk(source):
+            carpetas.sort()
+            for nombre in sorted(archivos):
+                if os.path.splitext(nombre)[1].lower() in BATCH_IMAGE_EXTENSIONS:
+                    rutas.append(os.path.join(raiz, nombre))
+            if not recursive:
+                break
+        return rutas
+
+    # Manifiesto: las rutas relativas se resuelven desde su carpeta
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as manifiesto:
+        lineas = (linea.strip() for linea in manifiesto)
+        return [
+            linea if os.path.isabs(linea) else os.path.join(base, linea)
+            for linea in lineas if linea and not linea.startswith("#")
+        ]
+
+
+def _init_worker(max_width, cache_dir=None, max_faces=None):
+    """Crea el detector del proceso trabajador y, si se pide, su caché."""
+    global _detector, _cache, _max_width
+    from .detector import create_detector
+
+    _detector = create_detector(max_faces)
+    _max_width = max_width
+    if cache_dir:
+        from .cache import LandmarkCache
+        # La capa en disco es compartida por todos los trabajadores
+        _cache = LandmarkCache(disk_dir=cache_dir, config=_detector.config,
+                               backend=_detector.backend)
+
+
+def _process_path(ruta):
+    """
+    Lee una imagen y detecta sus landmarks dentro del proceso trabajador.
+
+    Returns:
+        dict: Ruta, tamaño, landmarks (normalizados, cajas y puntajes por
+            rostro), info y mensaje de error
+    """
+    from .utils import load_image
+
+    resultado = {"ruta": ruta, "ancho": 0, "alto": 0, "landmarks": None,
+                 "info": None, "error": ""}
+
+    try:
+        # Con --max-width, los JPEG se decodifican ya a escala reducida
+        imagen = load_image(ruta, max_width=_max_width)
+    except (OSError, ValueError):
+        resultado["error"] = "No se pudo leer la imagen"
+        return resultado
+
+    try:
+        if _cache is not None:
+            _, landmarks, info = _cache.detect(imagen, _detector, draw=False,
+                                               input_format="rgb")
+        else:
+            _, landmarks, info = _detector.detect(imagen, draw=False, input_format="rgb")
+    except Exception as e:
+        resultado["error"] = str(e)
+        return resultado
+
+    resultado["alto"], resultado["ancho"] = imagen.shape[:2]
+    # Los píxeles se recuperan de los normalizados y el tamaño de la imagen
+    resultado["landmarks"] = {campo: landmarks[campo]
+                              for campo in ("normalizados", "cajas", "puntajes")}
+    resultado["info"] = info
+    return resultado
+
+
+def process_images(paths, workers=None, queue_size=None, ordered=True, max_width=None,
+                   cache_dir=None, max_faces=None):
+    """
+    Procesa imágenes en un pool de procesos con una cola acotada.
+
+    Args:
+        paths (iterable): Rutas de las imágenes
+        workers (int): Cantidad de procesos (por defecto, uno por núcleo)
+        queue_size (int): Máximo de tareas en vuelo (acota la memoria)
+        ordered (bool): Si True, los resultados respetan el orden de entrada
+        max_width (int): Ancho máximo al que se reduce cada imagen (None = original)
+        cache_dir (str): Carpeta de la caché de resultados en disco (None = sin caché)
+        max_faces (int): Rostros máximos por imagen (ver detector.create_detector)
+
+    Yields:
+        dict: Resultado de cada imagen (ver _process_path)
+    """
+    workers = workers or os.cpu_count() or 1
+    queue_size = queue_size or workers * BATCH_QUEUE_PER_WORKER
+    rutas = iter(paths)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(max_width, cache_dir, max_faces)) as pool:
+        if ordered:
+            pendientes = deque()
+            for ruta in rutas:
+                pendientes.append(pool.submit(_process_path, ruta))
+                if len(pendientes) >= queue_size:
+                    yield pendientes.popleft().result()
+            while pendientes:
+                yield pendientes.popleft().result()
+            return
+
+        pendientes = set()
+        for ruta in rutas:
+            pendientes.add(pool.submit(_process_path, ruta))
+            if len(pendientes) >= queue_size:
+                listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    yield futuro.result()
+        for futuro in wait(pendientes).done:
+            yield futuro.result()
+
+
+def _shard_arrays(resultados):
+    """
+    Arma las columnas de un fragmento a partir de una lista de resultados.
+
+    Los landmarks de todos los rostros se concatenan en un único array
+    (rostros, 478, 3), junto con sus cajas (rostros, 4) y puntajes;
+    `rostro_inicio` indica dónde empieza cada imagen.
+    """
+    from .detector import stack_faces
+
+    rostros = stack_faces([r["landmarks"] for r in resultados])
+
+    return {
+        "rutas": np.array([r["ruta"] for r in resultados], dtype=str),
+        "ancho": np.array([r["ancho"] for r in resultados], dtype=np.int32),
+        "alto": np.array([r["alto"] for r in resultados], dtype=np.int32),
+        "rostros_detectados": np.diff(rostros["inicio"]).astype(np.int32),
+        "deteccion_exitosa": np.array(
+            [bool(r["info"] and r["info"]["deteccion_exitosa"]) for r in resultados]),
+        "error": np.array([r["error"] for r in resultados], dtype=str),
+        "rostro_inicio": rostros["inicio"],
+        "landmarks": rostros["normalizados"],
+        "cajas": rostros["cajas"],
+        "puntajes": rostros["puntajes"],
+    }
+
+
+def _write_shard(directorio, indice, resultados):
+    """Escribe un fragmento de forma atómica (archivo temporal + rename)."""
+    destino = os.path.join(directorio, f"parte-{indice:05d}.npz")
+    temporal = destino + ".tmp"
+    with open(temporal, "wb") as archivo:
+        np.savez(archivo, **_shard_arrays(resultados))
+    os.replace(temporal, destino)
+    return destino
+
+
+def completed_paths(directorio):
+    """
+    Lee las rutas ya procesadas en corridas anteriores.
+
+    Las imágenes que terminaron con error no cuentan como procesadas, así
+    la corrida siguiente las vuelve a intentar.
+
+    Args:
+        directorio (str): Carpeta de salida
+
+    Returns:
+        tuple: (conjunto de rutas, índice del próximo fragmento)
+    """
+    hechas = set()
+    fragmentos = sorted(glob.glob(os.path.join(directorio, PATRON_FRAGMENTO)))
+    for fragmento in fragmentos:
+        with np.load(fragmento) as datos:
+            hechas.update(datos["rutas"][datos["error"] == ""].tolist())
+
+    siguiente = 0
+    if fragmentos:
+        ultimo = os.path.basename(fragmentos[-1])
+        siguiente = int(ultimo[len("parte-"):-len(".npz")]) + 1
+    return hechas, siguiente
+
+
+def _encabezado(fragmento, clave):
+    """Tipo y forma de una columna de un fragmento, sin leer sus datos."""
+    with zipfile.ZipFile(fragmento) as archivo, archivo.open(clave + ".npy") as columna:
+        if np.lib.format.read_magic(columna) == (1, 0):
+            forma, _, tipo = np.lib.format.read_array_header_1_0(columna)
+        else:
+            forma, _, tipo = np.lib.format.read_array_header_2_0(columna)
+    return tipo, forma
+
+
+def merge_shards(directorio, destino=None):
+    """
+    Consolida todos los fragmentos en un único archivo .npz columnar.
+
+    Las columnas se escriben de a un fragmento por vez, así la memoria no
+    crece con el tamaño de la colección. Si una imagen aparece en varios
+    fragmentos (un error que se reintentó), queda solo su último resultado.
+
+    Args:
+        directorio (str): Carpeta con los fragmentos
+        destino (str): Archivo de salida (por defecto, landmarks.npz en la carpeta)
+
+    Returns:
+        str: Ruta del archivo consolidado
+    """
+    destino = destino or os.path.join(directorio, ARCHIVO_CONSOLIDADO)
+    fragmentos = sorted(glob.glob(os.path.join(directorio, PATRON_FRAGMENTO)))
+    if not fragmentos:
+        raise FileNotFoundError(f"No hay fragmentos en {directorio}")
+
+    # Primera pasada, solo columnas chicas: qué filas quedan de cada fragmento
+    filas, rostros, conteos = [], [], []
+    vistas = set()
+    for fragmento in reversed(fragmentos):
+        with np.load(fragmento) as datos:
+            rutas = datos["rutas"].tolist()
+            detectados = datos["rostros_detectados"]
+        conservar = np.ones(len(rutas), dtype=bool)
+        for fila in range(len(rutas) - 1, -1, -1):
+            conservar[fila] = rutas[fila] not in vistas
+            vistas.add(rutas[fila])
+        filas.insert(0, conservar)
+        rostros.insert(0, np.repeat(conservar, detectados))
+        conteos.insert(0, detectados[conservar])
+    total_imagenes = sum(int(f.sum()) for f in filas)
+    total_rostros = sum(int(r.sum()) for r in rostros)
+
+    with np.load(fragmentos[0]) as datos:
+        claves = datos.files
+
+    temporal = destino + ".tmp"
+    with zipfile.ZipFile(temporal, "w", zipfile.ZIP_STORED, allowZip64=True) as salida:
+        for clave in claves:
+            if clave == "rostro_inicio":
+                tipo, forma = np.dtype(np.int64), (total_imagenes + 1,)
+            else:
+                encabezados = [_encabezado(fragmento, clave) for fragmento in fragmentos]
+                # Las columnas de texto pueden tener otro ancho en cada fragmento
+                tipo = max((tipo for tipo, _ in encabezados), key=lambda t: t.itemsize)
+                largo = total_rostros if clave in _COLUMNAS_ROSTRO else total_imagenes
+                forma = (largo, *encabezados[0][1][1:])
+
+            with salida.open(clave + ".npy", "w", force_zip64=True) as columna:
+                np.lib.format.write_array_header_1_0(columna, {
+                    "descr": np.lib.format.dtype_to_descr(tipo),
+                    "fortran_order": False, "shape": forma})
+                if clave == "rostro_inicio":
+                    columna.write(np.zeros(1, dtype=tipo).tobytes())
+                    desplazamiento = 0
+                    for conteo in conteos:
+                        columna.write((np.cumsum(conteo, dtype=tipo) + desplazamiento).tobytes())
+                        desplazamiento += int(conteo.sum())
+                    continue
+                for fragmento, conservar_filas, conservar_rostros in zip(fragmentos, filas,
+                                                                         rostros):
+                    with np.load(fragmento) as datos:
+                        valores = datos[clave]
+                    conservar = conservar_rostros if clave in _COLUMNAS_ROSTRO else conservar_filas
+                    columna.write(np.ascontiguousarray(valores[conservar], dtype=tipo).tobytes())
+    os.replace(temporal, destino)
+    return destino
+
+
+def run(source, output, workers=None, queue_size=None, ordered=True,
+        shard_size=BATCH_SHARD_SIZE, max_width=None, recursive=False, merge=True,
+        cache_dir=None, max_faces=None):
+    """
+    Ejecuta un lote completo, retomando desde donde quedó la corrida anterior.
+
+    Returns:
+        dict: Resumen con imágenes procesadas, omitidas, errores y velocidad
+    """
+    os.makedirs(output, exist_ok=True)
+    rutas = list_images(source, recursive=recursive)
+    hechas, indice = completed_paths(output)
+    pendientes = [ruta for ruta in rutas if ruta not in hechas]
+
+    print(f"{len(rutas)} imágenes, {len(rutas) - len(pendientes)} ya procesadas, "
+          f"{len(pendientes)} pendientes", file=sys.stderr)
+
+    inicio = time.perf_counter()
+    ultimo_reporte = inicio
+    buffer = []
+    procesadas = errores = 0
+
+    for resultado in process_images(pendientes, workers, queue_size, ordered, max_width,
+                                    cache_dir, max_faces):
+        buffer.append(resultado)
+        procesadas += 1
+        errores += bool(resultado["error"])
+
+        if len(buffer) >= shard_size:
+            _write_shard(output, indice, buffer)
+            indice += 1
+            buffer = []
+
+        ahora = time.perf_counter()
+        if ahora - ultimo_reporte >= BATCH_REPORT_INTERVAL:
+            print(f"{procesadas}/{len(pendientes)} imágenes "
+                  f"({procesadas / (ahora - inicio):.1f} img/s)", file=sys.stderr)
+            ultimo_reporte = ahora
+
+    if buffer:
+        _write_shard(output, indice, buffer)
+
+    duracion = time.perf_counter() - inicio
+    resumen = {
+        "procesadas": procesadas,
+        "omitidas": len(rutas) - len(pendientes),
+        "errores": errores,
+        "segundos": duracion,
+        "imagenes_por_segundo": procesadas / duracion if duracion > 0 else 0.0,
+    }
+
+    if merge and (procesadas or resumen["omitidas"]):
+        resumen["archivo"] = merge_shards(output)
+
+    print(f"Listo: {procesadas} imágenes en {duracion:.1f} s "
+          f"({resumen['imagenes_por_segundo']:.1f} img/s), {errores} errores",
+          file=sys.stderr)
+    return resumen
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Detecta landmarks faciales en lote sobre una carpeta o manifiesto."
+    )
+    parser.add_argument("source", help="Carpeta de imágenes o manifiesto (una ruta por línea)")
+    parser.add_argument("-o", "--output", required=True, help="Carpeta de salida")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Procesos trabajadores (por defecto, uno por núcleo)")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="Máximo de imágenes en vuelo")
+    parser.add_argument("--unordered", action="store_true",
+                        help="Guardar resultados en orden de finalización")
+    parser.add_argument("--shard-size", type=int, default=BATCH_SHARD_SIZE,
+                        help="Imágenes por fragmento .npz")
+    parser.add_argument("--max-width", type=int, default=None,
+                        help="Reducir las imágenes a este ancho antes de detectar")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="Recorrer subcarpetas")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Caché de resultados en disco para imágenes repetidas")
+    parser.add_argument("--max-faces", type=int, default=None,
+                        help=f"Rostros máximos por imagen (desde {ROI_MIN_FACES}, "
+                             "inferencia en dos etapas)")
+    parser.add_argument("--no-merge", action="store_true",
+                        help="No consolidar los fragmentos al terminar")
+    args = parser.parse_args(argv)
+
+    run(args.source, args.output, workers=args.workers, queue_size=args.queue_size,
+        ordered=not args.unordered, shard_size=args.shard_size,
+        max_width=args.max_width, recursive=args.recursive, merge=not args.no_merge,
+        cache_dir=args.cache_dir, max_faces=args.max_faces)
+
+
+if __name__ == "__main__":
+    main()
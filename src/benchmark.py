@@ -0,0 +1,548 @@
+"""
+Benchmarks reproducibles del camino crítico de detección.
+
+Uso:
+    python -m src.benchmark --output resultados.json
+    python -m src.benchmark --output resultados.json --baseline base.json --threshold 0.15
+    python -m src.benchmark --images muestras/ --save-baseline base.json
+    python -m src.benchmark --backends legacy tasks --resolutions 640x480
+
+Funciona sin red: usa la cara de referencia incluida (assets/rostro.jpg)
+llevada a cada resolución (o, si falta, imágenes sintéticas con semilla fija)
+y, opcionalmente, las imágenes de una carpeta de muestras. Para cada caso informa
+latencias p50/p95/p99, rendimiento y RSS pico, y puede comparar contra una
+línea base guardada para detectar regresiones tras actualizar dependencias.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .config import (
+    BENCHMARK_RESOLUTIONS, BENCHMARK_REPETITIONS, BENCHMARK_WARMUP,
+    BENCHMARK_THRESHOLD, BENCHMARK_MIN_DELTA_MS, BENCHMARK_FACE_COUNTS,
+    TOTAL_LANDMARKS, DETECTOR_BACKENDS, TASKS_BENCHMARK_FRAMES
+)
+from .utils import sample_face
+
+
+def peak_rss_mb():
+    """
+    RSS pico del proceso en MB (None si la plataforma no lo informa).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def synthetic_image(width, height, seed=0):
+    """
+    Genera una imagen BGR determinística (degradado con ruido).
+
+    Args:
+        width (int): Ancho en píxeles
+        height (int): Alto en píxeles
+        seed (int): Semilla del generador
+
+    Returns:
+        numpy.ndarray: Imagen uint8 (alto, ancho, 3)
+    """
+    rng = np.random.default_rng(seed)
+    degradado = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    ruido = rng.normal(0, 20, (height, width, 3)).astype(np.float32)
+    return np.clip(degradado + ruido, 0, 255).astype(np.uint8)
+
+
+def synthetic_landmarks(width, height, faces=1, seed=0):
+    """
+    Landmarks sintéticos en píxeles para medir el dibujo sin depender de un rostro real.
+
+    Returns:
+        numpy.ndarray: float32 (rostros, 478, 3) dentro de la mitad central de la imagen
+    """
+    rng = np.random.default_rng(seed)
+    puntos = rng.random((faces, TOTAL_LANDMARKS, 3), dtype=np.float32)
+    puntos[..., 0] = (0.25 + 0.5 * puntos[..., 0]) * width
+    puntos[..., 1] = (0.25 + 0.5 * puntos[..., 1]) * height
+    puntos[..., 2] = (puntos[..., 2] - 0.5) * 0.1 * width
+    return puntos
+
+
+def measure(funcion, repetitions=BENCHMARK_REPETITIONS, warmup=BENCHMARK_WARMUP):
+    """
+    Mide una función y resume sus latencias.
+
+    Args:
+        funcion (callable): Función sin argumentos a medir
+        repetitions (int): Repeticiones medidas
+        warmup (int): Repeticiones previas descartadas
+
+    Returns:
+        dict: Latencias en ms (p50, p95, p99, media, mínimo), operaciones
+            por segundo, repeticiones y RSS pico en MB
+    """
+    for _ in range(warmup):
+        funcion()
+
+    tiempos = np.empty(repetitions, dtype=np.float64)
+    for i in range(repetitions):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos[i] = time.perf_counter() - inicio
+
+    tiempos_ms = tiempos * 1000
+    p50, p95, p99 = np.percentile(tiempos_ms, [50, 95, 99])
+    media = float(tiempos_ms.mean())
+    return {
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "media_ms": media,
+        "min_ms": float(tiempos_ms.min()),
+        "ops_por_segundo": 1000 / media if media > 0 else None,
+        "repeticiones": repetitions,
+        "rss_pico_mb": peak_rss_mb(),
+    }
+
+
+def measure_allocations(funcion, frame_bytes=None):
+    """
+    Mide la memoria asignada desde Python/NumPy durante una llamada.
+
+    NumPy (y los arrays que crea OpenCV) se registran en tracemalloc, así que
+    el pico refleja los buffers de imagen intermedios. Lo que MediaPipe asigna
+    en C++ no se cuenta.
+
+    Args:
+        funcion (callable): Función sin argumentos a medir
+        frame_bytes (int): Tamaño de un cuadro, para expresar el pico en cuadros
+
+    Returns:
+        dict: Pico en bytes y, si se indicó frame_bytes, en cuadros completos
+    """
+    funcion()  # Calentamiento: cachés e inicializaciones perezosas
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    resultado = {"pico_bytes": pico}
+    if frame_bytes:
+        resultado["pico_cuadros"] = pico / frame_bytes
+    return resultado
+
+
+def default_images(resolutions):
+    """
+    Imágenes por defecto: la cara de referencia llevada a cada resolución.
+
+    Sin cara no se corre la malla y la inferencia parece mucho más barata de
+    lo que es; las imágenes sintéticas quedan solo como respaldo si falta
+    el archivo incluido.
+
+    Args:
+        resolutions (list): Resoluciones (ancho, alto)
+
+    Returns:
+        dict: {nombre: imagen BGR}
+    """
+    imagenes = {}
+    for ancho, alto in resolutions:
+        rostro = sample_face(ancho, alto)
+        if rostro is None:
+            imagenes[f"sintetica_{ancho}x{alto}"] = synthetic_image(ancho, alto)
+        else:
+            imagenes[f"rostro_{ancho}x{alto}"] = rostro
+    return imagenes
+
+
+def load_samples(directorio):
+    """Carga las imágenes de muestra (BGR) de una carpeta, ordenadas por nombre."""
+    muestras = {}
+    for ruta in sorted(glob.glob(os.path.join(directorio, "*"))):
+        imagen = cv2.imread(ruta, cv2.IMREAD_COLOR)
+        if imagen is not None:
+            muestras[os.path.splitext(os.path.basename(ruta))[0]] = imagen
+    return muestras
+
+
+def run_benchmarks(resolutions=BENCHMARK_RESOLUTIONS, samples_dir=None,
+                   repetitions=BENCHMARK_REPETITIONS, warmup=BENCHMARK_WARMUP,
+                   backends=DETECTOR_BACKENDS):
+    """
+    Ejecuta todos los casos del benchmark.
+
+    Args:
+        resolutions (list): Resoluciones (ancho, alto) de la cara de referencia
+        samples_dir (str): Carpeta con imágenes de muestra (opcional)
+        repetitions (int): Repeticiones medidas por caso
+        warmup (int): Repeticiones de calentamiento por caso
+        backends (tuple): Backends de detección a comparar (ver
+            detector.create_detector)
+
+    Returns:
+        dict: {"meta": {...}, "casos": {nombre: métricas},
+            "asignaciones": {nombre: pico de memoria}}
+    """
+    from .detector import FaceLandmarkDetector
+    from .render import OverlayRenderer, draw_points
+    from .utils import pil_to_cv2, pil_to_rgb, cv2_to_pil, resize_image
+
+    casos = {}
+    asignaciones = {}
+
+    def caso(nombre, funcion, reps=repetitions, calentamiento=warmup):
+        casos[nombre] = measure(funcion, reps, calentamiento)
+        print(f"{nombre:<45} p50 {casos[nombre]['p50_ms']:8.2f} ms  "
+              f"p95 {casos[nombre]['p95_ms']:8.2f} ms", file=sys.stderr)
+
+    # La carga del modelo es lenta: menos repeticiones
+    caso("detector_init", lambda: FaceLandmarkDetector().close(),
+         reps=max(3, repetitions // 10), calentamiento=1)
+
+    imagenes = default_images(resolutions)
+    muestras = {}
+    if samples_dir:
+        muestras = {f"muestra_{nombre}": imagen
+                    for nombre, imagen in load_samples(samples_dir).items()}
+        imagenes.update(muestras)
+
+    detector = FaceLandmarkDetector()
+    try:
+        for nombre, bgr in imagenes.items():
+            alto, ancho = bgr.shape[:2]
+            pil = Image.fromarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+
+            caso(f"pil_to_cv2/{nombre}", lambda: pil_to_cv2(pil))
+            caso(f"resize_image/{nombre}", lambda: resize_image(bgr, max_width=800))
+            caso(f"cv2_to_pil/{nombre}", lambda: cv2_to_pil(bgr))
+
+            # Inferencia y dibujo por separado
+            caso(f"detect_inferencia/{nombre}", lambda: detector.detect(bgr, draw=False))
+            _, landmarks, _ = detector.detect(bgr, draw=False)
+            puntos = (landmarks["pixeles"] if len(landmarks["pixeles"])
+                      else synthetic_landmarks(ancho, alto))
+            caso(f"detect_dibujo/{nombre}", lambda: draw_points(bgr.copy(), puntos))
+
+            # Overlay del modo cámara sobre un buffer reutilizado
+            lienzo = bgr.copy()
+            teselacion = OverlayRenderer(("teselacion",))
+            capas = OverlayRenderer(("teselacion", "contornos", "iris"), alpha=0.6)
+            caso(f"overlay_teselacion/{nombre}", lambda: teselacion.render(lienzo, puntos))
+            caso(f"overlay_capas_alpha/{nombre}", lambda: capas.render(lienzo, puntos))
+            caso(f"detect_total/{nombre}", lambda: detector.detect(bgr))
+
+            # Camino completo de una subida: BGR (anterior) contra RGB nativo
+            def ruta_bgr():
+                imagen = resize_image(pil_to_cv2(pil), max_width=800)
+                cv2_to_pil(imagen)
+                procesada, _, _ = detector.detect(imagen)
+                cv2_to_pil(procesada)
+
+            def ruta_rgb():
+                imagen = resize_image(pil_to_rgb(pil), max_width=800)
+                detector.detect(imagen, input_format="rgb", in_place=True)
+
+            caso(f"ruta_subida_bgr/{nombre}", ruta_bgr)
+            caso(f"ruta_subida_rgb/{nombre}", ruta_rgb)
+            for clave, funcion in (("bgr", ruta_bgr), ("rgb", ruta_rgb)):
+                asignaciones[f"ruta_subida_{clave}/{nombre}"] = measure_allocations(
+                    funcion, frame_bytes=bgr.nbytes)
+    finally:
+        detector.close()
+
+    casos.update(_benchmark_transformer(imagenes, repetitions, warmup))
+    casos.update(_benchmark_backends(imagenes, backends, repetitions, warmup))
+    rostro = sample_face()
+    if not muestras and rostro is not None:
+        muestras = {"rostro": rostro}
+    casos.update(_benchmark_faces(muestras, repetitions, warmup))
+
+    for clave, valores in asignaciones.items():
+        print(f"{clave:<45} pico {valores['pico_bytes'] / 1e6:8.2f} MB "
+              f"({valores['pico_cuadros']:.1f} cuadros)", file=sys.stderr)
+
+    return {"meta": _metadata(), "casos": casos, "asignaciones": asignaciones}
+
+
+def _benchmark_transformer(imagenes, repetitions, warmup):
+    """
+    Mide FaceMeshTransformer.recv en modo síncrono y asíncrono (requiere av).
+
+    La compuerta de cuadros del TrackingDetector se desactiva: con un cuadro
+    repetido, todas las llamadas salvo la primera reutilizarían el último
+    resultado y se mediría un acierto de caché en lugar de la inferencia.
+    """
+    try:
+        import av
+        from .realtime import FaceMeshTransformer
+    except ImportError as e:
+        print(f"Se omite FaceMeshTransformer.recv: {e}", file=sys.stderr)
+        return {}
+
+    casos = {}
+    for asincrono in (False, True):
+        modo = "async" if asincrono else "sync"
+        transformer = FaceMeshTransformer(asynchronous=asincrono)
+        # En modo asíncrono el worker comparte este mismo detector
+        if getattr(transformer.detector, "gate", None) is not None:
+            transformer.detector.gate = None
+        try:
+            for nombre, bgr in imagenes.items():
+                cuadro = av.VideoFrame.from_ndarray(bgr, format="bgr24")
+                clave = f"transformer_recv_{modo}/{nombre}"
+                casos[clave] = measure(lambda: transformer.recv(cuadro), repetitions, warmup)
+                print(f"{clave:<45} p50 {casos[clave]['p50_ms']:8.2f} ms", file=sys.stderr)
+        finally:
+            transformer.on_ended()
+    return casos
+
+
+def _live_throughput(worker, rgb, frames=TASKS_BENCHMARK_FRAMES, interval=0.005):
+    """
+    Entrega cuadros a un worker asíncrono más rápido de lo que procesa.
+
+    Returns:
+        dict: Resultados por segundo ("ops_por_segundo"), latencias de
+            llegada a resultado y tasa de descarte, como en measure()
+    """
+    inicio = time.perf_counter()
+    for i in range(frames):
+        worker.submit(rgb)
+        time.sleep(max(0.0, inicio + (i + 1) * interval - time.perf_counter()))
+    # Espera el último resultado, hasta un segundo
+    limite = time.perf_counter() + 1.0
+    while time.perf_counter() < limite:
+        estadisticas = worker.stats()
+        atendidos = (estadisticas["cuadros_procesados"] + estadisticas["cuadros_descartados"]
+                     + estadisticas.get("errores", 0))
+        if atendidos >= frames:
+            break
+        time.sleep(0.005)
+    transcurrido = time.perf_counter() - inicio
+
+    estadisticas = worker.stats()
+    return {
+        "p50_ms": estadisticas["latencia_ms_p50"],
+        "p95_ms": estadisticas["latencia_ms_p95"],
+        "ops_por_segundo": estadisticas["cuadros_procesados"] / transcurrido,
+        "tasa_descarte": estadisticas["tasa_descarte"],
+        "repeticiones": frames,
+        "rss_pico_mb": peak_rss_mb(),
+    }
+
+
+def _benchmark_backends(imagenes, backends, repetitions, warmup):
+    """
+    Compara el rendimiento de los backends de detección.
+
+    Para cada backend mide detect() en modo imagen y en modo video, y la
+    cantidad de resultados por segundo del camino asíncrono del modo cámara
+    (LatestFrameWorker con "legacy", LIVE_STREAM con "tasks").
+    """
+    from .detector import create_detector
+    from .realtime import LatestFrameWorker
+
+    casos = {}
+    for backend in backends:
+        try:
+            detectores = {"imagen": create_detector(backend=backend),
+                          "video": create_detector(backend=backend, static_image_mode=False)}
+        except FileNotFoundError as e:
+            print(f"Se omite el backend {backend}: {e}", file=sys.stderr)
+            continue
+        try:
+            for nombre, bgr in imagenes.items():
+                for modo, detector in detectores.items():
+                    clave = f"backend_{backend}_{modo}/{nombre}"
+                    casos[clave] = measure(lambda: detector.detect(bgr, draw=False),
+                                           repetitions, warmup)
+                    print(f"{clave:<45} p50 {casos[clave]['p50_ms']:8.2f} ms  "
+                          f"{casos[clave]['ops_por_segundo']:7.1f} cuadros/s", file=sys.stderr)
+
+                if backend == "tasks":
+                    from .landmarker import LiveStreamWorker
+                    worker = LiveStreamWorker()
+                else:
+                    worker = LatestFrameWorker(create_detector(static_image_mode=False,
+                                                               backend=backend))
+                try:
+                    clave = f"backend_{backend}_vivo/{nombre}"
+                    casos[clave] = _live_throughput(worker,
+                                                    cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+                finally:
+                    worker.close()
+                print(f"{clave:<45} p50 {casos[clave]['p50_ms'] or 0:8.2f} ms  "
+                      f"{casos[clave]['ops_por_segundo']:7.1f} cuadros/s", file=sys.stderr)
+        finally:
+            for detector in detectores.values():
+                detector.close()
+    return casos
+
+
+def face_mosaic(image, count):
+    """
+    Repite una imagen en una grilla casi cuadrada para simular una foto grupal.
+
+    Args:
+        image (numpy.ndarray): Imagen con un rostro
+        count (int): Cantidad de copias
+
+    Returns:
+        numpy.ndarray: Mosaico BGR; las celdas sobrantes quedan en gris
+    """
+    columnas = int(np.ceil(np.sqrt(count)))
+    filas = int(np.ceil(count / columnas))
+    alto, ancho = image.shape[:2]
+    mosaico = np.full((filas * alto, columnas * ancho, 3), 128, dtype=np.uint8)
+    for i in range(count):
+        fila, columna = divmod(i, columnas)
+        mosaico[fila * alto:(fila + 1) * alto, columna * ancho:(columna + 1) * ancho] = image
+    return mosaico
+
+
+def _benchmark_faces(imagenes, repetitions, warmup):
+    """
+    Mide cómo crece la latencia con la cantidad de rostros por imagen.
+
+    Cada imagen se repite en mosaicos de BENCHMARK_FACE_COUNTS rostros y se
+    procesa con el detector que create_detector elige para esa cantidad.
+
+    Args:
+        imagenes (dict): Imágenes BGR con un rostro cada una
+    """
+    from .detector import create_detector
+
+    casos = {}
+    for cantidad in BENCHMARK_FACE_COUNTS:
+        detector = create_detector(cantidad)
+        try:
+            for nombre, bgr in imagenes.items():
+                mosaico = face_mosaic(bgr, cantidad)
+                clave = f"detect_rostros_{cantidad}/{nombre}"
+                casos[clave] = measure(lambda: detector.detect(mosaico, draw=False),
+                                       repetitions, warmup)
+                _, _, info = detector.detect(mosaico, draw=False)
+                rostros = info["rostros_detectados"]
+                casos[clave]["rostros"] = rostros
+                casos[clave]["ms_por_rostro"] = (casos[clave]["p50_ms"] / rostros
+                                                 if rostros else None)
+                print(f"{clave:<45} p50 {casos[clave]['p50_ms']:8.2f} ms  "
+                      f"{rostros} rostros", file=sys.stderr)
+        finally:
+            detector.close()
+    return casos
+
+
+def _metadata():
+    """Versiones y plataforma, para saber contra qué se compara."""
+    import mediapipe as mp
+
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "mediapipe": getattr(mp, "__version__", "desconocida"),
+    }
+
+
+def compare(results, baseline, threshold=BENCHMARK_THRESHOLD, metric="p50_ms",
+            min_delta_ms=BENCHMARK_MIN_DELTA_MS):
+    """
+    Compara resultados contra una línea base.
+
+    Args:
+        results (dict): Salida de run_benchmarks
+        baseline (dict): Salida guardada de una corrida anterior
+        threshold (float): Aumento relativo tolerado (0.15 = 15 %)
+        metric (str): Métrica a comparar ("p50_ms", "p95_ms" o "p99_ms")
+        min_delta_ms (float): Diferencia absoluta mínima; evita marcar como
+            regresión el ruido de casos que tardan microsegundos
+
+    Returns:
+        list: Regresiones como dicts con caso, base, actual y cambio relativo;
+            los casos sin la métrica (o con None) en alguno de los dos lados
+            no se comparan
+    """
+    regresiones = []
+    base = baseline.get("casos", {})
+    for nombre, metricas in results["casos"].items():
+        anterior = base.get(nombre, {}).get(metric)
+        actual = metricas.get(metric)
+        if not anterior or actual is None:
+            continue
+        cambio = actual / anterior - 1
+        if cambio > threshold and actual - anterior > min_delta_ms:
+            regresiones.append({"caso": nombre, "base": anterior,
+                                "actual": actual, "cambio": cambio})
+    return regresiones
+
+
+def _parse_resolution(texto):
+    ancho, alto = texto.lower().split("x")
+    return int(ancho), int(alto)
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Benchmarks del camino de detección.")
+    parser.add_argument("-o", "--output", default="benchmark.json",
+                        help="Archivo JSON de resultados")
+    parser.add_argument("--images", default=None, help="Carpeta con imágenes de muestra")
+    parser.add_argument("--resolutions", nargs="+", type=_parse_resolution,
+                        default=BENCHMARK_RESOLUTIONS, help="Resoluciones, p. ej. 640x480")
+    parser.add_argument("-n", "--repetitions", type=int, default=BENCHMARK_REPETITIONS)
+    parser.add_argument("--warmup", type=int, default=BENCHMARK_WARMUP)
+    parser.add_argument("--baseline", default=None, help="JSON de línea base a comparar")
+    parser.add_argument("--threshold", type=float, default=BENCHMARK_THRESHOLD,
+                        help="Aumento relativo tolerado antes de marcar regresión")
+    parser.add_argument("--metric", default="p50_ms", choices=["p50_ms", "p95_ms", "p99_ms"])
+    parser.add_argument("--min-delta-ms", type=float, default=BENCHMARK_MIN_DELTA_MS,
+                        help="Diferencia absoluta mínima para marcar regresión")
+    parser.add_argument("--save-baseline", default=None,
+                        help="Guardar además los resultados como nueva línea base")
+    parser.add_argument("--backends", nargs="+", choices=DETECTOR_BACKENDS,
+                        default=list(DETECTOR_BACKENDS),
+                        help="Backends de detección a comparar")
+    args = parser.parse_args(argv)
+
+    resultados = run_benchmarks(args.resolutions, args.images, args.repetitions, args.warmup,
+                                args.backends)
+
+    for destino in filter(None, (args.output, args.save_baseline)):
+        with open(destino, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = compare(resultados, base, args.threshold, args.metric,
+                              args.min_delta_ms)
+        for regresion in regresiones:
+            print(f"REGRESIÓN {regresion['caso']}: {regresion['base']:.2f} -> "
+                  f"{regresion['actual']:.2f} ms ({regresion['cambio'] * 100:+.1f}%)",
+                  file=sys.stderr)
+        if regresiones:
+            sys.exit(1)
+        print("Sin regresiones respecto de la línea base", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
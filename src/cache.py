@@ -0,0 +1,347 @@
+"""
+Caché de resultados de detección direccionada por contenido.
+
+La clave combina un hash del buffer de píxeles decodificado con la
+configuración activa del detector, de modo que una imagen repetida se
+resuelve con solo calcular su hash y cualquier cambio de configuración
+invalida automáticamente las entradas anteriores.
+"""
+import copy
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .config import (
+    FACE_MESH_CONFIG, TOTAL_LANDMARKS, LANDMARK_COLOR, CACHE_MAX_BYTES, CACHE_DISK_DIR,
+    TASKS_MODEL_PATH, TASKS_BLENDSHAPES, TASKS_TRANSFORMATION_MATRICES,
+    ROI_DETECTION_SIZE, ROI_MIN_DETECTION_CONFIDENCE, ROI_DETECTION_PADDING,
+    ROI_LANDMARK_PADDING, ROI_REUSE_MARGIN, ROI_REDETECT_INTERVAL, ROI_MAX_DETECTION_GRID,
+    ROI_TILE_OVERLAP, ROI_DUPLICATE_OVERLAP
+)
+from .render import draw_points
+
+# Costo aproximado de una entrada además de sus arrays (dict, claves, info)
+_SOBRECARGA_ENTRADA = 512
+
+# Cambia cuando cambian los arrays guardados por resultado
+_FORMATO = 2
+# Marca de formato dentro de cada carpeta de configuración en disco
+_ARCHIVO_FORMATO = "FORMATO"
+
+
+def config_fingerprint(config=None, backend=None):
+    """
+    Calcula una huella corta de la configuración de detección.
+
+    Args:
+        config (dict): Parámetros de FaceMesh (por defecto, FACE_MESH_CONFIG)
+        backend (str): Backend de detección (por defecto, detector_backend());
+            con "tasks" la huella incluye también el modelo y las salidas
+            opcionales (TASKS_*), y en modo "roi", los parámetros ROI_*
+
+    Returns:
+        str: Huella hexadecimal
+    """
+    from .detector import detector_backend
+
+    config = FACE_MESH_CONFIG if config is None else config
+    backend = detector_backend(backend)
+    contenido = {"config": config, "landmarks": TOTAL_LANDMARKS, "formato": _FORMATO,
+                 "backend": backend}
+    if backend == "tasks":
+        contenido["modelo"] = TASKS_MODEL_PATH
+        contenido["blendshapes"] = TASKS_BLENDSHAPES
+        contenido["matrices"] = TASKS_TRANSFORMATION_MATRICES
+    if config.get("modo") == "roi":
+        contenido["roi"] = [
+            ROI_DETECTION_SIZE, ROI_MIN_DETECTION_CONFIDENCE, ROI_DETECTION_PADDING,
+            ROI_LANDMARK_PADDING, ROI_REUSE_MARGIN, ROI_REDETECT_INTERVAL,
+            ROI_MAX_DETECTION_GRID, ROI_TILE_OVERLAP, ROI_DUPLICATE_OVERLAP,
+        ]
+    contenido = json.dumps(contenido, sort_keys=True)
+    return hashlib.blake2b(contenido.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _solo_lectura(landmarks):
+    """Marca los arrays como de solo lectura para proteger el contenido cacheado."""
+    for array in landmarks.values():
+        array.setflags(write=False)
+    return landmarks
+
+
+def _copia(landmarks, info):
+    """Copia de una entrada para el llamador: diccionarios propios, arrays de solo lectura."""
+    return dict(landmarks), copy.deepcopy(info)
+
+
+class LandmarkCache:
+    """
+    Caché LRU en memoria con presupuesto en bytes y capa opcional en disco.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, disk_dir=CACHE_DISK_DIR, config=None,
+                 backend=None):
+        """
+        Args:
+            max_bytes (int): Presupuesto de memoria para la capa LRU
+            disk_dir (str): Carpeta de la capa persistente (None = solo memoria)
+            config (dict): Configuración de detección con la que se generan los resultados
+            backend (str): Backend que genera los resultados (por defecto,
+                detector_backend())
+        """
+        from .detector import detector_backend
+
+        self.max_bytes = max_bytes
+        self.config = dict(FACE_MESH_CONFIG if config is None else config)
+        self.backend = detector_backend(backend)
+        self.fingerprint = config_fingerprint(self.config, self.backend)
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._bytes = 0
+
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.disk_dir = None
+        if disk_dir:
+            self.disk_dir = os.path.join(disk_dir, self.fingerprint)
+            self._crear_carpeta()
+            self._purgar_formatos_viejos(disk_dir)
+
+    def _crear_carpeta(self):
+        """Crea la carpeta de esta configuración con su marca de formato."""
+        os.makedirs(self.disk_dir, exist_ok=True)
+        with open(os.path.join(self.disk_dir, _ARCHIVO_FORMATO), "w") as archivo:
+            archivo.write(str(_FORMATO))
+
+    def _purgar_formatos_viejos(self, raiz):
+        """
+        Elimina del disco las entradas escritas con un formato anterior.
+
+        Solo se borran carpetas cuya marca de formato existe y es más vieja
+        que la actual: las que no tienen marca legible pueden ser datos del
+        usuario y se dejan intactas. Las carpetas de otras configuraciones
+        vigentes (por ejemplo, otra cantidad de rostros) también se conservan.
+        """
+        for nombre in os.listdir(raiz):
+            ruta = os.path.join(raiz, nombre)
+            es_huella = len(nombre) == len(self.fingerprint) and all(
+                caracter in "0123456789abcdef" for caracter in nombre)
+            if not es_huella or nombre == self.fingerprint or not os.path.isdir(ruta):
+                continue
+            try:
+                with open(os.path.join(ruta, _ARCHIVO_FORMATO)) as archivo:
+                    formato = int(archivo.read().strip())
+            except (OSError, ValueError):
+                continue
+            if formato < _FORMATO:
+                shutil.rmtree(ruta, ignore_errors=True)
+
+    def key(self, image, input_format="bgr"):
+        """
+        Calcula la clave de una imagen decodificada.
+
+        Args:
+            image (numpy.ndarray): Imagen tal como se pasaría a detect()
+            input_format (str): "bgr" o "rgb"
+
+        Returns:
+            str: Clave hexadecimal
+        """
+        imagen = np.ascontiguousarray(image)
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f"{self.fingerprint}|{input_format}|{imagen.shape}|{imagen.dtype}".encode())
+        # memoryview evita copiar el buffer para hashearlo
+        hasher.update(memoryview(imagen).cast("B"))
+        return hasher.hexdigest()
+
+    def _ruta_disco(self, clave):
+        return os.path.join(self.disk_dir, clave[:2], clave + ".npz")
+
+    def get(self, key):
+        """
+        Busca un resultado en memoria y, si no está, en disco.
+
+        Returns:
+            tuple: (landmarks, info) o None si no está cacheado
+        """
+        with self._lock:
+            entrada = self._entradas.get(key)
+            if entrada is not None:
+                self._entradas.move_to_end(key)
+                self.hits_memoria += 1
+                landmarks, info, _ = entrada
+                return _copia(landmarks, info)
+
+        if self.disk_dir:
+            resultado = self._leer_disco(key)
+            if resultado is not None:
+                with self._lock:
+                    self.hits_disco += 1
+                self._guardar_memoria(key, *resultado)
+                return _copia(*resultado)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, landmarks, info):
+        """
+        Guarda un resultado en memoria y, si está habilitada, en disco.
+
+        Args:
+            key (str): Clave obtenida con key()
+            landmarks (dict): Arrays devueltos por detect()
+            info (dict): Información de detección
+
+        Returns:
+            tuple: (landmarks, info) tal como quedaron guardados
+        """
+        landmarks = _solo_lectura({k: np.array(v) for k, v in landmarks.items()})
+        # Los tiempos por etapa describen esa ejecución, no el resultado
+        info = copy.deepcopy({clave: valor for clave, valor in info.items()
+                              if clave != "tiempos_ms"})
+        self._guardar_memoria(key, landmarks, info)
+        if self.disk_dir:
+            self._escribir_disco(key, landmarks, info)
+        return _copia(landmarks, info)
+
+    def _guardar_memoria(self, clave, landmarks, info):
+        tamano = sum(array.nbytes for array in landmarks.values()) + _SOBRECARGA_ENTRADA
+        if tamano > self.max_bytes:
+            return
+
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[2]
+            self._entradas[clave] = (landmarks, info, tamano)
+            self._bytes += tamano
+
+            while self._bytes > self.max_bytes:
+                _, (_, _, liberado) = self._entradas.popitem(last=False)
+                self._bytes -= liberado
+                self.evictions += 1
+
+    def _leer_disco(self, clave):
+        ruta = self._ruta_disco(clave)
+        try:
+            with np.load(ruta) as datos:
+                landmarks = {campo: datos[campo] for campo in datos.files if campo != "info"}
+                info = json.loads(str(datos["info"]))
+        except (OSError, ValueError, KeyError):
+            # Ausente o corrupta (por ejemplo, escritura interrumpida)
+            return None
+        return _solo_lectura(landmarks), info
+
+    def _escribir_disco(self, clave, landmarks, info):
+        ruta = self._ruta_disco(clave)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as archivo:
+            np.savez(archivo, info=json.dumps(info), **landmarks)
+        os.replace(temporal, ruta)
+
+    def detect(self, image, detector, draw=True, input_format="bgr", in_place=False):
+        """
+        Igual que FaceLandmarkDetector.detect, pero consultando primero la caché.
+
+        Args:
+            image (numpy.ndarray): Imagen BGR o RGB
+            detector: FaceLandmarkDetector, o DetectorPool del que se toma un
+                detector solo si hay que ejecutar la inferencia
+            draw (bool): Dibujar los landmarks sobre una copia de la imagen
+            input_format (str): "bgr" o "rgb"
+            in_place (bool): Dibujar sobre la imagen recibida en lugar de una copia
+
+        Returns:
+            tuple: (imagen_procesada, landmarks, info) como en detect(). Los
+                arrays de landmarks son de solo lectura.
+        """
+        config = getattr(detector, "config", None)
+        if ((config is not None and dict(config) != self.config)
+                or getattr(detector, "backend", self.backend) != self.backend):
+            raise ValueError("La configuración del detector no coincide con la de la caché")
+
+        clave = self.key(image, input_format)
+        resultado = self.get(clave)
+
+        if resultado is None:
+            if hasattr(detector, "checkout"):
+                with detector.checkout() as reservado:
+                    _, landmarks, info = reservado.detect(image, draw=False,
+                                                          input_format=input_format)
+            else:
+                _, landmarks, info = detector.detect(image, draw=False,
+                                                     input_format=input_format)
+            resultado = self.put(clave, landmarks, info)
+
+        landmarks, info = resultado
+        imagen_con_puntos = None
+        if draw:
+            color = LANDMARK_COLOR if input_format == "bgr" else LANDMARK_COLOR[::-1]
+            imagen_con_puntos = draw_points(image if in_place else image.copy(),
+                                            landmarks["pixeles"], color)
+        return imagen_con_puntos, landmarks, info
+
+    def stats(self):
+        """
+        Devuelve las estadísticas de la caché.
+
+        Returns:
+            dict: Aciertos (memoria/disco), fallos, desalojos, entradas y bytes en memoria
+        """
+        with self._lock:
+            consultas = self.hits_memoria + self.hits_disco + self.misses
+            return {
+                "hits_memoria": self.hits_memoria,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "tasa_aciertos": ((self.hits_memoria + self.hits_disco) / consultas
+                                  if consultas else 0.0),
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+            }
+
+    def clear(self):
+        """Vacía la capa en memoria y, si existe, la capa en disco."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+        if self.disk_dir:
+            shutil.rmtree(self.disk_dir, ignore_errors=True)
+            self._crear_carpeta()
+
+
+_caches = {}
+_cache_lock = threading.Lock()
+
+
+def get_landmark_cache(max_faces=None):
+    """
+    Devuelve la caché de landmarks compartida por todo el proceso.
+
+    Args:
+        max_faces (int): Rostros máximos del detector cuyos resultados se
+            guardan; cada configuración tiene su propia caché
+
+    Returns:
+        LandmarkCache: Caché compartida
+    """
+    from .detector import detector_backend, detector_config
+
+    config = detector_config(max_faces)
+    clave = (detector_backend(), config["max_num_faces"])
+    with _cache_lock:
+        cache = _caches.get(clave)
+        if cache is None:
+            cache = _caches[clave] = LandmarkCache(config=config, backend=clave[0])
+        return cache
@@ -18,4 +18,179 @@ LANDMARK_RADIUS = 2
 LANDMARK_THICKNESS = -1  # Relleno
 
 # Cantidad de landmarks esperados
-TOTAL_LANDMARKS = 478
\ No newline at end of file
+TOTAL_LANDMARKS = 478
+
+# Pool compartido de detectores (modo "Subir imagen")
+DETECTOR_POOL_SIZE = 2  # Máximo de detectores vivos por proceso
+DETECTOR_POOL_MIN_IDLE = 1  # Detectores que se mantienen calientes aunque estén inactivos
+DETECTOR_POOL_IDLE_TIMEOUT = 300  # Segundos sin uso antes de liberar un detector
+DETECTOR_POOL_MAX_ERRORS = 3  # Errores consecutivos antes de descartar un detector
+DETECTOR_WARMUP_SIZE = (256, 256)  # Tamaño (alto, ancho) del cuadro sintético de calentamiento
+DETECTOR_POOL_MAX_CONFIGS = 2  # Pools vivos a la vez (uno por cantidad de rostros)
+
+
+# Procesamiento por lotes (python -m src.batch)
+BATCH_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+BATCH_SHARD_SIZE = 1000  # Imágenes por fragmento .npz
+BATCH_QUEUE_PER_WORKER = 4  # Tareas en vuelo por proceso trabajador
+BATCH_REPORT_INTERVAL = 5  # Segundos entre reportes de progreso
+
+
+# Procesamiento de archivos de video (src/video.py)
+VIDEO_QUEUE_SIZE = 8  # Cuadros máximos en cada cola entre etapas
+VIDEO_FOURCC = "mp4v"  # Códec del video anotado
+
+
+# Detección en tiempo real (cámara vía WebRTC)
+REALTIME_ASYNC = True  # Inferencia en segundo plano sobre el cuadro más reciente
+REALTIME_LATENCY_WINDOW = 120  # Cuadros usados para los percentiles de latencia
+REALTIME_COLOR = (0, 255, 0)  # Verde en BGR
+REALTIME_THICKNESS = 1
+REALTIME_POINT_RADIUS = 1
+
+
+# Caché de resultados de detección (src/cache.py)
+CACHE_MAX_BYTES = 64 * 1024 * 1024  # Presupuesto de la capa en memoria
+CACHE_DISK_DIR = None  # Carpeta de la capa persistente (None = solo memoria)
+
+
+# Almacén binario de landmarks (src/store.py)
+STORE_ENCODING = "float32"  # "float32", "float16" o "int16"
+STORE_INT16_SCALE = 16384.0  # int16 = round(coordenada normalizada * escala), rango ±2
+
+
+# Benchmarks (python -m src.benchmark)
+BENCHMARK_RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+BENCHMARK_REPETITIONS = 50
+BENCHMARK_WARMUP = 5
+BENCHMARK_THRESHOLD = 0.15  # Aumento relativo de latencia considerado regresión
+BENCHMARK_MIN_DELTA_MS = 0.05  # Diferencia absoluta mínima para marcar regresión
+BENCHMARK_FACE_COUNTS = (1, 2, 4, 8)  # Rostros por mosaico en los casos de escalado
+# Cara de referencia incluida en el repositorio (relativa a la raíz del proyecto)
+SAMPLE_FACE_IMAGE = "assets/rostro.jpg"
+
+
+# Instrumentación por etapas (src/metrics.py); también FACE_METRICS=1 en el entorno
+METRICS_ENABLED = False
+METRICS_BUCKETS_SECONDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+# Inferencia en dos etapas por regiones de interés (src/roi.py)
+ROI_DETECTION_SIZE = 640  # Lado mayor de la pasada de baja resolución
+ROI_MIN_DETECTION_CONFIDENCE = 0.5
+ROI_DETECTION_PADDING = 0.35  # Margen alrededor de la caja del detector (fracción del lado)
+ROI_LANDMARK_PADDING = 0.2  # Margen alrededor de los landmarks al reencuadrar
+ROI_REUSE_MARGIN = 0.05  # Distancia mínima al borde para seguir reutilizando un recorte
+ROI_REDETECT_INTERVAL = 30  # Cuadros entre detecciones completas en modo tracking
+ROI_MAX_DETECTION_GRID = 3  # Grilla más fina de mosaicos para buscar caras pequeñas
+ROI_TILE_OVERLAP = 0.25  # Solapamiento entre mosaicos (fracción del mosaico)
+ROI_DUPLICATE_OVERLAP = 0.5  # Intersección sobre el área menor para considerar duplicadas
+
+
+# Múltiples rostros
+MAX_FACES_LIMIT = 10  # Máximo seleccionable en la interfaz
+ROI_MIN_FACES = 2  # Desde esta cantidad de rostros se usa la inferencia en dos etapas
+
+
+# Tracking temporal para video y cámara (src/tracking.py)
+TRACKING_GATE_SIZE = (32, 24)  # Miniatura (ancho, alto) usada para comparar cuadros
+TRACKING_GATE_THRESHOLD = 2.0  # Diferencia media (0-255) a partir de la cual se reprocesa
+TRACKING_MAX_REUSE = 15  # Cuadros seguidos que pueden reutilizar el último resultado
+TRACKING_MIN_CUTOFF = 1.0  # Filtro One Euro: frecuencia de corte mínima (Hz)
+TRACKING_BETA = 0.05  # Filtro One Euro: cuánto sube el corte con la velocidad
+TRACKING_D_CUTOFF = 1.0  # Filtro One Euro: corte de la derivada (Hz)
+
+
+# Servicio HTTP local (python -m src.server)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8500
+SERVER_QUEUE_SIZE = 64  # Imágenes en espera antes de responder 429
+SERVER_MAX_BATCH = 8  # Imágenes máximas por micro-lote
+SERVER_MAX_WAIT_MS = 5.0  # Espera máxima para completar un micro-lote
+SERVER_MAX_BODY_BYTES = 32 * 1024 * 1024  # Cuerpo máximo de una petición
+SERVER_MAX_WIDTH = 1280  # Ancho al que se reducen las imágenes recibidas
+
+
+# Capas del overlay (src/render.py): color BGR y grosor de línea
+RENDER_LAYERS = {
+    "teselacion": {"color": (0, 255, 0), "grosor": 1},
+    "contornos": {"color": (255, 255, 255), "grosor": 1},
+    "iris": {"color": (255, 200, 0), "grosor": 1},
+}
+REALTIME_LAYERS = ("teselacion",)  # Capas dibujadas en el modo cámara
+REALTIME_OVERLAY_ALPHA = 1.0  # Opacidad del overlay (1.0 = se dibuja directo sobre el cuadro)
+
+
+# Inferencia compartida del modo cámara (src/serving.py)
+SERVING_SHARED_POOL = True  # Todas las sesiones usan los mismos procesos de inferencia
+SERVING_WORKERS = 2  # Procesos de inferencia
+SERVING_SLOTS = 16  # Ranuras de memoria compartida para cuadros en espera o en curso
+SERVING_MAX_WIDTH = 640  # Tamaño máximo de un cuadro en la ranura (los mayores se reducen)
+SERVING_MAX_HEIGHT = 480
+SERVING_WATCH_INTERVAL = 0.5  # Segundos entre revisiones de trabajadores caídos
+SERVING_MAX_RESTARTS = 5  # Reemplazos seguidos de un trabajador que muere sin entregar resultados
+
+
+# Perfiles de rendimiento del modo cámara (src/profiles.py), de mayor a menor calidad.
+# "ancho" es el ancho al que se reduce el cuadro antes de la inferencia; sin
+# refine_landmarks no hay iris (468 puntos), así que tampoco su capa.
+PERFORMANCE_PROFILES = {
+    "maxima": {"refine_landmarks": True, "ancho": 1280, "max_faces": 2, "tracking": False,
+               "capas": ("teselacion", "contornos", "iris")},
+    "alta": {"refine_landmarks": True, "ancho": 960, "max_faces": 1, "tracking": True,
+             "capas": ("teselacion", "iris")},
+    "media": {"refine_landmarks": True, "ancho": 640, "max_faces": 1, "tracking": True,
+              "capas": ("teselacion",)},
+    "baja": {"refine_landmarks": False, "ancho": 480, "max_faces": 1, "tracking": True,
+             "capas": ("contornos",)},
+    "minima": {"refine_landmarks": False, "ancho": 320, "max_faces": 1, "tracking": True,
+               "capas": ("contornos",)},
+}
+PROFILE_DEFAULT = "media"  # Perfil usado si no se ajusta automáticamente
+PROFILE_LATENCY_BUDGET_MS = 33.0  # Presupuesto de inferencia por cuadro (~30 fps)
+PROFILE_BENCHMARK_FRAMES = 10  # Cuadros medidos por perfil al arrancar
+PROFILE_WINDOW = 30  # Cuadros observados antes de decidir un cambio de perfil
+PROFILE_UPGRADE_HEADROOM = 0.7  # Se sube si el perfil superior estimado usa menos de esta fracción
+PROFILE_COOLDOWN = 90  # Cuadros mínimos entre cambios de perfil
+
+
+# Prueba de carga del modo cámara (python -m src.loadtest)
+LOADTEST_RESOLUTION = (640, 480)  # Tamaño (ancho, alto) de los cuadros generados
+LOADTEST_FPS = 30  # Cuadros por segundo que entrega cada sesión
+LOADTEST_DURATION = 15  # Segundos medidos por cada cantidad de sesiones
+LOADTEST_SESSIONS = (1, 2, 4, 8)  # Cantidades de sesiones a probar
+LOADTEST_FPS_TOLERANCE = 0.1  # Fracción de fps o de cuadros tardíos tolerada
+LOADTEST_MAX_DROP_RATE = 0.5  # Fracción máxima de cuadros sin inferencia (modo asíncrono)
+
+
+# Overlay vectorial (src/vector.py): el navegador dibuja los landmarks
+VECTOR_OVERLAY = True  # En "Subir imagen", enviar el overlay como SVG en lugar de una imagen dibujada
+VECTOR_QUANT_SCALE = 65535  # Coordenadas normalizadas cuantizadas a 16 bits
+VECTOR_DECIMALS = 1  # Decimales de las coordenadas en el SVG
+VECTOR_POINT_RADIUS = 1.5  # Radio de los puntos en píxeles de la imagen
+VECTOR_JPEG_QUALITY = 90  # Calidad de la imagen de fondo del SVG
+
+
+# Búsqueda de rostros por geometría similar (src/ann.py)
+ANN_DIMENSIONS = 32  # Componentes principales que se conservan (None = sin reducir)
+ANN_MAX_LISTS = 1024  # Listas (centroides) máximas del índice IVF
+ANN_NPROBE = 16  # Listas revisadas por consulta: más listas, más recall y más latencia
+ANN_KMEANS_ITERATIONS = 15
+ANN_TRAIN_SAMPLE = 100_000  # Rostros usados para entrenar la PCA y los centroides
+ANN_MAX_PENDING = 10_000  # Altas que se recorren aparte antes de reordenarlas en sus listas
+ANN_BENCHMARK_NPROBE = (1, 4, 16, 64)
+
+
+# Backend del detector: "legacy" (mp.solutions.face_mesh) o "tasks" (FaceLandmarker
+# de MediaPipe Tasks, src/landmarker.py); también FACE_BACKEND=tasks en el entorno
+DETECTOR_BACKENDS = ("legacy", "tasks")
+DETECTOR_BACKEND = "legacy"
+TASKS_MODEL_PATH = "models/face_landmarker.task"  # Relativa a la raíz del proyecto
+# El modelo no viene con el paquete mediapipe: hay que descargarlo a TASKS_MODEL_PATH
+TASKS_MODEL_URL = ("https://storage.googleapis.com/mediapipe-models/face_landmarker/"
+                   "face_landmarker/float16/1/face_landmarker.task")
+TASKS_NUM_THREADS = 0  # Hilos de CPU de XNNPACK por detector (0 = los que elija MediaPipe)
+TASKS_BLENDSHAPES = False  # 52 coeficientes de expresión por rostro
+TASKS_TRANSFORMATION_MATRICES = False  # Matriz 4x4 de pose del rostro canónico
+TASKS_MIN_PRESENCE_CONFIDENCE = 0.5
+TASKS_BENCHMARK_FRAMES = 120  # Cuadros del benchmark de rendimiento en modo video y live_stream
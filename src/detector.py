@@ -2,9 +2,140 @@
 """
 Detector de landmarks faciales usando MediaPipe.
 """
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
 import cv2
 import mediapipe as mp
-from .config import FACE_MESH_CONFIG, LANDMARK_COLOR, LANDMARK_RADIUS, LANDMARK_THICKNESS
+import numpy as np
+from .config import (
+    FACE_MESH_CONFIG, LANDMARK_COLOR,
+    DETECTOR_POOL_SIZE, DETECTOR_POOL_MIN_IDLE, DETECTOR_POOL_IDLE_TIMEOUT,
+    DETECTOR_POOL_MAX_ERRORS, DETECTOR_POOL_MAX_CONFIGS, DETECTOR_WARMUP_SIZE,
+    TOTAL_LANDMARKS, ROI_MIN_FACES,
+    DETECTOR_BACKEND, DETECTOR_BACKENDS
+)
+from .metrics import start_timer
+from .render import draw_points
+
+
+def landmarks_to_arrays(multi_face_landmarks, width, height):
+    """
+    Convierte los landmarks de MediaPipe a arrays de NumPy.
+
+    Args:
+        multi_face_landmarks (list): Lista de NormalizedLandmarkList (o None)
+        width (int): Ancho de la imagen en píxeles
+        height (int): Alto de la imagen en píxeles
+
+    Returns:
+        dict: "normalizados" y "pixeles", arrays float32 contiguos (rostros, 478, 3)
+    """
+    if not multi_face_landmarks:
+        vacio = np.empty((0, TOTAL_LANDMARKS, 3), dtype=np.float32)
+        return {"normalizados": vacio, "pixeles": vacio.copy()}
+
+    normalizados = np.array(
+        [[(punto.x, punto.y, punto.z) for punto in rostro.landmark]
+         for rostro in multi_face_landmarks],
+        dtype=np.float32
+    )
+    # MediaPipe expresa z en la misma escala que x
+    escala = np.array([width, height, width], dtype=np.float32)
+    pixeles = normalizados * escala
+
+    return {"normalizados": normalizados, "pixeles": pixeles}
+
+
+def face_boxes(points_px):
+    """
+    Calcula la caja que encierra los landmarks de cada rostro.
+
+    Args:
+        points_px (numpy.ndarray): Landmarks en píxeles (rostros, 478, 2 o 3)
+
+    Returns:
+        numpy.ndarray: Cajas float32 (rostros, 4) como (x0, y0, x1, y1)
+    """
+    if len(points_px) == 0:
+        return np.empty((0, 4), dtype=np.float32)
+    xy = points_px[..., :2]
+    return np.concatenate((xy.min(axis=1), xy.max(axis=1)), axis=1).astype(np.float32)
+
+
+def empty_landmarks():
+    """
+    Devuelve el resultado de una imagen sin rostros.
+
+    Returns:
+        dict: Los mismos arrays que detect(), con cero rostros
+    """
+    vacio = np.empty((0, TOTAL_LANDMARKS, 3), dtype=np.float32)
+    return {
+        "normalizados": vacio,
+        "pixeles": vacio.copy(),
+        "cajas": np.empty((0, 4), dtype=np.float32),
+        "puntajes": np.empty(0, dtype=np.float32),
+    }
+
+
+def stack_faces(results):
+    """
+    Une los resultados de varias imágenes con el rostro como primera dimensión.
+
+    Cada rostro de cada imagen ocupa una fila; "imagen" indica a qué imagen
+    pertenece y "inicio" dónde empieza cada imagen, de modo que los rostros
+    de la imagen i son las filas inicio[i]:inicio[i + 1].
+
+    Args:
+        results (list): Diccionarios de landmarks de detect() (None = imagen
+            sin resultado, por ejemplo por un error de lectura)
+
+    Returns:
+        dict: "imagen" (rostros,) int32, "inicio" (imágenes + 1,) int64 y
+            cada array de landmarks presente en todos los resultados,
+            concatenado a lo largo de los rostros
+    """
+    presentes = [r for r in results if r is not None]
+    vacios = empty_landmarks()
+    campos = [campo for campo in vacios if all(campo in r for r in presentes)]
+
+    cantidades = np.array([0 if r is None else len(r["normalizados"]) for r in results],
+                          dtype=np.int64)
+    apilado = {
+        "imagen": np.repeat(np.arange(len(results), dtype=np.int32), cantidades),
+        "inicio": np.concatenate(([0], np.cumsum(cantidades))).astype(np.int64),
+    }
+    for campo in campos:
+        partes = [r[campo] for r in presentes if len(r[campo])]
+        apilado[campo] = np.concatenate(partes) if partes else vacios[campo]
+    return apilado
+
+
+def detection_info(landmarks):
+    """
+    Completa "cajas" y "puntajes" si faltan y arma el info básico de detect().
+
+    Args:
+        landmarks (dict): "normalizados" y "pixeles", y opcionalmente
+            "cajas" y "puntajes"; se completa en el lugar
+
+    Returns:
+        dict: "rostros_detectados", "total_landmarks" y "deteccion_exitosa"
+    """
+    rostros = landmarks["normalizados"].shape[0]
+    landmarks.setdefault("cajas", face_boxes(landmarks["pixeles"]))
+    # Ni FaceMesh ni FaceLandmarker exponen la confianza de cada rostro
+    landmarks.setdefault("puntajes", np.full(rostros, np.nan, dtype=np.float32))
+    return {
+        "rostros_detectados": rostros,
+        "total_landmarks": landmarks["normalizados"].shape[1] if rostros else 0,
+        "deteccion_exitosa": rostros > 0
+    }
 
 
 class FaceLandmarkDetector:
@@ -12,70 +143,489 @@ class FaceLandmarkDetector:
     Clase para detectar y visualizar landmarks faciales.
     """
 
-    def __init__(self):
-        """Inicializa el detector de MediaPipe."""
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(**FACE_MESH_CONFIG)
+    # Backend de detección (ver detector_backend); lo usa la caché de resultados
+    backend = "legacy"
+
+    def __init__(self, **config):
+        """
+        Inicializa el detector de MediaPipe.
+
+        Args:
+            **config: Parámetros que reemplazan a los de FACE_MESH_CONFIG
+                (por ejemplo static_image_mode=False para video)
+        """
+        self.config = {**FACE_MESH_CONFIG, **config}
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(**self.config)
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
 
-    def detect(self, image):
+    def detect(self, image, draw=True, input_format="bgr", in_place=False):
         """
         Detecta landmarks faciales en la imagen.
 
+        La imagen recibida nunca se modifica salvo que in_place=True. Con
+        input_format="rgb" se pasa directo a MediaPipe, sin conversión ni copia.
+
         Args:
-            image (numpy.ndarray): Imagen en formato BGR (OpenCV)
+            image (numpy.ndarray): Imagen en formato BGR (OpenCV) o RGB
+            draw (bool): Si False, se omite el dibujo y solo se devuelven coordenadas
+            input_format (str): "bgr" (por defecto) o "rgb" si la imagen ya
+                está en el orden que espera MediaPipe
+            in_place (bool): Dibujar sobre la imagen recibida en lugar de una
+                copia; útil cuando el llamador ya no necesita el original
 
         Returns:
             tuple: (imagen_procesada, landmarks, info)
-                - imagen_procesada: imagen con landmarks dibujados
-                - landmarks: objeto de landmarks de MediaPipe
-                - info: diccionario con información de detección
+                - imagen_procesada: imagen con landmarks dibujados: una copia
+                  nueva, o la misma imagen recibida si in_place=True
+                  (None si draw=False)
+                - landmarks: diccionario de arrays float32 con un rostro por
+                  fila: "normalizados" (rostros, 478, 3) con x, y en [0, 1],
+                  "pixeles" (rostros, 478, 3) escalados al tamaño de la imagen,
+                  "cajas" (rostros, 4) con (x0, y0, x1, y1) en píxeles y
+                  "puntajes" (rostros,) con la confianza de detección (NaN si
+                  el modelo no la informa). Sin rostros, la primera dimensión
+                  es 0. Los arrays son nuevos y pertenecen al llamador. El
+                  backend "tasks" puede agregar "blendshapes" y "matrices"
+                  (ver src.landmarker).
+                - info: diccionario con información de detección. Si la
+                  instrumentación está activa (src.metrics), incluye
+                  "tiempos_ms" con la duración de cada etapa y
+                  "ms_por_rostro" con el tiempo total dividido por rostro.
         """
-        # Convertir BGR a RGB para MediaPipe
-        imagen_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        cronometro = start_timer()
+
+        if input_format == "rgb":
+            imagen_rgb = image
+        elif input_format == "bgr":
+            # Convertir BGR a RGB para MediaPipe
+            imagen_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        else:
+            raise ValueError(f"Formato de entrada no soportado: {input_format}")
+        if cronometro:
+            cronometro.lap("bgr_a_rgb")
 
         # Procesar la imagen
-        resultados = self.face_mesh.process(imagen_rgb)
+        landmarks = self._infer(imagen_rgb, cronometro)
 
-        # Crear copia para dibujar
-        imagen_con_puntos = image.copy()
+        info = detection_info(landmarks)
+        rostros = info["rostros_detectados"]
 
-        info = {
-            "rostros_detectados": 0,
-            "total_landmarks": 0,
-            "deteccion_exitosa": False
-        }
+        imagen_con_puntos = None
+        if draw:
+            color = LANDMARK_COLOR if input_format == "bgr" else LANDMARK_COLOR[::-1]
+            # Copia para dibujar, salvo que el llamador ceda la imagen
+            imagen_con_puntos = image if in_place else image.copy()
+            if cronometro:
+                cronometro.lap("copia")
+            draw_points(imagen_con_puntos, landmarks["pixeles"], color)
+            if cronometro:
+                cronometro.lap("dibujo")
 
-        # Si se detectaron rostros
-        if resultados.multi_face_landmarks:
-            info["rostros_detectados"] = len(resultados.multi_face_landmarks)
+        if cronometro:
+            info["tiempos_ms"] = cronometro.finish()
+            if rostros:
+                info["ms_por_rostro"] = info["tiempos_ms"]["total"] / rostros
 
-            # Tomar el primer rostro
-            rostro = resultados.multi_face_landmarks[0]
-            info["total_landmarks"] = len(rostro.landmark)
+        return imagen_con_puntos, landmarks, info
 
-            info["deteccion_exitosa"] = True
+    def _infer(self, image_rgb, timer=None):
+        """
+        Ejecuta el modelo y devuelve los landmarks como arrays.
 
-            # Dibujar landmarks
-            alto, ancho = image.shape[:2]
+        Las subclases reemplazan este método para cambiar la estrategia de
+        inferencia sin tocar el dibujo ni el armado de info de detect().
 
-            for punto in rostro.landmark:
-                coord_x_pixel = int(punto.x * ancho)
-                coord_y_pixel = int(punto.y * alto)
+        Args:
+            image_rgb (numpy.ndarray): Imagen RGB contigua
+            timer (StageTimer): Cronómetro de etapas (None si no se mide)
 
-                cv2.circle(
-                    imagen_con_puntos,
-                    (coord_x_pixel, coord_y_pixel),
-                    LANDMARK_RADIUS,
-                    LANDMARK_COLOR,
-                    LANDMARK_THICKNESS
-                )
+        Returns:
+            dict: "normalizados" y "pixeles", como en detect(); puede incluir
+                "puntajes" si la estrategia conoce la confianza de cada rostro
+        """
+        resultados = self.face_mesh.process(image_rgb)
+        if timer:
+            timer.lap("inferencia")
 
-            return imagen_con_puntos, rostro, info
+        alto, ancho = image_rgb.shape[:2]
+        landmarks = landmarks_to_arrays(resultados.multi_face_landmarks, ancho, alto)
+        if timer:
+            timer.lap("landmarks_a_numpy")
+        return landmarks
 
-        # No se detectó rostro
-        return imagen_con_puntos, None, info
+    def warm_up(self):
+        """
+        Ejecuta una detección sobre un cuadro sintético para que MediaPipe
+        termine de inicializar el grafo antes de la primera imagen real.
+        """
+        alto, ancho = DETECTOR_WARMUP_SIZE
+        self.detect(np.zeros((alto, ancho, 3), dtype=np.uint8), draw=False)
 
     def close(self):
         """Libera recursos del detector."""
-        self.face_mesh.close()
\ No newline at end of file
+        self.face_mesh.close()
+
+
+def detector_config(max_faces=None):
+    """
+    Configuración efectiva del detector para una cantidad máxima de rostros.
+
+    Desde ROI_MIN_FACES rostros se elige la inferencia en dos etapas
+    (src.roi), cuyo costo crece con la cantidad de caras encontradas y no
+    con la resolución de la imagen.
+
+    Args:
+        max_faces (int): Rostros máximos (por defecto, el de FACE_MESH_CONFIG)
+
+    Returns:
+        dict: Parámetros de FaceMesh, con "modo": "roi" si corresponde
+    """
+    max_faces = max_faces or FACE_MESH_CONFIG["max_num_faces"]
+    config = {**FACE_MESH_CONFIG, "max_num_faces": max_faces}
+    if max_faces >= ROI_MIN_FACES:
+        config["modo"] = "roi"
+    return config
+
+
+def detector_backend(backend=None):
+    """
+    Backend de detección efectivo: el indicado, FACE_BACKEND del entorno o DETECTOR_BACKEND.
+
+    Returns:
+        str: "legacy" o "tasks"
+    """
+    backend = backend or os.environ.get("FACE_BACKEND") or DETECTOR_BACKEND
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Backend de detección desconocido: {backend}")
+    return backend
+
+
+def create_detector(max_faces=None, backend=None, **config):
+    """
+    Crea el detector adecuado para la cantidad máxima de rostros.
+
+    Args:
+        max_faces (int): Rostros máximos por imagen
+        backend (str): "legacy" (FaceMesh) o "tasks" (FaceLandmarker, ver
+            src.landmarker); por defecto, detector_backend()
+        **config: Parámetros que reemplazan a los de FACE_MESH_CONFIG
+
+    Returns:
+        FaceLandmarkDetector: Detector de una etapa, RoiFaceLandmarkDetector
+            o TasksFaceLandmarkDetector
+    """
+    configuracion = {**detector_config(max_faces), **config}
+    if detector_backend(backend) == "tasks":
+        from .landmarker import TasksFaceLandmarkDetector
+        # FaceLandmarker ya detecta varias caras y sigue sus regiones en video
+        configuracion.pop("modo", None)
+        return TasksFaceLandmarkDetector(**configuracion)
+    if configuracion.pop("modo", None) == "roi":
+        from .roi import RoiFaceLandmarkDetector
+        # En video, los recortes se reutilizan entre cuadros consecutivos
+        track = not configuracion.get("static_image_mode", True)
+        return RoiFaceLandmarkDetector(track=track, **configuracion)
+    return FaceLandmarkDetector(**configuracion)
+
+
+class _EntradaPool:
+    """Detector del pool junto con su estado de uso."""
+
+    __slots__ = ("detector", "ultimo_uso", "errores")
+
+    def __init__(self, detector):
+        self.detector = detector
+        self.ultimo_uso = time.monotonic()
+        self.errores = 0
+
+
+class DetectorPool:
+    """
+    Pool de detectores precalentados, seguro entre hilos.
+
+    Cada detector se entrega en exclusiva (checkout) y vuelve al pool al
+    terminar (release), de modo que varias sesiones concurrentes comparten
+    los grafos de MediaPipe sin volver a cargar el modelo en cada petición.
+    """
+
+    def __init__(self, size=DETECTOR_POOL_SIZE, min_idle=DETECTOR_POOL_MIN_IDLE,
+                 idle_timeout=DETECTOR_POOL_IDLE_TIMEOUT,
+                 max_errors=DETECTOR_POOL_MAX_ERRORS, factory=None, warm=True):
+        """
+        Crea el pool y, si se pide, precalienta todos los detectores.
+
+        Args:
+            size (int): Cantidad máxima de detectores vivos
+            min_idle (int): Detectores que se conservan aunque estén inactivos
+            idle_timeout (float): Segundos sin uso antes de liberar un detector
+            max_errors (int): Errores consecutivos antes de descartar un detector
+            factory (callable): Función que crea un detector nuevo
+            warm (bool): Si True, crea y calienta `size` detectores al iniciar
+        """
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1")
+
+        self.size = size
+        self.min_idle = min(min_idle, size)
+        self.idle_timeout = idle_timeout
+        self.max_errors = max_errors
+        self._factory = factory or create_detector
+        self._condicion = threading.Condition()
+        self._libres = []
+        self._en_uso = {}
+        self._creando = 0
+        self._cerrado = False
+        self._retirado = False
+
+        if warm:
+            self.warm()
+
+    def _crear_entrada(self):
+        """Crea y calienta un detector nuevo."""
+        detector = self._factory()
+        detector.warm_up()
+        return _EntradaPool(detector)
+
+    def warm(self):
+        """Crea y calienta detectores hasta completar la capacidad del pool."""
+        with self._condicion:
+            faltan = 0 if self._retirado else self.size - (
+                len(self._libres) + len(self._en_uso) + self._creando)
+            self._creando += faltan
+        for _ in range(faltan):
+            entrada = None
+            try:
+                entrada = self._crear_entrada()
+            finally:
+                with self._condicion:
+                    self._creando -= 1
+                    if entrada is not None:
+                        self._libres.append(entrada)
+                    self._condicion.notify()
+
+    def acquire(self, timeout=None):
+        """
+        Toma un detector del pool, creándolo si hay capacidad libre.
+
+        Args:
+            timeout (float): Segundos máximos de espera (None espera indefinidamente)
+
+        Returns:
+            FaceLandmarkDetector: Detector reservado para uso exclusivo
+
+        Raises:
+            TimeoutError: Si no hubo un detector disponible a tiempo
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+
+        with self._condicion:
+            while True:
+                if self._cerrado:
+                    raise RuntimeError("El pool de detectores está cerrado")
+
+                if self._libres:
+                    # LIFO: se reutiliza el detector usado más recientemente
+                    entrada = self._libres.pop()
+                    self._en_uso[id(entrada.detector)] = entrada
+                    return entrada.detector
+
+                if len(self._en_uso) + self._creando < self.size:
+                    self._creando += 1
+                    break
+
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    raise TimeoutError("No hay detectores disponibles en el pool")
+                self._condicion.wait(restante)
+
+        # La carga del modelo se hace fuera del lock para no bloquear al resto
+        try:
+            entrada = self._crear_entrada()
+        except Exception:
+            with self._condicion:
+                self._creando -= 1
+                self._condicion.notify()
+            raise
+
+        with self._condicion:
+            self._creando -= 1
+            self._en_uso[id(entrada.detector)] = entrada
+        return entrada.detector
+
+    def release(self, detector, healthy=True):
+        """
+        Devuelve un detector al pool.
+
+        Args:
+            detector (FaceLandmarkDetector): Detector obtenido con acquire()
+            healthy (bool): False si la última detección falló
+        """
+        descartar = []
+
+        with self._condicion:
+            entrada = self._en_uso.pop(id(detector), None)
+            if entrada is None:
+                raise ValueError("El detector no pertenece a este pool")
+
+            entrada.ultimo_uso = time.monotonic()
+            entrada.errores = 0 if healthy else entrada.errores + 1
+
+            if self._cerrado or self._retirado or entrada.errores >= self.max_errors:
+                descartar.append(entrada)
+            else:
+                self._libres.append(entrada)
+
+            descartar.extend(self._extraer_inactivos())
+            self._condicion.notify()
+
+        for entrada in descartar:
+            entrada.detector.close()
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Context manager que reserva un detector y lo devuelve al salir.
+
+        Si el bloque lanza una excepción, el detector se marca como no sano.
+
+        Args:
+            timeout (float): Segundos máximos de espera por un detector
+
+        Yields:
+            FaceLandmarkDetector: Detector reservado
+        """
+        detector = self.acquire(timeout)
+        try:
+            yield detector
+        except Exception:
+            self.release(detector, healthy=False)
+            raise
+        self.release(detector)
+
+    def _extraer_inactivos(self):
+        """Quita del pool los detectores libres que superaron el tiempo de inactividad."""
+        if self.idle_timeout is None:
+            return []
+
+        limite = time.monotonic() - self.idle_timeout
+        conservar = []
+        inactivos = []
+
+        # _libres está ordenado del más antiguo al más reciente
+        for indice, entrada in enumerate(self._libres):
+            restantes = len(self._libres) - indice - 1
+            if entrada.ultimo_uso < limite and len(conservar) + restantes >= self.min_idle:
+                inactivos.append(entrada)
+            else:
+                conservar.append(entrada)
+
+        self._libres = conservar
+        return inactivos
+
+    def evict_idle(self):
+        """
+        Libera los detectores inactivos por más de `idle_timeout` segundos.
+
+        Returns:
+            int: Cantidad de detectores liberados
+        """
+        with self._condicion:
+            inactivos = self._extraer_inactivos()
+        for entrada in inactivos:
+            entrada.detector.close()
+        return len(inactivos)
+
+    def stats(self):
+        """
+        Devuelve el estado actual del pool.
+
+        Returns:
+            dict: Detectores libres, en uso y capacidad máxima
+        """
+        with self._condicion:
+            return {
+                "libres": len(self._libres),
+                "en_uso": len(self._en_uso),
+                "capacidad": self.size
+            }
+
+    def retire(self):
+        """
+        Libera los detectores libres sin dejar de atender pedidos.
+
+        Los detectores en uso se cierran al devolverse y los que se pidan
+        después se crean y se cierran en cada uso: quien todavía tenga una
+        referencia al pool puede seguir usándolo, pero el pool ya no
+        retiene memoria mientras nadie lo use.
+        """
+        with self._condicion:
+            self._retirado = True
+            libres, self._libres = self._libres, []
+        for entrada in libres:
+            entrada.detector.close()
+
+    def close(self):
+        """Cierra todos los detectores libres; los que estén en uso se cierran al devolverse."""
+        with self._condicion:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+            self._condicion.notify_all()
+        for entrada in libres:
+            entrada.detector.close()
+
+
+_pools = OrderedDict()
+_pool_lock = threading.Lock()
+
+
+def _cerrar_pools():
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(_cerrar_pools)
+
+
+def get_detector_pool(size=None, max_faces=None):
+    """
+    Devuelve el pool de detectores compartido por todo el proceso.
+
+    La primera llamada para cada cantidad de rostros crea y precalienta su
+    pool; las siguientes reutilizan la misma instancia, incluso desde
+    distintas sesiones de Streamlit. Se mantienen a lo sumo
+    DETECTOR_POOL_MAX_CONFIGS pools: al crear otro se retira el usado hace
+    más tiempo (ver DetectorPool.retire), que sigue sirviendo a quien ya lo
+    tenía pero deja de retener detectores. El precalentamiento ocurre fuera
+    del lock global, así una configuración nueva no demora a las demás.
+
+    Args:
+        size (int): Tamaño del pool (solo se usa al crearlo)
+        max_faces (int): Rostros máximos por imagen (ver create_detector)
+
+    Returns:
+        DetectorPool: Pool compartido
+    """
+    max_faces = max_faces or FACE_MESH_CONFIG["max_num_faces"]
+    descartados = []
+
+    with _pool_lock:
+        pool = _pools.get(max_faces)
+        if pool is not None:
+            _pools.move_to_end(max_faces)
+            return pool
+
+        pool = DetectorPool(size=size or DETECTOR_POOL_SIZE,
+                            factory=lambda: create_detector(max_faces), warm=False)
+        _pools[max_faces] = pool
+        while len(_pools) > DETECTOR_POOL_MAX_CONFIGS:
+            descartados.append(_pools.popitem(last=False)[1])
+
+    for viejo in descartados:
+        viejo.retire()
+    # Quien pida este mismo pool mientras tanto crea su detector bajo demanda
+    pool.warm()
+    return pool
@@ -0,0 +1,208 @@
+"""
+Medidas geométricas del rostro calculadas sobre lotes de landmarks.
+
+Todas las funciones reciben arrays (rostros, 478, 3) en píxeles, como
+landmarks["pixeles"] de FaceLandmarkDetector.detect, y operan sobre todo el
+lote a la vez: no hay bucles de Python por rostro. Las medidas de iris
+requieren los 478 puntos de refine_landmarks=True.
+"""
+import numpy as np
+
+# Ojos en el orden de la fórmula EAR: comisura, párpado superior (2),
+# comisura opuesta, párpado inferior (2). "Derecho" es el del sujeto.
+OJO_DERECHO = np.array([33, 160, 158, 133, 153, 144])
+OJO_IZQUIERDO = np.array([362, 385, 387, 263, 373, 380])
+OJOS = np.stack([OJO_DERECHO, OJO_IZQUIERDO])
+
+# Boca: labio interno superior e inferior, comisuras
+BOCA_VERTICAL = np.array([13, 14])
+BOCA_HORIZONTAL = np.array([61, 291])
+
+# Iris (solo con refine_landmarks=True): centro y contorno
+IRIS_DERECHO = np.arange(468, 473)
+IRIS_IZQUIERDO = np.arange(473, 478)
+CENTROS_IRIS = np.array([468, 473])
+
+# Por ojo: comisura externa, comisura interna, párpado superior, párpado inferior
+BORDES_OJOS = np.array([[33, 133, 159, 145], [263, 362, 386, 374]])
+
+# Modelo 3D genérico para la pose (mm; x a la derecha de la imagen, y hacia
+# arriba, z hacia la cámara): punta de la nariz, mentón, comisuras externas
+# de los ojos y comisuras de la boca
+POSE_INDICES = np.array([1, 152, 33, 263, 61, 291])
+POSE_MODELO = np.array([
+    [0.0, 0.0, 0.0],
+    [0.0, -330.0, -65.0],
+    [-225.0, 170.0, -135.0],
+    [225.0, 170.0, -135.0],
+    [-150.0, -150.0, -125.0],
+    [150.0, -150.0, -125.0],
+])
+
+
+def _distancia(points, a, b):
+    """Distancia euclídea (x, y) entre dos conjuntos de índices, para todo el lote."""
+    return np.linalg.norm(points[:, a, :2] - points[:, b, :2], axis=-1)
+
+
+def _requiere_iris(points):
+    if points.shape[1] < 478:
+        raise ValueError("Las medidas de iris requieren refine_landmarks=True (478 puntos)")
+
+
+def eye_aspect_ratio(points):
+    """
+    Relación de aspecto de cada ojo (EAR): cerca de 0.3 abierto, cerca de 0 cerrado.
+
+    Args:
+        points (numpy.ndarray): Landmarks en píxeles (rostros, 468 o 478, 3)
+
+    Returns:
+        numpy.ndarray: (rostros, 2) con el ojo derecho e izquierdo del sujeto
+    """
+    ojos = points[:, OJOS, :2]  # (rostros, 2, 6, 2)
+    vertical = (np.linalg.norm(ojos[:, :, 1] - ojos[:, :, 5], axis=-1)
+                + np.linalg.norm(ojos[:, :, 2] - ojos[:, :, 4], axis=-1))
+    horizontal = np.linalg.norm(ojos[:, :, 0] - ojos[:, :, 3], axis=-1)
+    return vertical / (2 * horizontal)
+
+
+def mouth_aspect_ratio(points):
+    """
+    Apertura de la boca: distancia entre labios internos sobre el ancho de la boca.
+
+    Args:
+        points (numpy.ndarray): Landmarks en píxeles (rostros, 468 o 478, 3)
+
+    Returns:
+        numpy.ndarray: (rostros,)
+    """
+    return (_distancia(points, *BOCA_VERTICAL) / _distancia(points, *BOCA_HORIZONTAL))
+
+
+def interocular_distance(points):
+    """
+    Distancia entre los centros de ambos iris, en las unidades de entrada.
+
+    Args:
+        points (numpy.ndarray): Landmarks (rostros, 478, 3)
+
+    Returns:
+        numpy.ndarray: (rostros,)
+    """
+    _requiere_iris(points)
+    return _distancia(points, *CENTROS_IRIS)
+
+
+def iris_position(points):
+    """
+    Posición de cada iris dentro de su ojo.
+
+    La componente horizontal va de 0 (comisura externa) a 1 (comisura
+    interna) y la vertical de 0 (párpado superior) a 1 (párpado inferior);
+    0.5 es la mirada al centro.
+
+    Args:
+        points (numpy.ndarray): Landmarks (rostros, 478, 3)
+
+    Returns:
+        numpy.ndarray: (rostros, 2 ojos, 2) con (horizontal, vertical)
+    """
+    _requiere_iris(points)
+    centros = points[:, CENTROS_IRIS, :2]  # (rostros, 2, 2)
+    bordes = points[:, BORDES_OJOS, :2]  # (rostros, 2, 4, 2)
+
+    posicion = np.empty(centros.shape, dtype=np.float64)
+    for eje, (inicio, fin) in enumerate(((0, 1), (2, 3))):
+        a, b = bordes[:, :, inicio], bordes[:, :, fin]
+        direccion = b - a
+        # Proyección del centro del iris sobre el segmento de bordes
+        posicion[..., eje] = (np.einsum("ijk,ijk->ij", centros - a, direccion)
+                              / np.einsum("ijk,ijk->ij", direccion, direccion))
+    return posicion
+
+
+def batch_rotation(source, target):
+    """
+    Rotaciones que mejor llevan cada forma de origen a su destino (Kabsch por lotes).
+
+    Args:
+        source (numpy.ndarray): Puntos centrados (puntos, 3), comunes a todo el
+            lote, o (formas, puntos, 3)
+        target (numpy.ndarray): Puntos centrados (formas, puntos, 3)
+
+    Returns:
+        numpy.ndarray: (formas, 3, 3) con R @ origen ≈ destino para cada forma
+    """
+    covarianza = np.matmul(np.swapaxes(source, -1, -2), target)
+    u, _, vt = np.linalg.svd(covarianza)
+    # Corrige reflexiones para que el resultado sea una rotación propia
+    signo = np.sign(np.linalg.det(np.matmul(u, vt)))
+    correccion = np.ones(signo.shape + (3,), dtype=covarianza.dtype)
+    correccion[:, 2] = signo
+    return np.einsum("nji,nj,nkj->nik", vt, correccion, u)
+
+
+def head_pose(points):
+    """
+    Estima la orientación de la cabeza alineando un modelo 3D genérico.
+
+    Resuelve para todo el lote, con una SVD por lotes (Kabsch), la rotación
+    que mejor lleva los puntos del modelo a los landmarks. Las coordenadas
+    de FaceMesh son aproximadamente ortográficas (z en la escala de x), así
+    que no hace falta conocer la cámara.
+
+    Args:
+        points (numpy.ndarray): Landmarks en píxeles (rostros, 468 o 478, 3)
+
+    Returns:
+        tuple: (ángulos (rostros, 3) en grados como (yaw, pitch, roll),
+            matrices de rotación (rostros, 3, 3))
+    """
+    # A un sistema con y hacia arriba y z hacia la cámara, como el modelo
+    destino = points[:, POSE_INDICES, :].astype(np.float64) * np.array([1.0, -1.0, -1.0])
+    destino -= destino.mean(axis=1, keepdims=True)
+    rotacion = batch_rotation(POSE_MODELO - POSE_MODELO.mean(axis=0), destino)
+
+    yaw = np.degrees(np.arcsin(np.clip(-rotacion[:, 2, 0], -1.0, 1.0)))
+    pitch = np.degrees(np.arctan2(rotacion[:, 2, 1], rotacion[:, 2, 2]))
+    roll = np.degrees(np.arctan2(rotacion[:, 1, 0], rotacion[:, 0, 0]))
+    return np.stack([yaw, pitch, roll], axis=1), rotacion
+
+
+def extract_features(landmarks, image_size=None):
+    """
+    Calcula todas las medidas para un lote de rostros.
+
+    Args:
+        landmarks: Diccionario devuelto por detect() (se usa "pixeles", o
+            "normalizados" junto con image_size), o un array (rostros, 478, 3)
+        image_size (tuple o numpy.ndarray): (ancho, alto) de la imagen, o
+            (rostros, 2) con el de cada rostro, para convertir landmarks
+            normalizados (por ejemplo, los de src.batch) a píxeles
+
+    Returns:
+        dict: Arrays con un rostro por fila: "apertura_ojos" (rostros, 2),
+            "apertura_boca", "distancia_interocular", "posicion_iris"
+            (rostros, 2, 2), "orientacion" (rostros, 3) con yaw, pitch y
+            roll en grados
+    """
+    if isinstance(landmarks, dict):
+        landmarks = (landmarks["normalizados"] if image_size is not None
+                     else landmarks["pixeles"])
+    puntos = np.asarray(landmarks)
+    if image_size is not None:
+        ancho, alto = np.asarray(image_size, dtype=np.float64).T
+        escala = np.stack([ancho, alto, ancho], axis=-1).reshape(-1, 1, 3)
+        puntos = puntos * escala
+
+    orientacion, _ = head_pose(puntos)
+    medidas = {
+        "apertura_ojos": eye_aspect_ratio(puntos),
+        "apertura_boca": mouth_aspect_ratio(puntos),
+        "orientacion": orientacion,
+    }
+    if puntos.shape[1] >= 478:
+        medidas["distancia_interocular"] = interocular_distance(puntos)
+        medidas["posicion_iris"] = iris_position(puntos)
+    return medidas
@@ -0,0 +1,335 @@
+"""
+Backend de detección sobre FaceLandmarker de MediaPipe Tasks.
+
+Reemplaza a mp.solutions.face_mesh detrás del mismo contrato de detect() y
+agrega lo que la API anterior no expone:
+
+- Modos IMAGE, VIDEO (con marcas de tiempo propias) y LIVE_STREAM, en el que
+  MediaPipe procesa en su propio hilo y entrega resultados por callback
+  (LiveStreamWorker lo conecta al modo cámara).
+- Hilos de CPU de XNNPACK configurables por detector.
+- Blendshapes y matrices de transformación en la misma pasada.
+
+El modelo (.task) no viene con mediapipe; ver TASKS_MODEL_PATH y
+TASKS_MODEL_URL en src/config.py. Se elige con create_detector(backend="tasks"),
+DETECTOR_BACKEND o FACE_BACKEND=tasks en el entorno.
+"""
+import dataclasses
+import os
+import threading
+import time
+from collections import deque
+
+import mediapipe as mp
+import numpy as np
+from mediapipe.tasks.python import BaseOptions, vision
+
+from .config import (
+    FACE_MESH_CONFIG, TOTAL_LANDMARKS, REALTIME_LATENCY_WINDOW, TASKS_MODEL_PATH,
+    TASKS_MODEL_URL, TASKS_NUM_THREADS, TASKS_BLENDSHAPES, TASKS_TRANSFORMATION_MATRICES,
+    TASKS_MIN_PRESENCE_CONFIDENCE
+)
+from .detector import FaceLandmarkDetector, detection_info, detector_config
+
+RUNNING_MODES = {
+    "image": vision.RunningMode.IMAGE,
+    "video": vision.RunningMode.VIDEO,
+    "live_stream": vision.RunningMode.LIVE_STREAM,
+}
+LANDMARKS_WITHOUT_IRIS = 468
+BLENDSHAPES = 52
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def model_path(path=TASKS_MODEL_PATH):
+    """
+    Ruta absoluta del modelo de FaceLandmarker.
+
+    Args:
+        path (str): Ruta absoluta o relativa a la raíz del proyecto
+
+    Returns:
+        str: Ruta existente
+
+    Raises:
+        FileNotFoundError: Si el modelo no está descargado
+    """
+    ruta = path if os.path.isabs(path) else os.path.join(_RAIZ, path)
+    if not os.path.isfile(ruta):
+        raise FileNotFoundError(
+            f"No se encontró el modelo de FaceLandmarker en {ruta}. "
+            f"Descargarlo de {TASKS_MODEL_URL} o indicar otra ruta en TASKS_MODEL_PATH"
+        )
+    return ruta
+
+
+@dataclasses.dataclass
+class _Opciones(vision.FaceLandmarkerOptions):
+    """FaceLandmarkerOptions con los hilos de XNNPACK y el umbral de presencia aplicados."""
+
+    num_threads: int = 0
+
+    def to_pb2(self):
+        opciones = super().to_pb2()
+        if self.num_threads:
+            opciones.base_options.acceleration.xnnpack.num_threads = self.num_threads
+        # mediapipe 0.10.14 no traslada min_face_presence_confidence al grafo
+        opciones.face_landmarks_detector_graph_options.min_detection_confidence = (
+            self.min_face_presence_confidence)
+        return opciones
+
+
+class TasksFaceLandmarkDetector(FaceLandmarkDetector):
+    """
+    FaceLandmarkDetector sobre FaceLandmarker de MediaPipe Tasks.
+
+    En modos "image" y "video" cumple el contrato de detect(); en modo
+    "live_stream", las imágenes se envían con detect_async() y los
+    resultados llegan a result_callback desde el hilo de MediaPipe.
+    """
+
+    backend = "tasks"
+
+    def __init__(self, running_mode=None, num_threads=TASKS_NUM_THREADS,
+                 blendshapes=TASKS_BLENDSHAPES,
+                 transformation_matrices=TASKS_TRANSFORMATION_MATRICES,
+                 model=TASKS_MODEL_PATH, result_callback=None, **config):
+        """
+        Args:
+            running_mode (str): "image", "video" o "live_stream"; por defecto,
+                "image" si static_image_mode y "video" si no
+            num_threads (int): Hilos de CPU de XNNPACK (0 = los de MediaPipe)
+            blendshapes (bool): Agregar landmarks["blendshapes"] (rostros, 52)
+            transformation_matrices (bool): Agregar landmarks["matrices"]
+                (rostros, 4, 4)
+            model (str): Ruta del modelo .task (ver model_path)
+            result_callback (callable): En modo "live_stream", recibe
+                (landmarks, info, marca_ms) por cada imagen procesada
+            **config: Parámetros que reemplazan a los de FACE_MESH_CONFIG;
+                sin refine_landmarks se devuelven 468 puntos, como FaceMesh
+        """
+        self.config = {**FACE_MESH_CONFIG, **config}
+        if running_mode is None:
+            running_mode = "image" if self.config["static_image_mode"] else "video"
+        if running_mode not in RUNNING_MODES:
+            raise ValueError(f"Modo de ejecución no soportado: {running_mode}")
+        if (running_mode == "live_stream") != (result_callback is not None):
+            raise ValueError("result_callback se usa si y solo si el modo es live_stream")
+
+        self.running_mode = running_mode
+        self.blendshapes = blendshapes
+        self.transformation_matrices = transformation_matrices
+        self.blendshape_names = None
+        self._callback = result_callback
+        self._puntos = (TOTAL_LANDMARKS if self.config["refine_landmarks"]
+                        else LANDMARKS_WITHOUT_IRIS)
+        self._ultima_marca = -1
+        self._lock_marca = threading.Lock()
+
+        opciones = _Opciones(
+            base_options=BaseOptions(model_asset_path=model_path(model)),
+            running_mode=RUNNING_MODES[running_mode],
+            num_faces=self.config["max_num_faces"],
+            min_face_detection_confidence=self.config["min_detection_confidence"],
+            min_face_presence_confidence=self.config.get("min_presence_confidence",
+                                                         TASKS_MIN_PRESENCE_CONFIDENCE),
+            min_tracking_confidence=self.config["min_tracking_confidence"],
+            output_face_blendshapes=blendshapes,
+            output_facial_transformation_matrixes=transformation_matrices,
+            result_callback=self._al_resultado if result_callback else None,
+            num_threads=num_threads,
+        )
+        self.landmarker = vision.FaceLandmarker.create_from_options(opciones)
+
+    def next_timestamp(self):
+        """
+        Marca de tiempo en ms para el próximo cuadro de video o live_stream.
+
+        MediaPipe exige marcas estrictamente crecientes: se usa el reloj
+        monotónico y, si dos cuadros caen en el mismo milisegundo, se avanza uno.
+        """
+        with self._lock_marca:
+            self._ultima_marca = max(self._ultima_marca + 1, int(time.monotonic() * 1000))
+            return self._ultima_marca
+
+    def _a_arrays(self, resultado, width, height):
+        """Convierte un FaceLandmarkerResult a los arrays de detect()."""
+        if resultado.face_landmarks:
+            normalizados = np.array(
+                [[(punto.x, punto.y, punto.z) for punto in rostro[:self._puntos]]
+                 for rostro in resultado.face_landmarks],
+                dtype=np.float32
+            )
+        else:
+            normalizados = np.empty((0, self._puntos, 3), dtype=np.float32)
+        # MediaPipe expresa z en la misma escala que x
+        landmarks = {
+            "normalizados": normalizados,
+            "pixeles": normalizados * np.array([width, height, width], dtype=np.float32),
+        }
+
+        if self.blendshapes:
+            if resultado.face_blendshapes and self.blendshape_names is None:
+                self.blendshape_names = tuple(categoria.category_name
+                                              for categoria in resultado.face_blendshapes[0])
+            landmarks["blendshapes"] = np.array(
+                [[categoria.score for categoria in rostro]
+                 for rostro in resultado.face_blendshapes],
+                dtype=np.float32
+            ).reshape(-1, BLENDSHAPES)
+        if self.transformation_matrices:
+            landmarks["matrices"] = np.array(
+                resultado.facial_transformation_matrixes, dtype=np.float32
+            ).reshape(-1, 4, 4)
+        return landmarks
+
+    def _infer(self, image_rgb, timer=None):
+        """Ejecuta FaceLandmarker en modo "image" o "video"."""
+        imagen = mp.Image(image_format=mp.ImageFormat.SRGB,
+                          data=np.ascontiguousarray(image_rgb))
+        if self.running_mode == "image":
+            resultado = self.landmarker.detect(imagen)
+        elif self.running_mode == "video":
+            resultado = self.landmarker.detect_for_video(imagen, self.next_timestamp())
+        else:
+            raise RuntimeError("En modo live_stream, usar detect_async()")
+        if timer:
+            timer.lap("inferencia")
+
+        alto, ancho = image_rgb.shape[:2]
+        landmarks = self._a_arrays(resultado, ancho, alto)
+        if timer:
+            timer.lap("landmarks_a_numpy")
+        return landmarks
+
+    def detect_async(self, image_rgb, timestamp_ms=None):
+        """
+        Envía una imagen en modo "live_stream" sin esperar el resultado.
+
+        Si MediaPipe todavía está procesando la anterior, descarta esta y
+        no se llama a result_callback.
+
+        Args:
+            image_rgb (numpy.ndarray): Imagen RGB
+            timestamp_ms (int): Marca del cuadro (por defecto, next_timestamp())
+
+        Returns:
+            int: Marca de tiempo usada, la que recibirá result_callback
+        """
+        if timestamp_ms is None:
+            timestamp_ms = self.next_timestamp()
+        imagen = mp.Image(image_format=mp.ImageFormat.SRGB,
+                          data=np.ascontiguousarray(image_rgb))
+        self.landmarker.detect_async(imagen, timestamp_ms)
+        return timestamp_ms
+
+    def _al_resultado(self, resultado, imagen, marca_ms):
+        """Callback de MediaPipe en modo "live_stream"."""
+        landmarks = self._a_arrays(resultado, imagen.width, imagen.height)
+        self._callback(landmarks, detection_info(landmarks), marca_ms)
+
+    def warm_up(self):
+        """Como FaceLandmarkDetector.warm_up; en "live_stream" no hace nada."""
+        if self.running_mode != "live_stream":
+            super().warm_up()
+
+    def close(self):
+        """Libera el grafo de MediaPipe."""
+        self.landmarker.close()
+
+
+class LiveStreamWorker:
+    """
+    Inferencia del modo cámara con FaceLandmarker en modo LIVE_STREAM.
+
+    Misma interfaz que realtime.LatestFrameWorker, pero sin hilo propio:
+    MediaPipe procesa en su grafo y el callback publica el resultado más
+    reciente. Se envía un cuadro por vez: los que llegan mientras hay uno en
+    curso se descartan aquí, porque detect_async() retiene el GIL mientras
+    espera lugar en el grafo y el callback lo necesita para liberarlo.
+    """
+
+    def __init__(self, max_faces=None, latency_window=REALTIME_LATENCY_WINDOW, **config):
+        """
+        Args:
+            max_faces (int): Rostros máximos por cuadro
+            latency_window (int): Cuadros usados para calcular percentiles
+            **config: Parámetros de TasksFaceLandmarkDetector
+        """
+        self._lock = threading.Lock()
+        self._en_curso = None
+        self._resultado = None
+        self.recibidos = 0
+        self.procesados = 0
+        self.descartados = 0
+        self._latencias = deque(maxlen=latency_window)
+        configuracion = {**detector_config(max_faces), **config}
+        configuracion.pop("modo", None)
+        self.detector = TasksFaceLandmarkDetector(running_mode="live_stream",
+                                                  result_callback=self._al_resultado,
+                                                  **configuracion)
+
+    def submit(self, image_rgb):
+        """
+        Entrega un cuadro a MediaPipe sin bloquear (se descarta si hay otro en curso).
+
+        Args:
+            image_rgb (numpy.ndarray): Cuadro RGB
+        """
+        with self._lock:
+            self.recibidos += 1
+            if self._en_curso is not None:
+                self.descartados += 1
+                return
+            marca = self.detector.next_timestamp()
+            self._en_curso = (marca, time.perf_counter())
+        try:
+            self.detector.detect_async(image_rgb, marca)
+        except Exception:
+            # Sin esto, el cuadro quedaría "en curso" y se descartarían todos los siguientes
+            with self._lock:
+                self._en_curso = None
+            raise
+
+    def _al_resultado(self, landmarks, info, marca):
+        fin = time.perf_counter()
+        with self._lock:
+            _, llegada = self._en_curso or (marca, fin)
+            self._en_curso = None
+            latencia_ms = (fin - llegada) * 1000
+            # La inferencia corre en el grafo: su duración no se ve por separado
+            info["inferencia_ms"] = info["latencia_ms"] = latencia_ms
+            self._resultado = (landmarks, info)
+            self.procesados += 1
+            self._latencias.append(latencia_ms)
+
+    def latest(self):
+        """
+        Devuelve el resultado más reciente disponible.
+
+        Returns:
+            tuple: (landmarks, info) como en FaceLandmarkDetector.detect,
+                o None si todavía no hay resultados
+        """
+        with self._lock:
+            return self._resultado
+
+    def stats(self):
+        """Mismos contadores que LatestFrameWorker.stats."""
+        with self._lock:
+            latencias = list(self._latencias)
+            recibidos = self.recibidos
+            return {
+                "cuadros_recibidos": recibidos,
+                "cuadros_procesados": self.procesados,
+                "cuadros_descartados": self.descartados,
+                "tasa_descarte": self.descartados / recibidos if recibidos else 0.0,
+                "latencia_ms_ultima": latencias[-1] if latencias else None,
+                "latencia_ms_p50": float(np.percentile(latencias, 50)) if latencias else None,
+                "latencia_ms_p95": float(np.percentile(latencias, 95)) if latencias else None,
+            }
+
+    def close(self):
+        """Cierra el grafo (espera los cuadros en curso)."""
+        self.detector.close()
@@ -0,0 +1,316 @@
+"""
+Prueba de carga sintética del modo cámara (FaceMeshTransformer.recv).
+
+Uso:
+    python -m src.loadtest --sessions 1 2 4 8 --fps 30 --duration 15
+    python -m src.loadtest --image rostro.jpg --pool --workers 4 --json carga.json
+    python -m src.loadtest --video grabacion.mp4 --sync
+
+Cada sesión es un hilo que entrega av.VideoFrame a su propio
+FaceMeshTransformer al ritmo de una cámara, como hace streamlit-webrtc: si
+recv() tarda más que un cuadro, los cuadros que vencieron mientras tanto se
+descartan. Para cada cantidad de sesiones informa latencia de recv(), fps
+logrados, cuadros descartados y tardíos, y CPU y RSS por sesión, y al final
+la mayor cantidad de sesiones que sostuvo los fps pedidos.
+
+Sin --image ni --video se anima la cara de referencia (assets/rostro.jpg),
+como en la medición de perfiles; para planificar capacidad conviene una
+grabación real.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .benchmark import peak_rss_mb
+from .config import (
+    LOADTEST_RESOLUTION, LOADTEST_FPS, LOADTEST_DURATION, LOADTEST_SESSIONS,
+    LOADTEST_FPS_TOLERANCE, LOADTEST_MAX_DROP_RATE, SAMPLE_FACE_IMAGE
+)
+
+
+def make_frames(width, height, count=60, image=None, video=None):
+    """
+    Prepara los cuadros que se repiten en bucle durante la prueba.
+
+    Args:
+        width (int): Ancho de los cuadros
+        height (int): Alto de los cuadros
+        count (int): Cantidad de cuadros distintos
+        image (str): Imagen a animar con un desplazamiento horizontal (por
+            defecto, la cara de referencia de utils.sample_face)
+        video (str): Video grabado del que se toman los primeros cuadros
+
+    Returns:
+        list: av.VideoFrame BGR, listos para recv()
+    """
+    import av
+
+    if video:
+        captura = cv2.VideoCapture(video)
+        cuadros = []
+        while len(cuadros) < count:
+            ok, cuadro = captura.read()
+            if not ok:
+                break
+            cuadros.append(cv2.resize(cuadro, (width, height), interpolation=cv2.INTER_AREA))
+        captura.release()
+        if not cuadros:
+            raise ValueError(f"No se pudieron leer cuadros de {video}")
+    else:
+        if image:
+            base = cv2.imread(image)
+            if base is None:
+                raise ValueError(f"No se pudo leer la imagen: {image}")
+            base = cv2.resize(base, (width, height), interpolation=cv2.INTER_AREA)
+        else:
+            from .utils import sample_face
+            base = sample_face(width, height)
+            if base is None:
+                raise FileNotFoundError(
+                    f"No se encontró la cara de referencia {SAMPLE_FACE_IMAGE}")
+        # Un vaivén suave para que la compuerta de cuadros no los descarte todos
+        desplazamientos = (np.sin(np.linspace(0, 2 * np.pi, count)) * width * 0.03).astype(int)
+        cuadros = [np.roll(base, int(d), axis=1) for d in desplazamientos]
+
+    return [av.VideoFrame.from_ndarray(np.ascontiguousarray(c), format="bgr24")
+            for c in cuadros]
+
+
+def _rss_mb(pids=()):
+    """
+    RSS actual en MB de este proceso y los procesos indicados.
+
+    Como en _cpu_seconds, los procesos externos se leen de /proc; si la
+    plataforma no informa el RSS actual, se usa el pico de este proceso.
+    """
+    try:
+        with open("/proc/self/statm") as archivo:
+            paginas = int(archivo.read().split()[1])
+    except OSError:
+        return peak_rss_mb()
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/statm") as archivo:
+                paginas += int(archivo.read().split()[1])
+        except OSError:
+            pass
+    return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _cpu_seconds(pids=()):
+    """
+    CPU consumida (usuario + sistema) por este proceso y los procesos indicados.
+
+    Los procesos externos se leen de /proc; en otras plataformas solo se
+    cuenta este proceso.
+    """
+    tiempos = os.times()
+    total = tiempos.user + tiempos.system
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as archivo:
+                campos = archivo.read().rsplit(")", 1)[1].split()
+            total += (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+        except OSError:
+            pass
+    return total
+
+
+def _percentiles(valores):
+    if not valores:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def _run_session(transformer, frames, fps, duration, inicio, resultado):
+    """Entrega cuadros a un transformer al ritmo de una cámara (un hilo por sesión)."""
+    intervalo = 1.0 / fps
+    latencias = []
+    entregados = descartados = tardios = 0
+    cpu_inicio = time.thread_time()
+    indice = 0
+    while indice * intervalo < duration:
+        programado = inicio + indice * intervalo
+        ahora = time.perf_counter()
+        if ahora < programado:
+            time.sleep(programado - ahora)
+        elif ahora - programado >= intervalo:
+            # La cámara no espera: los cuadros vencidos se pierden
+            vencidos = int((ahora - programado) / intervalo)
+            descartados += vencidos
+            indice += vencidos
+            continue
+
+        comienzo = time.perf_counter()
+        transformer.recv(frames[indice % len(frames)])
+        latencia = time.perf_counter() - comienzo
+        latencias.append(latencia * 1000)
+        entregados += 1
+        tardios += latencia > intervalo
+        indice += 1
+
+    total = entregados + descartados
+    resultado.update({
+        **_percentiles(latencias),
+        "cuadros": total,
+        "entregados": entregados,
+        "descartados": descartados,
+        "tardios": tardios,
+        "fps": entregados / duration,
+        "cpu_hilo_s": time.thread_time() - cpu_inicio,
+    })
+
+
+def run_load(factory, sessions, frames, fps=LOADTEST_FPS, duration=LOADTEST_DURATION,
+             pids=()):
+    """
+    Ejecuta una cantidad de sesiones concurrentes y mide su rendimiento.
+
+    Args:
+        factory (callable): Crea un FaceMeshTransformer por sesión
+        sessions (int): Sesiones concurrentes
+        frames (list): Cuadros de make_frames
+        fps (int): Cuadros por segundo de cada sesión
+        duration (float): Segundos de prueba
+        pids (list): Procesos adicionales cuya CPU y RSS se suman (p. ej. del
+            pool compartido)
+
+    Returns:
+        dict: "sesiones" (resultado de cada una, con sus stats() del
+            transformer) y los agregados: "fps_min", "p95_ms", "tasa_tardios",
+            "tasa_descarte_inferencia", "cpu_pct_por_sesion", "rss_mb_por_sesion"
+    """
+    rss_inicio = _rss_mb(pids)
+    transformers = [factory() for _ in range(sessions)]
+    # Un cuadro por sesión fuera de la medición: inicializa grafos y buffers
+    for transformer in transformers:
+        transformer.recv(frames[0])
+
+    resultados = [{} for _ in range(sessions)]
+    cpu_inicio, reloj_inicio = _cpu_seconds(pids), time.perf_counter()
+    inicio = reloj_inicio + 0.05
+    hilos = [threading.Thread(target=_run_session, name=f"carga-{i}",
+                              args=(t, frames, fps, duration, inicio, r))
+             for i, (t, r) in enumerate(zip(transformers, resultados))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.perf_counter() - reloj_inicio
+    cpu = _cpu_seconds(pids) - cpu_inicio
+    rss = _rss_mb(pids)
+
+    for transformer, resultado in zip(transformers, resultados):
+        resultado["stats"] = transformer.stats()
+        transformer.on_ended()
+
+    cuadros = sum(r["cuadros"] for r in resultados)
+    descartes = [r["stats"]["tasa_descarte"] for r in resultados
+                 if "tasa_descarte" in r["stats"]]
+    return {
+        "sesiones": resultados,
+        "fps_min": min(r["fps"] for r in resultados),
+        "p95_ms": max(r["p95_ms"] or 0.0 for r in resultados),
+        "tasa_tardios": sum(r["tardios"] + r["descartados"] for r in resultados) / cuadros,
+        "tasa_descarte_inferencia": max(descartes) if descartes else 0.0,
+        "cpu_pct_por_sesion": cpu / transcurrido / sessions * 100,
+        "rss_mb_por_sesion": (rss - rss_inicio) / sessions if rss and rss_inicio else None,
+    }
+
+
+def sustains(resultado, fps, tolerance=LOADTEST_FPS_TOLERANCE,
+             max_drop_rate=LOADTEST_MAX_DROP_RATE):
+    """
+    Indica si una corrida sostuvo los fps pedidos en todas las sesiones.
+
+    Exige que la sesión más lenta logre al menos fps * (1 - tolerance), que
+    los cuadros tardíos o perdidos no superen tolerance y, en modo
+    asíncrono, que la inferencia no descarte más de max_drop_rate cuadros.
+    """
+    return (resultado["fps_min"] >= fps * (1 - tolerance)
+            and resultado["tasa_tardios"] <= tolerance
+            and resultado["tasa_descarte_inferencia"] <= max_drop_rate)
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Prueba de carga del modo cámara con sesiones sintéticas."
+    )
+    parser.add_argument("--sessions", nargs="+", type=int, default=list(LOADTEST_SESSIONS),
+                        help="Cantidades de sesiones concurrentes a probar")
+    parser.add_argument("--fps", type=int, default=LOADTEST_FPS)
+    parser.add_argument("--duration", type=float, default=LOADTEST_DURATION,
+                        help="Segundos por cada cantidad de sesiones")
+    parser.add_argument("--resolution", default="x".join(map(str, LOADTEST_RESOLUTION)),
+                        help="Tamaño de los cuadros, p. ej. 1280x720")
+    fuente = parser.add_mutually_exclusive_group()
+    fuente.add_argument("--image", default=None, help="Imagen con un rostro a animar")
+    fuente.add_argument("--video", default=None, help="Video grabado a repetir")
+    parser.add_argument("--sync", action="store_true", help="Inferencia dentro de recv()")
+    parser.add_argument("--pool", action="store_true",
+                        help="Usar el pool de inferencia compartido (src.serving)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos del pool compartido")
+    parser.add_argument("--profile", default=None, help="Perfil de rendimiento fijo")
+    parser.add_argument("--keep-going", action="store_true",
+                        help="Seguir probando después de la primera cantidad no sostenida")
+    parser.add_argument("--json", default=None, help="Guardar los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    from .benchmark import _parse_resolution
+    from .realtime import FaceMeshTransformer
+
+    ancho, alto = _parse_resolution(args.resolution)
+    cuadros = make_frames(ancho, alto, image=args.image, video=args.video)
+
+    pool = None
+    if args.pool:
+        from .serving import SharedInferencePool
+        opciones = {"workers": args.workers} if args.workers else {}
+        pool = SharedInferencePool(**opciones)
+        pool.wait_ready()
+
+    def factory():
+        return FaceMeshTransformer(asynchronous=not args.sync, pool=pool, profile=args.profile)
+
+    corridas = {}
+    maximo = 0
+    try:
+        print(f"{'sesiones':>8} {'fps min':>8} {'p95 recv':>9} {'tardíos':>8} "
+              f"{'desc. inf':>9} {'CPU/ses':>8} {'RSS/ses':>8}")
+        for sesiones in sorted(args.sessions):
+            resultado = corridas[sesiones] = run_load(
+                factory, sesiones, cuadros, args.fps, args.duration,
+                pool.worker_pids if pool else ())
+            ok = sustains(resultado, args.fps)
+            rss = resultado["rss_mb_por_sesion"]
+            print(f"{sesiones:>8} {resultado['fps_min']:8.1f} {resultado['p95_ms']:7.1f}ms "
+                  f"{resultado['tasa_tardios'] * 100:7.1f}% "
+                  f"{resultado['tasa_descarte_inferencia'] * 100:8.1f}% "
+                  f"{resultado['cpu_pct_por_sesion']:7.1f}% "
+                  f"{'-' if rss is None else f'{rss:.0f}MB':>8}  {'ok' if ok else 'NO'}")
+            if ok:
+                maximo = sesiones
+            elif not args.keep_going:
+                break
+    finally:
+        if pool:
+            pool.close()
+
+    print(f"\nMáximo sostenido a {args.fps} fps: {maximo} sesiones", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump({"fps": args.fps, "resolucion": [ancho, alto], "maximo_sesiones": maximo,
+                       "corridas": corridas}, archivo, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
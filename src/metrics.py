@@ -0,0 +1,212 @@
+"""
+Instrumentación por etapas del camino de detección.
+
+Cuando está deshabilitada, start_timer() devuelve None y el detector se
+salta toda medición: el costo es una llamada y una comparación por imagen.
+Cuando está habilitada, cada etapa se registra en un histograma de proceso
+que puede exportarse en formato de texto de Prometheus.
+"""
+import os
+import threading
+import time
+
+from .config import METRICS_ENABLED, METRICS_BUCKETS_SECONDS
+
+_habilitado = os.environ.get("FACE_METRICS", str(int(METRICS_ENABLED))) == "1"
+
+
+def enabled():
+    """Indica si la instrumentación está activa."""
+    return _habilitado
+
+
+def enable(value=True):
+    """
+    Activa o desactiva la instrumentación para todo el proceso.
+
+    Args:
+        value (bool): True para activar, False para desactivar
+    """
+    global _habilitado
+    _habilitado = bool(value)
+
+
+class Histogram:
+    """
+    Histograma acumulativo con límites fijos, seguro entre hilos.
+    """
+
+    def __init__(self, buckets=METRICS_BUCKETS_SECONDS):
+        self.buckets = tuple(sorted(buckets))
+        self._conteos = [0] * (len(self.buckets) + 1)
+        self._suma = 0.0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Registra una observación (en segundos)."""
+        indice = len(self.buckets)
+        for i, limite in enumerate(self.buckets):
+            if value <= limite:
+                indice = i
+                break
+        with self._lock:
+            self._conteos[indice] += 1
+            self._suma += value
+            self._total += 1
+
+    def snapshot(self):
+        """
+        Copia consistente del estado.
+
+        Returns:
+            tuple: (conteos por bucket no acumulados, suma, total)
+        """
+        with self._lock:
+            return list(self._conteos), self._suma, self._total
+
+    def quantile(self, q):
+        """
+        Estima un cuantil interpolando linealmente dentro del bucket.
+
+        Args:
+            q (float): Cuantil en [0, 1]
+
+        Returns:
+            float: Valor estimado en segundos (None si no hay observaciones)
+        """
+        conteos, _, total = self.snapshot()
+        if total == 0:
+            return None
+
+        objetivo = q * total
+        acumulado = 0
+        inferior = 0.0
+        for i, conteo in enumerate(conteos):
+            superior = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if acumulado + conteo >= objetivo and conteo:
+                return inferior + (superior - inferior) * (objetivo - acumulado) / conteo
+            acumulado += conteo
+            inferior = superior
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Histogramas de latencia por etapa, compartidos por todo el proceso.
+    """
+
+    def __init__(self, buckets=METRICS_BUCKETS_SECONDS):
+        self.buckets = buckets
+        self._histogramas = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        """Devuelve (creándolo si hace falta) el histograma de una etapa."""
+        histograma = self._histogramas.get(stage)
+        if histograma is None:
+            with self._lock:
+                histograma = self._histogramas.setdefault(stage, Histogram(self.buckets))
+        return histograma
+
+    def observe(self, stage, seconds):
+        """Registra la duración de una etapa."""
+        self.histogram(stage).observe(seconds)
+
+    def summary(self):
+        """
+        Resumen legible por etapa.
+
+        Returns:
+            dict: {etapa: {"conteo", "media_ms", "p50_ms", "p95_ms"}}
+        """
+        resumen = {}
+        for etapa, histograma in sorted(self._histogramas.items()):
+            _, suma, total = histograma.snapshot()
+            if not total:
+                continue
+            resumen[etapa] = {
+                "conteo": total,
+                "media_ms": suma / total * 1000,
+                "p50_ms": histograma.quantile(0.50) * 1000,
+                "p95_ms": histograma.quantile(0.95) * 1000,
+            }
+        return resumen
+
+    def prometheus_text(self, name="face_detect_stage_seconds",
+                        description="Duración de cada etapa de la detección de landmarks."):
+        """
+        Exporta los histogramas en el formato de texto de Prometheus.
+
+        Args:
+            name (str): Nombre de la métrica
+            description (str): Texto de la línea HELP
+
+        Returns:
+            str: Texto listo para servir en un endpoint /metrics
+        """
+        lineas = [
+            f"# HELP {name} {description}",
+            f"# TYPE {name} histogram",
+        ]
+        for etapa, histograma in sorted(self._histogramas.items()):
+            conteos, suma, total = histograma.snapshot()
+            acumulado = 0
+            for limite, conteo in zip(histograma.buckets, conteos):
+                acumulado += conteo
+                lineas.append(f'{name}_bucket{{stage="{etapa}",le="{limite:g}"}} {acumulado}')
+            lineas.append(f'{name}_bucket{{stage="{etapa}",le="+Inf"}} {total}')
+            lineas.append(f'{name}_sum{{stage="{etapa}"}} {suma:.9f}')
+            lineas.append(f'{name}_count{{stage="{etapa}"}} {total}')
+        return "\n".join(lineas) + "\n"
+
+    def reset(self):
+        """Descarta todas las observaciones."""
+        with self._lock:
+            self._histogramas = {}
+
+
+REGISTRY = MetricsRegistry()
+
+
+class StageTimer:
+    """
+    Cronómetro de vueltas: cada lap() mide desde la vuelta anterior.
+    """
+
+    __slots__ = ("tiempos", "_ultimo", "_registro")
+
+    def __init__(self, registry=REGISTRY):
+        self.tiempos = {}
+        self._registro = registry
+        self._ultimo = time.perf_counter()
+
+    def lap(self, stage):
+        """Cierra la etapa en curso y la registra con el nombre dado."""
+        ahora = time.perf_counter()
+        duracion = ahora - self._ultimo
+        self._ultimo = ahora
+        self.tiempos[stage] = duracion * 1000
+        self._registro.observe(stage, duracion)
+
+    def finish(self):
+        """
+        Registra el total y devuelve los tiempos por etapa.
+
+        Returns:
+            dict: {etapa: milisegundos}, incluido "total"
+        """
+        total = sum(self.tiempos.values())
+        self.tiempos["total"] = total
+        self._registro.observe("total", total / 1000)
+        return self.tiempos
+
+
+def start_timer(registry=REGISTRY):
+    """
+    Crea un cronómetro si la instrumentación está activa.
+
+    Returns:
+        StageTimer: Cronómetro nuevo, o None si la instrumentación está desactivada
+    """
+    return StageTimer(registry) if _habilitado else None
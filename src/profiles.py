@@ -0,0 +1,243 @@
+"""
+Perfiles de rendimiento del modo cámara y su selección automática.
+
+Cada perfil de PERFORMANCE_PROFILES fija el submodelo de iris
+(refine_landmarks), el ancho de entrada, la cantidad de rostros, el modo
+(tracking o detección en cada cuadro) y las capas del overlay. ProfileTuner
+elige al arrancar el perfil de mayor calidad que entra en el presupuesto de
+latencia y después lo ajusta según la latencia medida.
+
+Uso:
+    python -m src.profiles [--budget 33] [--image foto.jpg]
+"""
+import argparse
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from .config import (
+    PERFORMANCE_PROFILES, PROFILE_DEFAULT, PROFILE_LATENCY_BUDGET_MS, PROFILE_BENCHMARK_FRAMES,
+    PROFILE_WINDOW, PROFILE_UPGRADE_HEADROOM, PROFILE_COOLDOWN, SAMPLE_FACE_IMAGE
+)
+
+
+def profile_config(name):
+    """
+    Devuelve la configuración de un perfil.
+
+    Args:
+        name (str): Nombre en PERFORMANCE_PROFILES
+
+    Returns:
+        dict: Copia de la configuración del perfil
+    """
+    if name not in PERFORMANCE_PROFILES:
+        raise ValueError(f"Perfil desconocido: {name}")
+    perfil = dict(PERFORMANCE_PROFILES[name])
+    if "iris" in perfil["capas"] and not perfil["refine_landmarks"]:
+        raise ValueError(f"El perfil {name} dibuja el iris sin refine_landmarks")
+    return perfil
+
+
+def create_profile_detector(name, gate=True):
+    """
+    Crea el detector de un perfil con la interfaz de TrackingDetector.
+
+    Args:
+        name (str): Nombre del perfil
+        gate (bool): Reutilizar resultados en cuadros sin cambios (solo en
+            perfiles con tracking)
+
+    Returns:
+        TrackingDetector: Detector listo para usar
+    """
+    from .detector import create_detector
+    from .tracking import TrackingDetector
+
+    perfil = profile_config(name)
+    detector = create_detector(perfil["max_faces"], static_image_mode=not perfil["tracking"],
+                               refine_landmarks=perfil["refine_landmarks"])
+    return TrackingDetector(detector, smoothing=perfil["tracking"],
+                            gate=gate and perfil["tracking"])
+
+
+def fit_width(image, width):
+    """
+    Reduce la imagen a un ancho máximo conservando la proporción.
+
+    Returns:
+        numpy.ndarray: La misma imagen si ya es angosta, o una copia reducida
+    """
+    alto, ancho = image.shape[:2]
+    if ancho <= width:
+        return image
+    return cv2.resize(image, (width, max(1, round(alto * width / ancho))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def benchmark_profiles(names=None, image=None, frames=PROFILE_BENCHMARK_FRAMES):
+    """
+    Mide el costo por cuadro de cada perfil en este equipo.
+
+    Incluye la reducción del cuadro, la inferencia y el overlay. Sin imagen
+    se usa la cara de referencia incluida (assets/rostro.jpg) llevada a
+    1280x720: en un cuadro sin cara no corre la malla ni se dibuja el
+    overlay, y todos los perfiles parecerían baratos.
+
+    Args:
+        names (list): Perfiles a medir (por defecto, todos)
+        image (numpy.ndarray): Cuadro BGR de referencia
+        frames (int): Cuadros medidos por perfil (el primero no se cuenta)
+
+    Returns:
+        dict: Milisegundos por cuadro (mediana) de cada perfil, en orden de calidad
+    """
+    from .realtime import live_renderer
+    from .utils import sample_face
+
+    imagen = sample_face(1280, 720) if image is None else image
+    if imagen is None:
+        raise FileNotFoundError(f"No se encontró la cara de referencia {SAMPLE_FACE_IMAGE}")
+    alto, ancho = imagen.shape[:2]
+    costos = {}
+    for nombre in names or PERFORMANCE_PROFILES:
+        perfil = profile_config(nombre)
+        detector = create_profile_detector(nombre, gate=False)
+        renderer = live_renderer(perfil["capas"])
+        lienzo = imagen.copy()
+        tiempos = []
+        try:
+            for _ in range(frames + 1):
+                inicio = time.perf_counter()
+                _, landmarks, _ = detector.detect(fit_width(imagen, perfil["ancho"]), draw=False)
+                renderer.render(lienzo, landmarks["normalizados"]
+                                * np.array([ancho, alto, ancho], dtype=np.float32))
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            detector.close()
+        costos[nombre] = float(np.median(tiempos[1:]))
+    return costos
+
+
+def select_profile(costs, budget_ms=PROFILE_LATENCY_BUDGET_MS):
+    """
+    Elige el perfil de mayor calidad cuyo costo entra en el presupuesto.
+
+    Args:
+        costs (dict): Costo por cuadro de cada perfil (ver benchmark_profiles)
+        budget_ms (float): Presupuesto por cuadro en milisegundos
+
+    Returns:
+        str: Nombre del perfil (el más liviano si ninguno entra)
+    """
+    orden = [nombre for nombre in PERFORMANCE_PROFILES if nombre in costs]
+    for nombre in orden:
+        if costs[nombre] <= budget_ms:
+            return nombre
+    return orden[-1]
+
+
+class ProfileTuner:
+    """
+    Ajusta el perfil en ejecución según la latencia medida.
+
+    Baja un perfil cuando la mediana de los últimos cuadros supera el
+    presupuesto y sube uno cuando el perfil superior, estimado con los
+    costos relativos del benchmark, usaría menos de PROFILE_UPGRADE_HEADROOM
+    del presupuesto. La diferencia entre ambos umbrales y la espera mínima
+    entre cambios evitan que el perfil oscile.
+    """
+
+    def __init__(self, costs=None, budget_ms=PROFILE_LATENCY_BUDGET_MS, profile=None,
+                 window=PROFILE_WINDOW, headroom=PROFILE_UPGRADE_HEADROOM,
+                 cooldown=PROFILE_COOLDOWN):
+        """
+        Args:
+            costs (dict): Costos de benchmark_profiles; sin ellos se estiman
+                por el área de entrada de cada perfil
+            budget_ms (float): Presupuesto de inferencia por cuadro
+            profile (str): Perfil inicial (por defecto, select_profile sobre
+                costs, o PROFILE_DEFAULT sin costos)
+            window (int): Cuadros observados antes de decidir
+            headroom (float): Fracción del presupuesto que debe sobrar para subir
+            cooldown (int): Cuadros mínimos entre cambios
+        """
+        self.costs = costs
+        self.budget_ms = budget_ms
+        self.order = [nombre for nombre in PERFORMANCE_PROFILES if not costs or nombre in costs]
+        self.profile = profile or (select_profile(costs, budget_ms) if costs else PROFILE_DEFAULT)
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self._latencias = deque(maxlen=window)
+        self._desde_cambio = 0
+        self.cambios = []
+
+    def _factor(self, destino, origen):
+        """Costo relativo estimado de pasar de un perfil a otro."""
+        if self.costs:
+            return self.costs[destino] / self.costs[origen]
+        return (PERFORMANCE_PROFILES[destino]["ancho"] / PERFORMANCE_PROFILES[origen]["ancho"]) ** 2
+
+    def observe(self, latency_ms):
+        """
+        Registra la latencia de un cuadro procesado.
+
+        Args:
+            latency_ms (float): Tiempo de inferencia del cuadro
+
+        Returns:
+            str: Nombre del perfil nuevo si corresponde cambiar, o None
+        """
+        self._latencias.append(latency_ms)
+        self._desde_cambio += 1
+        if len(self._latencias) < self._latencias.maxlen or self._desde_cambio < self.cooldown:
+            return None
+
+        mediana = float(np.median(self._latencias))
+        indice = self.order.index(self.profile)
+        nuevo = None
+        if mediana > self.budget_ms and indice + 1 < len(self.order):
+            nuevo = self.order[indice + 1]
+        elif indice > 0:
+            superior = self.order[indice - 1]
+            if mediana * self._factor(superior, self.profile) < self.budget_ms * self.headroom:
+                nuevo = superior
+        if nuevo is None:
+            return None
+
+        self.cambios.append((self.profile, nuevo, mediana))
+        self.profile = nuevo
+        self._latencias.clear()
+        self._desde_cambio = 0
+        return nuevo
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Mide los perfiles de rendimiento y muestra cuál se elegiría."
+    )
+    parser.add_argument("--budget", type=float, default=PROFILE_LATENCY_BUDGET_MS,
+                        help="Presupuesto de latencia por cuadro en ms")
+    parser.add_argument("--image", default=None, help="Imagen de referencia con una cara (por defecto, la incluida)")
+    parser.add_argument("--frames", type=int, default=PROFILE_BENCHMARK_FRAMES,
+                        help="Cuadros medidos por perfil")
+    args = parser.parse_args(argv)
+
+    imagen = None
+    if args.image:
+        imagen = cv2.imread(args.image)
+        if imagen is None:
+            parser.error(f"No se pudo leer la imagen: {args.image}")
+
+    costos = benchmark_profiles(image=imagen, frames=args.frames)
+    elegido = select_profile(costos, args.budget)
+    for nombre, costo in costos.items():
+        marca = "  <- elegido" if nombre == elegido else ""
+        print(f"{nombre:>8}: {costo:7.2f} ms/cuadro{marca}")
+
+
+if __name__ == "__main__":
+    main()
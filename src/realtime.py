@@ -0,0 +1,321 @@
+"""
+Detección de landmarks en tiempo real para el modo cámara (WebRTC).
+"""
+import threading
+import time
+from collections import deque
+
+import av
+import cv2
+import numpy as np
+
+from .config import (
+    REALTIME_ASYNC, REALTIME_LATENCY_WINDOW, REALTIME_COLOR,
+    REALTIME_THICKNESS, REALTIME_POINT_RADIUS, REALTIME_LAYERS, REALTIME_OVERLAY_ALPHA,
+    RENDER_LAYERS
+)
+from .profiles import create_profile_detector, fit_width, profile_config
+from .render import OverlayRenderer
+
+
+def _percentil(valores, q):
+    """Percentil de una secuencia de latencias (None si está vacía)."""
+    return float(np.percentile(valores, q)) if valores else None
+
+
+class LatestFrameWorker:
+    """
+    Ejecuta la inferencia en un hilo de fondo, siempre sobre el cuadro más reciente.
+
+    Si llega un cuadro nuevo mientras el anterior todavía espera ser procesado,
+    el anterior se descarta. Así la latencia no se acumula cuando la inferencia
+    es más lenta que la cámara.
+    """
+
+    def __init__(self, detector=None, latency_window=REALTIME_LATENCY_WINDOW):
+        """
+        Inicia el hilo de inferencia.
+
+        Args:
+            detector (FaceLandmarkDetector): Detector a usar; si es None se crea
+                un TrackingDetector (ver src.tracking)
+            latency_window (int): Cuadros usados para calcular percentiles
+        """
+        if detector is None:
+            from .tracking import TrackingDetector
+            detector = TrackingDetector()
+
+        self.detector = detector
+        self._condicion = threading.Condition()
+        self._pendiente = None
+        self._resultado = None
+        self._cerrado = False
+
+        self.recibidos = 0
+        self.procesados = 0
+        self.descartados = 0
+        self.errores = 0
+        self._latencias = deque(maxlen=latency_window)
+
+        self._hilo = threading.Thread(target=self._bucle, name="realtime-inferencia",
+                                      daemon=True)
+        self._hilo.start()
+
+    def submit(self, image_rgb):
+        """
+        Entrega un cuadro al hilo de inferencia sin bloquear.
+
+        Args:
+            image_rgb (numpy.ndarray): Cuadro RGB; el worker pasa a ser su dueño
+        """
+        with self._condicion:
+            self.recibidos += 1
+            if self._pendiente is not None:
+                self.descartados += 1
+            self._pendiente = (image_rgb, time.perf_counter())
+            self._condicion.notify()
+
+    def latest(self):
+        """
+        Devuelve el resultado más reciente disponible.
+
+        Returns:
+            tuple: (landmarks, info) como en FaceLandmarkDetector.detect,
+                o None si todavía no hay resultados
+        """
+        with self._condicion:
+            return self._resultado
+
+    def _bucle(self):
+        """Toma el cuadro pendiente más reciente y lo procesa."""
+        while True:
+            with self._condicion:
+                while self._pendiente is None and not self._cerrado:
+                    self._condicion.wait()
+                if self._cerrado:
+                    return
+                imagen_rgb, llegada = self._pendiente
+                self._pendiente = None
+
+            inicio = time.perf_counter()
+            try:
+                _, landmarks, info = self.detector.detect(imagen_rgb, draw=False,
+                                                          input_format="rgb")
+            except Exception:
+                # Un cuadro fallido no debe detener el hilo: se cuenta y se sigue
+                with self._condicion:
+                    self.errores += 1
+                continue
+            fin = time.perf_counter()
+            latencia_ms = (fin - llegada) * 1000
+            info["inferencia_ms"] = (fin - inicio) * 1000
+            info["latencia_ms"] = latencia_ms
+
+            with self._condicion:
+                self._resultado = (landmarks, info)
+                self.procesados += 1
+                self._latencias.append(latencia_ms)
+
+    def stats(self):
+        """
+        Devuelve los contadores del worker.
+
+        Returns:
+            dict: Cuadros recibidos, procesados y descartados, tasa de descarte,
+                latencia extremo a extremo (llegada del cuadro -> resultado) en ms
+                y cuadros cuya inferencia falló ("errores")
+        """
+        with self._condicion:
+            latencias = list(self._latencias)
+            recibidos = self.recibidos
+            return {
+                "cuadros_recibidos": recibidos,
+                "cuadros_procesados": self.procesados,
+                "cuadros_descartados": self.descartados,
+                "tasa_descarte": self.descartados / recibidos if recibidos else 0.0,
+                "latencia_ms_ultima": latencias[-1] if latencias else None,
+                "latencia_ms_p50": _percentil(latencias, 50),
+                "latencia_ms_p95": _percentil(latencias, 95),
+                "errores": self.errores,
+            }
+
+    def close(self):
+        """Detiene el hilo de inferencia y libera el detector."""
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify()
+        self._hilo.join()
+        self.detector.close()
+
+
+def live_renderer(layers=REALTIME_LAYERS, alpha=REALTIME_OVERLAY_ALPHA):
+    """
+    Crea el renderer del modo cámara.
+
+    La teselación usa REALTIME_COLOR y REALTIME_THICKNESS; el resto de las
+    capas, su estilo de RENDER_LAYERS.
+
+    Returns:
+        OverlayRenderer: Renderer con su propio buffer de mezcla
+    """
+    estilos = {**RENDER_LAYERS,
+               "teselacion": {"color": REALTIME_COLOR, "grosor": REALTIME_THICKNESS}}
+    return OverlayRenderer(layers, alpha=alpha, point_color=REALTIME_COLOR,
+                           point_radius=REALTIME_POINT_RADIUS, styles=estilos)
+
+
+def draw_live_overlay(image, landmarks, renderer=None):
+    """
+    Dibuja las capas del modo cámara y los puntos de todos los rostros.
+
+    Args:
+        image (numpy.ndarray): Cuadro BGR a modificar en el lugar
+        landmarks (dict): Landmarks devueltos por FaceLandmarkDetector.detect
+        renderer (OverlayRenderer): Renderer a usar (por defecto, uno nuevo
+            de live_renderer; conviene reutilizarlo entre cuadros)
+
+    Returns:
+        numpy.ndarray: El mismo cuadro, con el overlay dibujado
+    """
+    renderer = renderer or live_renderer()
+    return renderer.render(image, landmarks["pixeles"])
+
+
+class FaceMeshTransformer:
+    """
+    Procesador de video para streamlit-webrtc.
+
+    En modo asíncrono, recv() no espera a la inferencia: entrega el cuadro
+    al LatestFrameWorker (o, con el backend "tasks", al LiveStreamWorker de
+    src.landmarker) y devuelve de inmediato el cuadro actual con los
+    landmarks más recientes. En modo síncrono procesa cada cuadro en línea.
+
+    Con un perfil de rendimiento (src.profiles), el ancho de entrada, el
+    detector y las capas salen del perfil; con un ProfileTuner, el perfil
+    cambia en ejecución según el tiempo de inferencia medido. El ajuste no
+    se combina con un pool compartido: sus procesos usan una configuración
+    fija y su tiempo de inferencia no incluye la espera en la cola.
+    """
+
+    def __init__(self, asynchronous=REALTIME_ASYNC, layers=REALTIME_LAYERS,
+                 alpha=REALTIME_OVERLAY_ALPHA, pool=None, profile=None, tuner=None):
+        """
+        Inicializa el detector en modo tracking.
+
+        Args:
+            asynchronous (bool): Si True, la inferencia corre en segundo plano
+            layers (tuple): Capas del overlay ("teselacion", "contornos", "iris");
+                se ignora si hay perfil
+            alpha (float): Opacidad del overlay
+            pool (SharedInferencePool): Si se indica, la inferencia corre en
+                los procesos compartidos del pool (ver src.serving) en lugar
+                de un detector propio; implica modo asíncrono, y del perfil
+                solo se aplican el ancho de entrada y las capas
+            profile (str): Perfil de PERFORMANCE_PROFILES
+            tuner (ProfileTuner): Ajuste automático; su perfil actual
+                reemplaza a profile. No se admite junto con pool
+        """
+        if pool is not None and tuner is not None:
+            raise ValueError("El ajuste de perfil no se admite con un pool compartido")
+        self.asynchronous = asynchronous or pool is not None
+        self.alpha = alpha
+        self.layers = layers
+        self.tuner = tuner
+        self.profile = tuner.profile if tuner else profile
+        self.pool = pool
+        self.worker = pool.session() if pool is not None else None
+        self.detector = None
+        self._ultimo_info = None
+        self._configurar()
+
+    def _configurar(self):
+        """Crea renderer y detector para el perfil actual (o la configuración fija)."""
+        perfil = profile_config(self.profile) if self.profile else None
+        self.max_width = perfil["ancho"] if perfil else None
+        self.renderer = live_renderer(perfil["capas"] if perfil else self.layers, self.alpha)
+        if self.pool is not None:
+            return
+
+        from .detector import detector_backend
+        if self.asynchronous and detector_backend() == "tasks":
+            from .landmarker import LiveStreamWorker
+            # En LIVE_STREAM, MediaPipe descarta cuadros y sigue la cara por su cuenta
+            opciones = ({"max_faces": perfil["max_faces"],
+                         "refine_landmarks": perfil["refine_landmarks"]} if perfil else {})
+            self.worker = LiveStreamWorker(**opciones)
+            return
+
+        if perfil:
+            detector = create_profile_detector(self.profile)
+        else:
+            from .tracking import TrackingDetector
+            detector = TrackingDetector()
+        if self.asynchronous:
+            self.worker = LatestFrameWorker(detector)
+        self.detector = detector
+
+    def _cambiar_perfil(self, perfil):
+        """Reemplaza detector y renderer; la sesión del pool se conserva."""
+        if self.pool is None:
+            self._liberar()
+        self.profile = perfil
+        self._configurar()
+
+    def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
+        # Convierte el cuadro de video a un array de numpy
+        image = frame.to_ndarray(format="bgr24")
+        entrada = fit_width(image, self.max_width) if self.max_width else image
+
+        if self.asynchronous:
+            # La conversión crea un buffer nuevo que pasa a ser del worker
+            self.worker.submit(cv2.cvtColor(entrada, cv2.COLOR_BGR2RGB))
+            landmarks, info = self.worker.latest() or (None, None)
+        else:
+            inicio = time.perf_counter()
+            _, landmarks, info = self.detector.detect(entrada, draw=False)
+            info["inferencia_ms"] = (time.perf_counter() - inicio) * 1000
+
+        # Dibuja los landmarks si se detectó alguna cara
+        if landmarks is not None:
+            if entrada is not image:
+                alto, ancho = image.shape[:2]
+                landmarks = {"pixeles": landmarks["normalizados"]
+                             * np.array([ancho, alto, ancho], dtype=np.float32)}
+            draw_live_overlay(image, landmarks, self.renderer)
+
+        # Cada resultado nuevo se informa una sola vez al ajuste de perfil; los
+        # cuadros reutilizados por la compuerta no miden la inferencia
+        if (self.tuner and info is not None and info is not self._ultimo_info
+                and not info.get("reutilizado")):
+            self._ultimo_info = info
+            nuevo = self.tuner.observe(info["inferencia_ms"])
+            if nuevo:
+                self._cambiar_perfil(nuevo)
+
+        # Devuelve el cuadro procesado
+        return av.VideoFrame.from_ndarray(image, format="bgr24")
+
+    def stats(self):
+        """
+        Contadores de descarte y latencia (solo en modo asíncrono), de
+        reutilización de cuadros del TrackingDetector y perfil actual.
+        """
+        estadisticas = self.worker.stats() if self.worker else {}
+        if hasattr(self.detector, "stats"):
+            estadisticas.update(self.detector.stats())
+        if self.profile:
+            estadisticas["perfil"] = self.profile
+        return estadisticas
+
+    def _liberar(self):
+        """Cierra el worker (que cierra su detector) o el detector síncrono."""
+        if self.worker:
+            self.worker.close()
+            self.worker = None
+        elif self.detector:
+            self.detector.close()
+        self.detector = None
+
+    def on_ended(self):
+        """Libera el detector (o la sesión del pool) cuando termina la sesión de WebRTC."""
+        self._liberar()
@@ -0,0 +1,259 @@
+"""
+Renderizado vectorizado de landmarks faciales.
+"""
+from functools import lru_cache
+
+import cv2
+import numpy as np
+from .config import LANDMARK_COLOR, LANDMARK_RADIUS, RENDER_LAYERS
+
+# Conjuntos de conexiones de MediaPipe que forman cada capa
+_CONJUNTOS_CAPAS = {
+    "teselacion": ("FACEMESH_TESSELATION",),
+    "contornos": ("FACEMESH_CONTOURS",),
+    "iris": ("FACEMESH_IRISES",),
+}
+
+
+@lru_cache(maxsize=16)
+def _disk_offsets(radio):
+    """
+    Calcula los desplazamientos (dy, dx) de un disco relleno de radio dado.
+
+    Args:
+        radio (int): Radio del disco en píxeles
+
+    Returns:
+        tuple: (dy, dx) como arrays de enteros
+    """
+    # Se rasteriza una sola vez con cv2.circle para obtener exactamente su forma
+    lado = 2 * radio + 1
+    plantilla = np.zeros((lado, lado), dtype=np.uint8)
+    cv2.circle(plantilla, (radio, radio), radio, 1, -1)
+    dy, dx = np.nonzero(plantilla)
+    return dy - radio, dx - radio
+
+
+def draw_points(image, points_px, color=LANDMARK_COLOR, radius=LANDMARK_RADIUS):
+    """
+    Dibuja todos los landmarks como discos rellenos en una sola operación.
+
+    En lugar de llamar a cv2.circle por cada punto, se rasterizan todos los
+    discos a la vez mediante indexado de NumPy.
+
+    Args:
+        image (numpy.ndarray): Imagen (alto, ancho, canales) a modificar en el lugar
+        points_px (numpy.ndarray): Coordenadas en píxeles (..., 2 o 3)
+        color (tuple): Color en el orden de canales de la imagen
+        radius (int): Radio de cada punto en píxeles
+
+    Returns:
+        numpy.ndarray: La misma imagen recibida, con los puntos dibujados
+    """
+    puntos = np.asarray(points_px).reshape(-1, points_px.shape[-1])
+    if puntos.shape[0] == 0:
+        return image
+
+    alto, ancho = image.shape[:2]
+    # astype trunca hacia cero, igual que int() en el dibujo original
+    xs = puntos[:, 0].astype(np.intp)
+    ys = puntos[:, 1].astype(np.intp)
+
+    dy, dx = _disk_offsets(int(radius))
+    ys = (ys[:, None] + dy[None, :]).ravel()
+    xs = (xs[:, None] + dx[None, :]).ravel()
+
+    dentro = (xs >= 0) & (xs < ancho) & (ys >= 0) & (ys < alto)
+    image[ys[dentro], xs[dentro]] = color
+    return image
+
+
+@lru_cache(maxsize=None)
+def connection_indices(layer):
+    """
+    Convierte una capa de conexiones de MediaPipe en un array de índices.
+
+    Los conjuntos de MediaPipe son frozensets de tuplas; se ordenan y
+    convierten una sola vez por proceso.
+
+    Args:
+        layer (str): "teselacion", "contornos" o "iris"
+
+    Returns:
+        numpy.ndarray: Pares de índices (conexiones, 2), de solo lectura
+    """
+    if layer not in _CONJUNTOS_CAPAS:
+        raise ValueError(f"Capa desconocida: {layer}")
+    from mediapipe.python.solutions import face_mesh_connections
+
+    pares = set()
+    for nombre in _CONJUNTOS_CAPAS[layer]:
+        pares.update(getattr(face_mesh_connections, nombre))
+    indices = np.array(sorted(pares), dtype=np.intp)
+    indices.setflags(write=False)
+    return indices
+
+
+def edge_trails(connections):
+    """
+    Encadena las conexiones en recorridos que usan cada arista una vez.
+
+    cv2.polylines tiene un costo fijo por polilínea: dibujar la teselación
+    como ~2.500 segmentos sueltos es varias veces más lento que dibujar las
+    mismas aristas como unas pocas decenas de recorridos largos. Los
+    recorridos empiezan en vértices de grado impar, que es donde
+    necesariamente termina alguno.
+
+    Args:
+        connections (numpy.ndarray): Pares de índices (conexiones, 2)
+
+    Returns:
+        tuple: (índices de los vértices de todos los recorridos concatenados,
+            posiciones donde empieza cada recorrido salvo el primero)
+    """
+    adyacencia = {}
+    for arista, (a, b) in enumerate(connections.tolist()):
+        adyacencia.setdefault(a, []).append((b, arista))
+        adyacencia.setdefault(b, []).append((a, arista))
+    usada = [False] * len(connections)
+
+    def siguiente(vertice):
+        vecinos = adyacencia[vertice]
+        while vecinos and usada[vecinos[-1][1]]:
+            vecinos.pop()
+        return vecinos.pop() if vecinos else None
+
+    recorridos = []
+    # Primero los vértices de grado impar, después el resto (ciclos)
+    for inicio in sorted(adyacencia, key=lambda v: (len(adyacencia[v]) % 2 == 0, v)):
+        while True:
+            paso = siguiente(inicio)
+            if paso is None:
+                break
+            recorrido = [inicio]
+            while paso is not None:
+                vecino, arista = paso
+                usada[arista] = True
+                recorrido.append(vecino)
+                paso = siguiente(vecino)
+            recorridos.append(recorrido)
+
+    longitudes = [len(recorrido) for recorrido in recorridos]
+    indices = np.array([v for recorrido in recorridos for v in recorrido], dtype=np.intp)
+    return indices, np.cumsum(longitudes)[:-1]
+
+
+def draw_trails(image, points_px, trails, color=LANDMARK_COLOR, thickness=1):
+    """
+    Dibuja recorridos de edge_trails para todos los rostros en una llamada.
+
+    Args:
+        image (numpy.ndarray): Imagen a modificar en el lugar
+        points_px (numpy.ndarray): Coordenadas en píxeles (rostros, landmarks, 2 o 3)
+        trails (tuple): Resultado de edge_trails
+        color (tuple): Color en el orden de canales de la imagen
+        thickness (int): Grosor de línea en píxeles
+
+    Returns:
+        numpy.ndarray: La misma imagen recibida, con los recorridos dibujados
+    """
+    indices, cortes = trails
+    if len(points_px) == 0 or len(indices) == 0:
+        return image
+
+    polilineas = []
+    # order="C": cv2.polylines exige filas contiguas de (x, y) int32
+    for puntos in points_px[:, indices, :2].astype(np.int32, order="C"):
+        polilineas.extend(np.split(puntos, cortes))
+    cv2.polylines(image, polilineas, False, color, thickness)
+    return image
+
+
+class OverlayRenderer:
+    """
+    Dibuja capas de conexiones y puntos con pocas llamadas a OpenCV.
+
+    Las capas que comparten color y grosor se unen y encadenan en
+    recorridos (edge_trails) al crear el renderer, así cada cuadro cuesta
+    una llamada a cv2.polylines por estilo más un scatter de puntos. Con
+    alpha < 1 se dibuja sobre un buffer reutilizable limitado a la zona de
+    los rostros y se mezcla con cv2.addWeighted.
+    """
+
+    def __init__(self, layers=("teselacion",), points=True, alpha=1.0,
+                 point_color=LANDMARK_COLOR, point_radius=1, styles=None):
+        """
+        Args:
+            layers (tuple): Capas a dibujar ("teselacion", "contornos", "iris")
+            points (bool): Dibujar también los 478 puntos
+            alpha (float): Opacidad del overlay en (0, 1]
+            point_color (tuple): Color de los puntos
+            point_radius (int): Radio de los puntos en píxeles
+            styles (dict): Color y grosor por capa (por defecto, RENDER_LAYERS)
+        """
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha debe estar en (0, 1]")
+        estilos = styles or RENDER_LAYERS
+
+        agrupadas = {}
+        for capa in layers:
+            estilo = estilos[capa]
+            clave = (tuple(estilo["color"]), int(estilo["grosor"]))
+            agrupadas.setdefault(clave, []).append(connection_indices(capa))
+        self._trazos = [
+            (color, grosor, edge_trails(np.unique(np.sort(np.concatenate(indices), axis=1),
+                                                  axis=0)))
+            for (color, grosor), indices in agrupadas.items()
+        ]
+
+        self.layers = tuple(layers)
+        self.points = points
+        self.alpha = alpha
+        self.point_color = point_color
+        self.point_radius = point_radius
+        self._buffer = None
+
+    def _draw(self, image, points_px):
+        for color, grosor, recorridos in self._trazos:
+            draw_trails(image, points_px, recorridos, color, grosor)
+        if self.points:
+            draw_points(image, points_px, self.point_color, self.point_radius)
+        return image
+
+    def render(self, image, points_px):
+        """
+        Dibuja el overlay sobre la imagen, en el lugar.
+
+        Args:
+            image (numpy.ndarray): Imagen a modificar en el lugar
+            points_px (numpy.ndarray): Coordenadas en píxeles (rostros, 478, 2 o 3)
+
+        Returns:
+            numpy.ndarray: La misma imagen recibida
+        """
+        if len(points_px) == 0:
+            return image
+        if self.alpha >= 1:
+            return self._draw(image, points_px)
+
+        # Solo se mezcla la zona que cubren los rostros (más el grosor de línea)
+        alto, ancho = image.shape[:2]
+        margen = max([grosor for _, grosor, _ in self._trazos] + [self.point_radius]) + 1
+        xy = points_px[..., :2].reshape(-1, 2)
+        x0, y0 = np.maximum(np.floor(xy.min(axis=0)).astype(int) - margen, 0)
+        x1, y1 = np.minimum(np.ceil(xy.max(axis=0)).astype(int) + margen + 1, (ancho, alto))
+        if x0 >= x1 or y0 >= y1:
+            return image
+
+        if self._buffer is None or self._buffer.shape != image.shape:
+            self._buffer = np.empty_like(image)
+        region = image[y0:y1, x0:x1]
+        capa = self._buffer[:y1 - y0, :x1 - x0]
+        np.copyto(capa, region)
+
+        desplazados = points_px.copy()
+        desplazados[..., 0] -= x0
+        desplazados[..., 1] -= y0
+        self._draw(capa, desplazados)
+        cv2.addWeighted(capa, self.alpha, region, 1 - self.alpha, 0, dst=region)
+        return image
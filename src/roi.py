@@ -0,0 +1,279 @@
+"""
+Inferencia en dos etapas: detección a baja resolución y malla sobre recortes.
+
+Primero se buscan las caras con el detector de MediaPipe sobre una versión
+reducida de la imagen; después FaceMesh corre solo sobre recortes con margen
+tomados de la imagen a resolución completa, y los landmarks se devuelven en
+coordenadas de la imagen original. Una foto grupal o un cuadro 4K cuestan
+aproximadamente lo mismo que varias imágenes del tamaño de una cara.
+"""
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from .config import (
+    FACE_MESH_CONFIG, TOTAL_LANDMARKS, ROI_DETECTION_SIZE, ROI_MIN_DETECTION_CONFIDENCE,
+    ROI_DETECTION_PADDING, ROI_LANDMARK_PADDING, ROI_REUSE_MARGIN, ROI_REDETECT_INTERVAL,
+    ROI_MAX_DETECTION_GRID, ROI_TILE_OVERLAP, ROI_DUPLICATE_OVERLAP
+)
+from .detector import FaceLandmarkDetector, landmarks_to_arrays
+
+
+def square_box(x0, y0, x1, y1, padding, width, height):
+    """
+    Convierte una caja en un cuadrado con margen, recortado a la imagen.
+
+    Args:
+        x0, y0, x1, y1 (float): Caja en píxeles
+        padding (float): Margen a cada lado, como fracción del lado mayor
+        width (int): Ancho de la imagen
+        height (int): Alto de la imagen
+
+    Returns:
+        tuple: (x0, y0, x1, y1) enteros dentro de la imagen
+    """
+    lado = max(x1 - x0, y1 - y0) * (1 + 2 * padding)
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    return (
+        max(0, int(cx - lado / 2)),
+        max(0, int(cy - lado / 2)),
+        min(width, int(np.ceil(cx + lado / 2))),
+        min(height, int(np.ceil(cy + lado / 2))),
+    )
+
+
+def tile_grid(width, height, grid, overlap=ROI_TILE_OVERLAP):
+    """
+    Divide la imagen en grid x grid mosaicos solapados.
+
+    Args:
+        width (int): Ancho de la imagen
+        height (int): Alto de la imagen
+        grid (int): Mosaicos por lado
+        overlap (float): Solapamiento como fracción del mosaico
+
+    Returns:
+        list: Mosaicos (x0, y0, x1, y1) en píxeles
+    """
+    lado_x, lado_y = width / grid, height / grid
+    mosaicos = []
+    for fila in range(grid):
+        for columna in range(grid):
+            mosaicos.append((
+                max(0, int((columna - overlap) * lado_x)),
+                max(0, int((fila - overlap) * lado_y)),
+                min(width, int((columna + 1 + overlap) * lado_x)),
+                min(height, int((fila + 1 + overlap) * lado_y)),
+            ))
+    return mosaicos
+
+
+def suppress_duplicates(boxes, scores, overlap=ROI_DUPLICATE_OVERLAP):
+    """
+    Descarta cajas que repiten una cara ya encontrada con mayor puntaje.
+
+    Se compara la intersección contra el área de la caja menor: una cara
+    cortada por el borde de un mosaico queda contenida en la caja completa.
+
+    Args:
+        boxes (numpy.ndarray): Cajas (n, 4) como (x0, y0, x1, y1)
+        scores (numpy.ndarray): Puntajes (n,)
+        overlap (float): Fracción a partir de la cual dos cajas son la misma cara
+
+    Returns:
+        numpy.ndarray: Índices de las cajas conservadas, de mayor a menor puntaje
+    """
+    orden = np.argsort(-scores, kind="stable")
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    conservadas = []
+    for i in orden:
+        if conservadas:
+            otras = boxes[conservadas]
+            ancho = np.minimum(otras[:, 2], boxes[i, 2]) - np.maximum(otras[:, 0], boxes[i, 0])
+            alto = np.minimum(otras[:, 3], boxes[i, 3]) - np.maximum(otras[:, 1], boxes[i, 1])
+            interseccion = np.clip(ancho, 0, None) * np.clip(alto, 0, None)
+            menor = np.minimum(areas[conservadas], areas[i])
+            if np.any(interseccion > overlap * menor):
+                continue
+        conservadas.append(i)
+    return np.array(conservadas, dtype=np.intp)
+
+
+class RoiFaceLandmarkDetector(FaceLandmarkDetector):
+    """
+    FaceLandmarkDetector que corre la malla solo sobre recortes de cada cara.
+
+    Mantiene el contrato de detect(). En modo tracking (track=True), las
+    cajas de un cuadro se reutilizan en el siguiente mientras la cara siga
+    dentro del recorte, y la detección completa se repite solo cada
+    ROI_REDETECT_INTERVAL cuadros o cuando se pierde una cara.
+    """
+
+    def __init__(self, track=False, **config):
+        """
+        Args:
+            track (bool): Reutilizar recortes entre cuadros consecutivos de video
+            **config: Parámetros que reemplazan a los de FACE_MESH_CONFIG;
+                max_num_faces limita la cantidad de recortes
+        """
+        configuracion = {**FACE_MESH_CONFIG, **config}
+        self.max_faces = configuracion["max_num_faces"]
+        self.track = track
+
+        # Cada recorte contiene una sola cara y se procesa de forma independiente
+        super().__init__(**{**configuracion, "static_image_mode": True, "max_num_faces": 1})
+        self.config = {**configuracion, "modo": "roi"}
+
+        self.face_detection = mp.solutions.face_detection.FaceDetection(
+            model_selection=1,  # Modelo de rango completo: caras pequeñas y lejanas
+            min_detection_confidence=ROI_MIN_DETECTION_CONFIDENCE
+        )
+
+        self._cajas = []
+        self._puntajes = []
+        self._cuadros_desde_deteccion = 0
+        self.last_redetected = False
+        self.last_boxes = np.empty((0, 4), dtype=np.int32)
+        self.last_scores = np.empty(0, dtype=np.float32)
+
+    def _detect_boxes(self, image_rgb):
+        """
+        Busca caras en una copia reducida de la imagen.
+
+        El detector trabaja a una resolución de entrada fija, así que en una
+        multitud las caras lejanas quedan demasiado chicas. Si se encontraron
+        menos de max_faces, se repite la búsqueda sobre grillas de mosaicos
+        cada vez más finas (hasta ROI_MAX_DETECTION_GRID), mientras cada
+        grilla siga encontrando caras nuevas.
+
+        Returns:
+            tuple: (cajas con margen en píxeles de la imagen completa, puntajes)
+        """
+        alto, ancho = image_rgb.shape[:2]
+        escala = min(1.0, ROI_DETECTION_SIZE / max(alto, ancho))
+        reducida = image_rgb
+        if escala < 1.0:
+            reducida = cv2.resize(image_rgb, (int(ancho * escala), int(alto * escala)),
+                                  interpolation=cv2.INTER_AREA)
+        alto_r, ancho_r = reducida.shape[:2]
+
+        cajas, puntajes = [], []
+        encontradas = 0
+        for grilla in range(1, ROI_MAX_DETECTION_GRID + 1):
+            for x0, y0, x1, y1 in tile_grid(ancho_r, alto_r, grilla):
+                mosaico = np.ascontiguousarray(reducida[y0:y1, x0:x1])
+                for deteccion in self.face_detection.process(mosaico).detections or []:
+                    caja = deteccion.location_data.relative_bounding_box
+                    # Coordenadas relativas a la imagen completa
+                    cx0 = (x0 + caja.xmin * (x1 - x0)) / ancho_r
+                    cy0 = (y0 + caja.ymin * (y1 - y0)) / alto_r
+                    cajas.append((cx0, cy0, cx0 + caja.width * (x1 - x0) / ancho_r,
+                                  cy0 + caja.height * (y1 - y0) / alto_r))
+                    puntajes.append(deteccion.score[0])
+            if cajas:
+                conservadas = suppress_duplicates(np.array(cajas), np.array(puntajes))
+                cajas = [cajas[i] for i in conservadas]
+                puntajes = [puntajes[i] for i in conservadas]
+            # Basta con max_faces caras, o con una grilla que no aportó ninguna nueva
+            if len(cajas) >= self.max_faces or (grilla > 1 and len(cajas) == encontradas):
+                break
+            encontradas = len(cajas)
+
+        cajas_px = [square_box(x0 * ancho, y0 * alto, x1 * ancho, y1 * alto,
+                               ROI_DETECTION_PADDING, ancho, alto)
+                    for x0, y0, x1, y1 in cajas[:self.max_faces]]
+        return cajas_px, puntajes[:self.max_faces]
+
+    def _next_box(self, caja, puntos, ancho, alto):
+        """
+        Decide el recorte del cuadro siguiente: el mismo si la cara sigue
+        holgadamente dentro, o uno nuevo centrado en los landmarks.
+        """
+        x0, y0, x1, y1 = caja
+        margen = ROI_REUSE_MARGIN * (x1 - x0)
+        minimo = puntos[:, :2].min(axis=0)
+        maximo = puntos[:, :2].max(axis=0)
+
+        if (minimo[0] >= x0 + margen and minimo[1] >= y0 + margen
+                and maximo[0] <= x1 - margen and maximo[1] <= y1 - margen):
+            return caja
+        return square_box(minimo[0], minimo[1], maximo[0], maximo[1],
+                          ROI_LANDMARK_PADDING, ancho, alto)
+
+    def _mesh_on_crops(self, image_rgb, cajas):
+        """
+        Corre la malla en cada recorte y lleva los puntos a la imagen completa.
+
+        Returns:
+            tuple: (lista de landmarks en píxeles, índices de las cajas con cara)
+        """
+        rostros, encontrados = [], []
+        for indice, (x0, y0, x1, y1) in enumerate(cajas):
+            # MediaPipe necesita memoria contigua: se copia solo el recorte
+            recorte = np.ascontiguousarray(image_rgb[y0:y1, x0:x1])
+            resultados = self.face_mesh.process(recorte)
+            if not resultados.multi_face_landmarks:
+                continue
+
+            puntos = landmarks_to_arrays(resultados.multi_face_landmarks,
+                                         x1 - x0, y1 - y0)["pixeles"][0]
+            puntos[:, 0] += x0
+            puntos[:, 1] += y0
+            rostros.append(puntos)
+            encontrados.append(indice)
+        return rostros, encontrados
+
+    def _infer(self, image_rgb, timer=None):
+        alto, ancho = image_rgb.shape[:2]
+
+        redetectar = (not self.track or not self._cajas
+                      or self._cuadros_desde_deteccion >= ROI_REDETECT_INTERVAL)
+        if redetectar:
+            self._cajas, self._puntajes = self._detect_boxes(image_rgb)
+            self._cuadros_desde_deteccion = 0
+        if timer:
+            timer.lap("deteccion_baja_resolucion")
+
+        rostros, encontrados = self._mesh_on_crops(image_rgb, self._cajas)
+
+        if self.track and not redetectar and len(encontrados) < len(self._cajas):
+            # Se perdió una cara: se vuelve a detectar en este mismo cuadro
+            redetectar = True
+            self._cajas, self._puntajes = self._detect_boxes(image_rgb)
+            self._cuadros_desde_deteccion = 0
+            rostros, encontrados = self._mesh_on_crops(image_rgb, self._cajas)
+        self.last_redetected = redetectar
+        if timer:
+            timer.lap("inferencia")
+
+        self.last_boxes = np.array([self._cajas[i] for i in encontrados],
+                                   dtype=np.int32).reshape(-1, 4)
+        self.last_scores = np.array([self._puntajes[i] for i in encontrados],
+                                    dtype=np.float32)
+
+        self._cajas = [self._next_box(self._cajas[i], puntos, ancho, alto)
+                       for i, puntos in zip(encontrados, rostros)]
+        self._puntajes = [self._puntajes[i] for i in encontrados]
+        self._cuadros_desde_deteccion += 1
+
+        if not rostros:
+            vacio = np.empty((0, TOTAL_LANDMARKS, 3), dtype=np.float32)
+            return {"normalizados": vacio, "pixeles": vacio.copy(),
+                    "puntajes": self.last_scores.copy()}
+
+        pixeles = np.stack(rostros)
+        normalizados = pixeles / np.array([ancho, alto, ancho], dtype=np.float32)
+        if timer:
+            timer.lap("landmarks_a_numpy")
+        return {"normalizados": normalizados, "pixeles": pixeles,
+                "puntajes": self.last_scores.copy()}
+
+    def reset(self):
+        """Olvida los recortes del cuadro anterior (por ejemplo, al cambiar de video)."""
+        self._cajas, self._puntajes = [], []
+        self._cuadros_desde_deteccion = 0
+
+    def close(self):
+        """Libera recursos de ambos modelos."""
+        self.face_detection.close()
+        super().close()
@@ -0,0 +1,526 @@
+"""
+Servicio HTTP local de detección de landmarks.
+
+Uso:
+    python -m src.server [--host 127.0.0.1] [--port 8500] [--workers N]
+
+Endpoints:
+    POST /v1/landmarks          Cuerpo: imagen JPEG o PNG.
+                                ?formato=json (por defecto), npz, vector
+                                (coordenadas cuantizadas, ver src.vector) o
+                                svg (overlay para componer en el cliente);
+                                con vector y svg, ?capas=teselacion,contornos
+    POST /v1/landmarks/bulk     Cuerpo JSON: {"imagenes": ["<base64>", ...]}
+    GET  /healthz               Estado del servicio, cola y trabajadores
+    GET  /metrics               Métricas en formato de texto de Prometheus
+
+Cada imagen recibida entra en una cola acotada. Un despachador agrupa las
+imágenes que llegan juntas en micro-lotes y los envía a un pool de procesos
+(cada uno con su propio detector, como en src.batch), de modo que el costo
+de comunicación entre procesos se paga una vez por lote y no por imagen.
+Si la cola está llena, la petición se rechaza de inmediato con 429; una
+petición con más imágenes que la cola entera se rechaza con 413.
+
+Solo usa la biblioteca estándar: no requiere dependencias adicionales.
+"""
+import argparse
+import asyncio
+import base64
+import binascii
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .config import (
+    SERVER_HOST, SERVER_PORT, SERVER_QUEUE_SIZE, SERVER_MAX_BATCH, SERVER_MAX_WAIT_MS,
+    SERVER_MAX_BODY_BYTES, SERVER_MAX_WIDTH, RENDER_LAYERS
+)
+from .metrics import MetricsRegistry
+
+# Tamaños de lote para el histograma de /metrics
+_BUCKETS_LOTE = (1, 2, 4, 8, 16, 32, 64)
+
+
+class ServerBusy(Exception):
+    """La cola de imágenes no tiene lugar para la petición."""
+
+
+class RequestTooLarge(Exception):
+    """La petición trae más imágenes de las que caben en la cola vacía."""
+
+
+class _ErrorHTTP(Exception):
+    """Error que se responde al cliente con el código indicado."""
+
+    def __init__(self, status, mensaje):
+        super().__init__(mensaje)
+        self.status = status
+
+
+def _detect_many(imagenes):
+    """
+    Detecta landmarks en un micro-lote de imágenes codificadas.
+
+    Corre dentro de un proceso trabajador inicializado con
+    src.batch._init_worker.
+
+    Args:
+        imagenes (list): Bytes de cada imagen (JPEG, PNG, ...)
+
+    Returns:
+        list: Un resultado de src.batch._process_path por imagen
+    """
+    from .batch import _process_path
+
+    resultados = []
+    for datos in imagenes:
+        resultado = _process_path(io.BytesIO(datos))
+        resultado["ruta"] = None  # El buffer no vuelve al proceso principal
+        resultados.append(resultado)
+    return resultados
+
+
+class MicroBatcher:
+    """
+    Cola acotada que agrupa imágenes concurrentes en micro-lotes.
+
+    Mientras todos los trabajadores están ocupados, las imágenes nuevas se
+    acumulan en la cola y forman lotes más grandes; con el servicio ocioso,
+    cada imagen espera como máximo max_wait_ms a que lleguen compañeras.
+    Lo pendiente se reparte entre los trabajadores libres: un lote no se
+    lleva más que su parte aunque max_batch lo permita.
+    """
+
+    def __init__(self, executor, max_batch=SERVER_MAX_BATCH, max_wait_ms=SERVER_MAX_WAIT_MS,
+                 queue_size=SERVER_QUEUE_SIZE, max_in_flight=1, registry=None):
+        """
+        Args:
+            executor (Executor): Pool que ejecuta _detect_many
+            max_batch (int): Imágenes máximas por lote
+            max_wait_ms (float): Espera máxima para completar un lote
+            queue_size (int): Imágenes máximas en espera
+            max_in_flight (int): Lotes enviados al pool a la vez (uno por trabajador)
+            registry (MetricsRegistry): Dónde registrar espera en cola y duración de lotes
+        """
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait_ms / 1000
+        self.registry = registry or MetricsRegistry()
+        self.tamanos = MetricsRegistry(buckets=_BUCKETS_LOTE)
+        self._cola = asyncio.Queue(maxsize=queue_size)
+        self._en_vuelo = asyncio.Semaphore(max_in_flight)
+        self.lotes_en_vuelo = 0
+
+    def free_slots(self):
+        """Lugares libres en la cola."""
+        return self._cola.maxsize - self._cola.qsize()
+
+    async def submit(self, imagenes):
+        """
+        Encola imágenes y espera sus resultados.
+
+        Args:
+            imagenes (list): Bytes de cada imagen
+
+        Returns:
+            list: Resultados en el mismo orden
+
+        Raises:
+            RequestTooLarge: Si hay más imágenes que lugares tiene la cola;
+                reintentar no serviría
+            ServerBusy: Si no hay lugar en la cola para todas las imágenes
+        """
+        if len(imagenes) > self._cola.maxsize:
+            raise RequestTooLarge(f"Se aceptan hasta {self._cola.maxsize} imágenes por petición")
+        if self.free_slots() < len(imagenes):
+            raise ServerBusy(f"Cola llena ({self._cola.qsize()}/{self._cola.maxsize})")
+
+        loop = asyncio.get_running_loop()
+        futuros = []
+        for datos in imagenes:
+            futuro = loop.create_future()
+            self._cola.put_nowait((datos, futuro, time.perf_counter()))
+            futuros.append(futuro)
+        return await asyncio.gather(*futuros)
+
+    def _limite(self, lote):
+        """Tamaño del lote: lo pendiente repartido entre los trabajadores libres."""
+        libres = max(1, self.max_in_flight - self.lotes_en_vuelo)
+        pendientes = len(lote) + self._cola.qsize()
+        return min(self.max_batch, -(-pendientes // libres))
+
+    def _drenar(self, lote):
+        """Completa el lote con lo que ya esté en la cola, sin esperar."""
+        limite = self._limite(lote)
+        while len(lote) < limite and not self._cola.empty():
+            lote.append(self._cola.get_nowait())
+
+    async def run(self):
+        """Bucle del despachador: forma lotes y los envía al pool."""
+        while True:
+            lote = [await self._cola.get()]
+            # Esperar un trabajador libre deja que la cola se llene
+            await self._en_vuelo.acquire()
+            self._drenar(lote)
+            if len(lote) < self.max_batch and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+                self._drenar(lote)
+            # Se cuenta antes de que arranque la tarea, para que el próximo
+            # lote ya vea un trabajador menos
+            self.lotes_en_vuelo += 1
+            asyncio.create_task(self._despachar(lote))
+
+    async def _despachar(self, lote):
+        """Ejecuta un lote en el pool y resuelve los futuros de cada imagen."""
+        inicio = time.perf_counter()
+        for _, _, llegada in lote:
+            self.registry.observe("cola", inicio - llegada)
+        self.tamanos.observe("lote", len(lote))
+
+        try:
+            resultados = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _detect_many, [datos for datos, _, _ in lote])
+        except Exception as e:
+            for _, futuro, _ in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+        else:
+            for (_, futuro, _), resultado in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(resultado)
+        finally:
+            self.lotes_en_vuelo -= 1
+            self._en_vuelo.release()
+            self.registry.observe("lote", time.perf_counter() - inicio)
+
+    def stats(self):
+        """Profundidad de la cola y lotes en curso."""
+        return {
+            "cola": self._cola.qsize(),
+            "capacidad_cola": self._cola.maxsize,
+            "lotes_en_vuelo": self.lotes_en_vuelo,
+        }
+
+
+def _resultado_json(resultado):
+    """Convierte un resultado del trabajador en un diccionario serializable."""
+    if resultado["error"]:
+        return {"error": resultado["error"]}
+
+    landmarks = resultado["landmarks"]
+    return {
+        "ancho": resultado["ancho"],
+        "alto": resultado["alto"],
+        "rostros_detectados": resultado["info"]["rostros_detectados"],
+        "landmarks": landmarks["normalizados"].tolist(),
+        "cajas": landmarks["cajas"].tolist(),
+        # NaN no es JSON válido: sin confianza informada se devuelve null
+        "puntajes": [None if np.isnan(p) else float(p) for p in landmarks["puntajes"]],
+    }
+
+
+def _resultado_npz(resultado):
+    """Serializa un resultado como archivo .npz en memoria."""
+    landmarks = resultado["landmarks"]
+    buffer = io.BytesIO()
+    np.savez(buffer, ancho=resultado["ancho"], alto=resultado["alto"],
+             landmarks=landmarks["normalizados"], cajas=landmarks["cajas"],
+             puntajes=landmarks["puntajes"])
+    return buffer.getvalue()
+
+
+class LandmarkServer:
+    """
+    Servidor HTTP/1.1 mínimo sobre asyncio con micro-lotes hacia un pool de procesos.
+    """
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, workers=None,
+                 queue_size=SERVER_QUEUE_SIZE, max_batch=SERVER_MAX_BATCH,
+                 max_wait_ms=SERVER_MAX_WAIT_MS, max_width=SERVER_MAX_WIDTH, max_faces=None,
+                 max_body=SERVER_MAX_BODY_BYTES):
+        """
+        Args:
+            host (str): Dirección en la que escuchar
+            port (int): Puerto (0 = uno libre, ver self.port tras start())
+            workers (int): Procesos trabajadores (por defecto, uno por núcleo)
+            queue_size (int): Imágenes máximas en espera antes de responder
+                429; una petición con más imágenes recibe 413
+            max_batch (int): Imágenes máximas por micro-lote
+            max_wait_ms (float): Espera máxima para completar un micro-lote
+            max_width (int): Ancho al que se reducen las imágenes (None = original)
+            max_faces (int): Rostros máximos por imagen (ver detector.create_detector)
+            max_body (int): Tamaño máximo del cuerpo de una petición en bytes
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.max_width = max_width
+        self.max_faces = max_faces
+        self.max_body = max_body
+
+        self.registry = MetricsRegistry()
+        self.respuestas = {}
+        self.batcher = None
+        self._executor = None
+        self._servidor = None
+        self._despachador = None
+
+    async def start(self):
+        """Inicia el pool de trabajadores, el despachador y el socket."""
+        from .batch import _init_worker
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            initargs=(self.max_width, None, self.max_faces))
+        self.batcher = MicroBatcher(self._executor, self.max_batch, self.max_wait_ms,
+                                    self.queue_size, max_in_flight=self.workers,
+                                    registry=self.registry)
+        self._despachador = asyncio.create_task(self.batcher.run())
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.port)
+        self.port = self._servidor.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Atiende peticiones hasta que se cancele la tarea."""
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    async def close(self):
+        """Cierra el socket, el despachador y el pool."""
+        if self._servidor:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        if self._despachador:
+            self._despachador.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _leer_peticion(self, reader):
+        """
+        Lee una petición HTTP/1.1.
+
+        Returns:
+            tuple: (método, ruta, parámetros, encabezados, cuerpo) o None si
+                el cliente cerró la conexión
+        """
+        linea = await reader.readline()
+        if not linea:
+            return None
+        try:
+            metodo, destino, _ = linea.decode("latin-1").split()
+        except ValueError:
+            raise _ErrorHTTP(400, "Línea de petición inválida")
+
+        encabezados = {}
+        while True:
+            linea = await reader.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            encabezados[nombre.strip().lower()] = valor.strip()
+
+        try:
+            largo = int(encabezados.get("content-length", 0))
+        except ValueError:
+            largo = -1
+        if largo < 0:
+            raise _ErrorHTTP(400, "Content-Length inválido")
+        if largo > self.max_body:
+            raise _ErrorHTTP(413, f"El cuerpo supera {self.max_body} bytes")
+        cuerpo = await reader.readexactly(largo) if largo else b""
+
+        url = urlsplit(destino)
+        parametros = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+        return metodo, url.path, parametros, encabezados, cuerpo
+
+    async def _atender(self, reader, writer):
+        """Atiende una conexión, con keep-alive."""
+        try:
+            while True:
+                inicio = time.perf_counter()
+                cerrar = True
+                ruta = "-"
+                try:
+                    peticion = await self._leer_peticion(reader)
+                    if peticion is None:
+                        break
+                    metodo, ruta, parametros, encabezados, cuerpo = peticion
+                    cerrar = encabezados.get("connection", "").lower() == "close"
+                    status, tipo, datos = await self._rutear(metodo, ruta, parametros, cuerpo)
+                except _ErrorHTTP as e:
+                    status, tipo, datos = e.status, "application/json", _json({"error": str(e)})
+                except ServerBusy as e:
+                    status, tipo, datos = 429, "application/json", _json({"error": str(e)})
+                except RequestTooLarge as e:
+                    status, tipo, datos = 413, "application/json", _json({"error": str(e)})
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    status, tipo, datos = 500, "application/json", _json({"error": str(e)})
+
+                self._escribir(writer, status, tipo, datos, cerrar)
+                await writer.drain()
+                clave = (ruta, status)
+                self.respuestas[clave] = self.respuestas.get(clave, 0) + 1
+                if ruta.startswith("/v1/"):
+                    self.registry.observe("peticion", time.perf_counter() - inicio)
+                if cerrar:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _escribir(writer, status, tipo, datos, cerrar):
+        """Escribe una respuesta HTTP completa."""
+        encabezados = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {tipo}",
+            f"Content-Length: {len(datos)}",
+            f"Connection: {'close' if cerrar else 'keep-alive'}",
+        ]
+        if status == 429:
+            encabezados.append("Retry-After: 1")
+        writer.write(("\r\n".join(encabezados) + "\r\n\r\n").encode("latin-1") + datos)
+
+    async def _rutear(self, metodo, ruta, parametros, cuerpo):
+        """
+        Resuelve una petición.
+
+        Returns:
+            tuple: (status, Content-Type, cuerpo de la respuesta)
+        """
+        rutas = {
+            "/v1/landmarks": ("POST", self._landmarks),
+            "/v1/landmarks/bulk": ("POST", self._bulk),
+            "/healthz": ("GET", self._healthz),
+            "/metrics": ("GET", self._metrics),
+        }
+        if ruta not in rutas:
+            raise _ErrorHTTP(404, f"Ruta desconocida: {ruta}")
+        esperado, manejador = rutas[ruta]
+        if metodo != esperado:
+            raise _ErrorHTTP(405, f"{ruta} solo acepta {esperado}")
+        return await manejador(parametros, cuerpo)
+
+    async def _landmarks(self, parametros, cuerpo):
+        formato = parametros.get("formato", "json")
+        if formato not in ("json", "npz", "vector", "svg"):
+            raise _ErrorHTTP(400, f"Formato no soportado: {formato}")
+        capas = [capa for capa in parametros.get("capas", "teselacion").split(",") if capa]
+        if set(capas) - set(RENDER_LAYERS):
+            raise _ErrorHTTP(400, f"Capas soportadas: {', '.join(RENDER_LAYERS)}")
+        if not cuerpo:
+            raise _ErrorHTTP(400, "El cuerpo debe contener una imagen")
+
+        resultado, = await self.batcher.submit([cuerpo])
+        if resultado["error"]:
+            return 422, "application/json", _json({"error": resultado["error"]})
+        if formato == "npz":
+            return 200, "application/octet-stream", _resultado_npz(resultado)
+        if formato in ("vector", "svg"):
+            from .vector import overlay_svg, vector_payload
+            argumentos = (resultado["landmarks"], resultado["ancho"], resultado["alto"], capas)
+            if formato == "svg":
+                return 200, "image/svg+xml", overlay_svg(*argumentos).encode("utf-8")
+            return 200, "application/json", _json(vector_payload(*argumentos))
+        return 200, "application/json", _json(_resultado_json(resultado))
+
+    async def _bulk(self, parametros, cuerpo):
+        try:
+            imagenes = [base64.b64decode(imagen, validate=True)
+                        for imagen in json.loads(cuerpo)["imagenes"]]
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            raise _ErrorHTTP(400, 'Se espera {"imagenes": ["<base64>", ...]}')
+        if not imagenes:
+            raise _ErrorHTTP(400, "La lista de imágenes está vacía")
+
+        resultados = await self.batcher.submit(imagenes)
+        return 200, "application/json", _json(
+            {"resultados": [_resultado_json(resultado) for resultado in resultados]})
+
+    async def _healthz(self, parametros, cuerpo):
+        return 200, "application/json", _json(
+            {"estado": "ok", "trabajadores": self.workers, **self.batcher.stats()})
+
+    async def _metrics(self, parametros, cuerpo):
+        estado = self.batcher.stats()
+        lineas = [
+            "# HELP face_server_requests_total Respuestas por ruta y código.",
+            "# TYPE face_server_requests_total counter",
+        ]
+        for (ruta, status), total in sorted(self.respuestas.items()):
+            lineas.append(f'face_server_requests_total{{path="{ruta}",status="{status}"}} {total}')
+        lineas += [
+            "# HELP face_server_queue_depth Imágenes esperando en la cola.",
+            "# TYPE face_server_queue_depth gauge",
+            f"face_server_queue_depth {estado['cola']}",
+            "# HELP face_server_batches_in_flight Micro-lotes en ejecución.",
+            "# TYPE face_server_batches_in_flight gauge",
+            f"face_server_batches_in_flight {estado['lotes_en_vuelo']}",
+        ]
+        texto = ("\n".join(lineas) + "\n"
+                 + self.registry.prometheus_text(
+                     "face_server_stage_seconds",
+                     "Espera en cola, duración de lotes y de peticiones.")
+                 + self.batcher.tamanos.prometheus_text(
+                     "face_server_batch_size", "Imágenes por micro-lote."))
+        return 200, "text/plain; version=0.0.4", texto.encode("utf-8")
+
+
+def _json(valor):
+    return json.dumps(valor, ensure_ascii=False).encode("utf-8")
+
+
+async def _servir(servidor):
+    await servidor.start()
+    print(f"Escuchando en http://{servidor.host}:{servidor.port} "
+          f"({servidor.workers} trabajadores)", file=sys.stderr)
+    try:
+        await servidor.serve_forever()
+    finally:
+        await servidor.close()
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Servicio HTTP local de detección de landmarks faciales."
+    )
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="Procesos trabajadores (por defecto, uno por núcleo)")
+    parser.add_argument("--queue-size", type=int, default=SERVER_QUEUE_SIZE,
+                        help="Imágenes en espera antes de responder 429")
+    parser.add_argument("--max-batch", type=int, default=SERVER_MAX_BATCH,
+                        help="Imágenes máximas por micro-lote")
+    parser.add_argument("--max-wait-ms", type=float, default=SERVER_MAX_WAIT_MS,
+                        help="Espera máxima para completar un micro-lote")
+    parser.add_argument("--max-width", type=int, default=SERVER_MAX_WIDTH,
+                        help="Reducir las imágenes a este ancho antes de detectar")
+    parser.add_argument("--max-faces", type=int, default=None,
+                        help="Rostros máximos por imagen")
+    args = parser.parse_args(argv)
+
+    servidor = LandmarkServer(args.host, args.port, args.workers, args.queue_size,
+                              args.max_batch, args.max_wait_ms, args.max_width, args.max_faces)
+    try:
+        asyncio.run(_servir(servidor))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
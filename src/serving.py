@@ -0,0 +1,528 @@
+"""
+Inferencia compartida entre sesiones del modo cámara.
+
+Con un FaceMeshTransformer por sesión, cada visitante crea su propio grafo de
+FaceMesh dentro del proceso de Streamlit y todos compiten por el GIL. En su
+lugar, SharedInferencePool mantiene una cantidad fija de procesos de
+inferencia y cada sesión obtiene un ServingSession con la misma interfaz que
+LatestFrameWorker:
+
+- Los cuadros viajan por memoria compartida: el espacio se divide en
+  ranuras de tamaño fijo que se reciclan como un anillo, y por las colas
+  solo pasan índices de ranura y, de vuelta, los landmarks. La memoria total
+  no depende de la cantidad de sesiones.
+- Cada sesión tiene a lo sumo un cuadro pendiente (el más reciente) y el
+  despachador atiende a las sesiones por turnos, así una cámara rápida no
+  deja sin inferencia a las demás.
+- Los trabajadores procesan cada cuadro como imagen estática, porque los
+  cuadros de distintas sesiones se intercalan; la compuerta de cuadros y el
+  suavizado One Euro de cada sesión corren en el proceso principal.
+- Si un trabajador muere (por ejemplo, por falta de memoria), el cuadro que
+  tenía se informa como error a su sesión, la ranura vuelve al anillo y el
+  proceso se reemplaza por uno nuevo. Un trabajador que muere una y otra vez
+  sin entregar resultados (por ejemplo, porque no puede cargar el modelo)
+  deja de reemplazarse.
+"""
+import atexit
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from .config import (
+    REALTIME_LATENCY_WINDOW, SERVING_WORKERS, SERVING_SLOTS, SERVING_MAX_WIDTH,
+    SERVING_MAX_HEIGHT, SERVING_WATCH_INTERVAL, SERVING_MAX_RESTARTS
+)
+from .detector import face_boxes
+from .tracking import FrameGate, OneEuroFilter
+
+
+class FrameArena:
+    """Bloque de memoria compartida dividido en ranuras para cuadros RGB."""
+
+    def __init__(self, slots, max_width, max_height, name=None):
+        """
+        Args:
+            slots (int): Cantidad de ranuras
+            max_width (int): Ancho máximo de un cuadro
+            max_height (int): Alto máximo de un cuadro
+            name (str): Nombre de un bloque existente al que conectarse; si es
+                None se crea uno nuevo
+        """
+        self.slots = slots
+        self.max_width = max_width
+        self.max_height = max_height
+        self.slot_bytes = max_width * max_height * 3
+        self._propietario = name is None
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=name is None, size=slots * self.slot_bytes)
+        self.name = self.shm.name
+
+    def view(self, slot, height, width):
+        """
+        Devuelve un array que apunta directamente a una ranura.
+
+        Args:
+            slot (int): Índice de la ranura
+            height (int): Alto del cuadro guardado
+            width (int): Ancho del cuadro guardado
+
+        Returns:
+            numpy.ndarray: Vista (alto, ancho, 3) uint8 sobre la memoria compartida
+        """
+        return np.ndarray((height, width, 3), dtype=np.uint8, buffer=self.shm.buf,
+                          offset=slot * self.slot_bytes)
+
+    def fit(self, width, height):
+        """Tamaño (ancho, alto) con el que un cuadro entra en una ranura."""
+        escala = min(1.0, self.max_width / width, self.max_height / height)
+        return max(1, int(width * escala)), max(1, int(height * escala))
+
+    def close(self):
+        """Desconecta el bloque y, si este objeto lo creó, lo elimina."""
+        self.shm.close()
+        if self._propietario:
+            self.shm.unlink()
+
+
+def _worker_loop(nombre, slots, max_width, max_height, tareas, resultados, max_faces, listos):
+    """Bucle de un proceso de inferencia: lee ranuras y devuelve landmarks."""
+    from .detector import create_detector
+
+    arena = FrameArena(slots, max_width, max_height, name=nombre)
+    detector = create_detector(max_faces)
+    detector.warm_up()
+    listos.release()
+    try:
+        while True:
+            tarea = tareas.get()
+            if tarea is None:
+                return
+            numero, ranura, alto, ancho = tarea
+            inicio = time.perf_counter()
+            try:
+                _, landmarks, _ = detector.detect(arena.view(ranura, alto, ancho),
+                                                  draw=False, input_format="rgb")
+                resultado = (landmarks["normalizados"], landmarks["puntajes"])
+                error = None
+            except Exception as exc:  # El error viaja a la sesión, no tira el proceso
+                resultado, error = None, repr(exc)
+            resultados.put((numero, ranura, resultado, (time.perf_counter() - inicio) * 1000,
+                            error))
+    finally:
+        detector.close()
+        arena.close()
+
+
+def _percentil(valores, q):
+    """Percentil de una secuencia de latencias (None si está vacía)."""
+    return float(np.percentile(valores, q)) if valores else None
+
+
+class ServingSession:
+    """
+    Sesión de cámara atendida por un SharedInferencePool.
+
+    Tiene la misma interfaz que realtime.LatestFrameWorker (submit, latest,
+    stats y close), así FaceMeshTransformer puede usar cualquiera de los dos.
+    """
+
+    def __init__(self, pool, session_id, smoothing=True, gate=True,
+                 latency_window=REALTIME_LATENCY_WINDOW):
+        """
+        Args:
+            pool (SharedInferencePool): Pool que atiende a la sesión
+            session_id (int): Identificador dentro del pool
+            smoothing (bool): Aplicar el filtro One Euro a los landmarks
+            gate (bool): No enviar cuadros que casi no cambiaron
+            latency_window (int): Cuadros usados para calcular percentiles
+        """
+        self.pool = pool
+        self.id = session_id
+        self.filter = OneEuroFilter() if smoothing else None
+        self.gate = FrameGate() if gate else None
+        self._pendiente = None
+        self._resultado = None
+        self._cerrada = False
+
+        self.recibidos = 0
+        self.procesados = 0
+        self.descartados = 0
+        self.reutilizados = 0
+        self.errores = 0
+        self._latencias = deque(maxlen=latency_window)
+
+    def submit(self, image_rgb):
+        """
+        Entrega un cuadro al pool sin bloquear.
+
+        Args:
+            image_rgb (numpy.ndarray): Cuadro RGB; se copia a la memoria
+                compartida, así que el llamador conserva su buffer
+        """
+        self.recibidos += 1
+        if (self.gate is not None and not self.gate.changed(image_rgb)
+                and self._resultado is not None):
+            self.reutilizados += 1
+            return
+        self.pool._entregar(self, image_rgb)
+
+    def latest(self):
+        """
+        Devuelve el resultado más reciente disponible.
+
+        Returns:
+            tuple: (landmarks, info) como en FaceLandmarkDetector.detect,
+                o None si todavía no hay resultados
+        """
+        return self._resultado
+
+    def _recibir(self, resultado, forma, llegada, worker_ms, error):
+        """Arma los landmarks de un cuadro procesado (hilo colector del pool)."""
+        if error is not None:
+            self.errores += 1
+            return
+        normalizados, puntajes = resultado
+        alto, ancho = forma
+        pixeles = normalizados * np.array([ancho, alto, ancho], dtype=np.float32)
+        if len(pixeles) == 0:
+            if self.filter is not None:
+                self.filter.reset()
+        elif self.filter is not None:
+            pixeles = self.filter(pixeles, llegada)
+            normalizados = pixeles / np.array([ancho, alto, ancho], dtype=np.float32)
+
+        landmarks = {
+            "normalizados": normalizados,
+            "pixeles": pixeles,
+            "cajas": face_boxes(pixeles),
+            "puntajes": puntajes,
+        }
+        latencia_ms = (time.perf_counter() - llegada) * 1000
+        self._resultado = (landmarks, {"rostros_detectados": len(pixeles),
+                                       "inferencia_ms": worker_ms, "latencia_ms": latencia_ms})
+        self.procesados += 1
+        self._latencias.append(latencia_ms)
+
+    def stats(self):
+        """
+        Devuelve los contadores de la sesión.
+
+        Returns:
+            dict: Las mismas claves que LatestFrameWorker.stats, más
+                "reutilizados" y "tasa_reutilizacion"
+        """
+        latencias = list(self._latencias)
+        recibidos = self.recibidos
+        return {
+            "cuadros_recibidos": recibidos,
+            "cuadros_procesados": self.procesados,
+            "cuadros_descartados": self.descartados,
+            "tasa_descarte": self.descartados / recibidos if recibidos else 0.0,
+            "latencia_ms_ultima": latencias[-1] if latencias else None,
+            "latencia_ms_p50": _percentil(latencias, 50),
+            "latencia_ms_p95": _percentil(latencias, 95),
+            "reutilizados": self.reutilizados,
+            "tasa_reutilizacion": self.reutilizados / recibidos if recibidos else 0.0,
+            "errores": self.errores,
+        }
+
+    def close(self):
+        """Libera el cuadro pendiente; el pool sigue atendiendo a las demás sesiones."""
+        self.pool._cerrar_sesion(self)
+
+
+class SharedInferencePool:
+    """
+    Procesos de inferencia compartidos por todas las sesiones del modo cámara.
+
+    La memoria usada es fija: slots ranuras de max_width x max_height x 3
+    bytes más un detector por trabajador, sin importar cuántas sesiones haya.
+    Los cuadros más grandes que una ranura se reducen al copiarlos.
+    """
+
+    def __init__(self, workers=SERVING_WORKERS, slots=SERVING_SLOTS,
+                 max_width=SERVING_MAX_WIDTH, max_height=SERVING_MAX_HEIGHT, max_faces=None,
+                 watch_interval=SERVING_WATCH_INTERVAL, max_restarts=SERVING_MAX_RESTARTS):
+        """
+        Inicia los procesos de inferencia y los hilos de despacho.
+
+        Args:
+            workers (int): Procesos de inferencia
+            slots (int): Ranuras de memoria compartida (al menos workers + 1)
+            max_width (int): Ancho máximo de un cuadro en la ranura
+            max_height (int): Alto máximo de un cuadro en la ranura
+            max_faces (int): Rostros máximos por cuadro (ver create_detector)
+            watch_interval (float): Segundos entre revisiones de trabajadores caídos
+            max_restarts (int): Reemplazos seguidos de un trabajador que muere
+                sin entregar resultados antes de darlo de baja
+        """
+        if slots <= workers:
+            raise ValueError("Se necesitan más ranuras que trabajadores")
+
+        self.workers = workers
+        self.arena = FrameArena(slots, max_width, max_height)
+        self._libres = deque(range(slots))
+        self._turnos = deque()  # Sesiones con un cuadro pendiente, en orden de atención
+        self._en_curso = {}  # ranura -> (número de tarea, trabajador, sesión, forma original, llegada)
+        self._asignadas = {}  # trabajador -> ranura que está procesando
+        self._sesiones = {}
+        self._ids = itertools.count()
+        self._condicion = threading.Condition()
+        self._cerrado = False
+        self.despachados = 0
+        self.sin_ranura = 0
+        self.reinicios = 0
+        self.watch_interval = watch_interval
+        self.max_restarts = max_restarts
+        self._fallas = [0] * workers  # Muertes seguidas sin resultados, por trabajador
+        self._de_baja = set()
+
+        # spawn: el proceso principal (Streamlit) tiene hilos y no conviene hacer fork
+        self._contexto = multiprocessing.get_context("spawn")
+        self._argumentos = (self.arena.name, slots, max_width, max_height)
+        self._max_faces = max_faces
+        # Una cola por trabajador: se sabe qué ranura tenía cada uno si muere
+        self._tareas = [self._contexto.Queue() for _ in range(workers)]
+        self._resultados = self._contexto.Queue()
+        self._listos = self._contexto.Semaphore(0)
+        self._procesos = [self._lanzar(i) for i in range(workers)]
+        self._pendientes_listos = workers
+
+        self._hilos = [
+            threading.Thread(target=self._despachar, name="serving-despacho", daemon=True),
+            threading.Thread(target=self._recolectar, name="serving-resultados", daemon=True),
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def _lanzar(self, trabajador):
+        """Inicia el proceso de inferencia de un trabajador."""
+        proceso = self._contexto.Process(
+            target=_worker_loop, name=f"serving-{trabajador}", daemon=True,
+            args=(*self._argumentos, self._tareas[trabajador], self._resultados,
+                  self._max_faces, self._listos))
+        proceso.start()
+        return proceso
+
+    def session(self, **kwargs):
+        """
+        Registra una sesión nueva.
+
+        Args:
+            **kwargs: Opciones de ServingSession (smoothing, gate, latency_window)
+
+        Returns:
+            ServingSession: Sesión con la interfaz de LatestFrameWorker
+        """
+        with self._condicion:
+            sesion = ServingSession(self, next(self._ids), **kwargs)
+            self._sesiones[sesion.id] = sesion
+            return sesion
+
+    def _entregar(self, sesion, image_rgb):
+        """Copia el cuadro a una ranura y lo deja pendiente para la sesión."""
+        alto, ancho = image_rgb.shape[:2]
+        ancho_ranura, alto_ranura = self.arena.fit(ancho, alto)
+        with self._condicion:
+            if self._cerrado or sesion._cerrada:
+                return
+            if sesion._pendiente is not None:
+                # El cuadro anterior todavía no se despachó: se reemplaza
+                sesion.descartados += 1
+                ranura = sesion._pendiente[0]
+            elif self._libres:
+                ranura = self._libres.popleft()
+            else:
+                sesion.descartados += 1
+                self.sin_ranura += 1
+                return
+
+            # La copia ocurre con el lock tomado para que el despachador no
+            # envíe la ranura a medio escribir (cuesta menos de un milisegundo)
+            destino = self.arena.view(ranura, alto_ranura, ancho_ranura)
+            if (ancho_ranura, alto_ranura) == (ancho, alto):
+                np.copyto(destino, image_rgb)
+            else:
+                cv2.resize(image_rgb, (ancho_ranura, alto_ranura), dst=destino,
+                           interpolation=cv2.INTER_AREA)
+
+            if sesion._pendiente is None:
+                self._turnos.append(sesion)
+            sesion._pendiente = (ranura, (alto_ranura, ancho_ranura), (alto, ancho),
+                                 time.perf_counter())
+            self._condicion.notify_all()
+
+    def _despachar(self):
+        """Envía cuadros pendientes, una sesión por turno, a un trabajador libre por vez."""
+        while True:
+            with self._condicion:
+                while not self._cerrado and (
+                        not self._turnos
+                        or len(self._asignadas) + len(self._de_baja) >= self.workers):
+                    self._condicion.wait()
+                if self._cerrado:
+                    return
+                trabajador = next(i for i in range(self.workers)
+                                  if i not in self._asignadas and i not in self._de_baja)
+                sesion = self._turnos.popleft()
+                ranura, forma_ranura, forma, llegada = sesion._pendiente
+                sesion._pendiente = None
+                self.despachados += 1
+                numero = self.despachados
+                self._en_curso[ranura] = (numero, trabajador, sesion, forma, llegada)
+                self._asignadas[trabajador] = ranura
+            self._tareas[trabajador].put((numero, ranura, *forma_ranura))
+
+    def _recolectar(self):
+        """Recibe landmarks de los trabajadores, libera sus ranuras y vigila que sigan vivos."""
+        while True:
+            try:
+                mensaje = self._resultados.get(timeout=self.watch_interval)
+            except queue.Empty:
+                mensaje = ()
+            if mensaje is None:
+                return
+            self._vigilar()
+            if not mensaje:
+                continue
+
+            numero, ranura, resultado, worker_ms, error = mensaje
+            with self._condicion:
+                entrada = self._en_curso.get(ranura)
+                if entrada is None or entrada[0] != numero:
+                    # La ranura ya se dio por perdida con un trabajador caído
+                    continue
+                _, trabajador, sesion, forma, llegada = self._en_curso.pop(ranura)
+                self._asignadas.pop(trabajador, None)
+                self._fallas[trabajador] = 0
+                self._libres.append(ranura)
+                self._condicion.notify_all()
+            if not sesion._cerrada:
+                sesion._recibir(resultado, forma, llegada, worker_ms, error)
+
+    def _vigilar(self):
+        """Reemplaza los trabajadores caídos y devuelve la ranura que tenían."""
+        perdidas = []
+        with self._condicion:
+            if self._cerrado:
+                return
+            for trabajador, proceso in enumerate(self._procesos):
+                if proceso.is_alive() or trabajador in self._de_baja:
+                    continue
+                ranura = self._asignadas.pop(trabajador, None)
+                if ranura is not None:
+                    _, _, sesion, forma, llegada = self._en_curso.pop(ranura)
+                    self._libres.append(ranura)
+                    perdidas.append((sesion, forma, llegada, proceso.exitcode))
+                self._fallas[trabajador] += 1
+                if self._fallas[trabajador] > self.max_restarts:
+                    self._de_baja.add(trabajador)
+                else:
+                    # Una tarea que el proceso no llegó a leer apunta a una ranura ya liberada
+                    self._tareas[trabajador] = self._contexto.Queue()
+                    self._procesos[trabajador] = self._lanzar(trabajador)
+                    self.reinicios += 1
+                self._condicion.notify_all()
+        for sesion, forma, llegada, codigo in perdidas:
+            if not sesion._cerrada:
+                sesion._recibir(None, forma, llegada, None,
+                                f"El trabajador de inferencia terminó (código {codigo})")
+
+    def _cerrar_sesion(self, sesion):
+        """Quita la sesión de los turnos y devuelve su ranura pendiente."""
+        with self._condicion:
+            sesion._cerrada = True
+            if sesion._pendiente is not None:
+                self._turnos.remove(sesion)
+                self._libres.append(sesion._pendiente[0])
+                sesion._pendiente = None
+            self._sesiones.pop(sesion.id, None)
+            self._condicion.notify_all()
+
+    def wait_ready(self, timeout=None):
+        """
+        Espera a que todos los procesos terminen de cargar y precalentar su detector.
+
+        Args:
+            timeout (float): Segundos máximos de espera en total
+
+        Returns:
+            bool: True si todos están listos
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._pendientes_listos:
+            restante = None if limite is None else max(0.0, limite - time.monotonic())
+            if not self._listos.acquire(timeout=restante):
+                return False
+            self._pendientes_listos -= 1
+        return True
+
+    @property
+    def worker_pids(self):
+        """PIDs de los procesos de inferencia."""
+        return [proceso.pid for proceso in self._procesos]
+
+    def stats(self):
+        """
+        Devuelve el estado del pool.
+
+        Returns:
+            dict: Sesiones activas, trabajadores vivos, ranuras libres y en
+                curso, cuadros despachados y descartados por falta de ranura,
+                trabajadores reemplazados y memoria compartida en MB
+        """
+        with self._condicion:
+            return {
+                "sesiones": len(self._sesiones),
+                "trabajadores": sum(p.is_alive() for p in self._procesos),
+                "ranuras_libres": len(self._libres),
+                "ranuras_en_curso": len(self._en_curso),
+                "despachados": self.despachados,
+                "sin_ranura": self.sin_ranura,
+                "reinicios": self.reinicios,
+                "memoria_mb": self.arena.slots * self.arena.slot_bytes / 2**20,
+            }
+
+    def close(self):
+        """Detiene hilos y procesos y elimina la memoria compartida."""
+        with self._condicion:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            self._condicion.notify_all()
+        for tareas in self._tareas:
+            tareas.put(None)
+        for proceso in self._procesos:
+            proceso.join(timeout=5)
+            if proceso.is_alive():
+                proceso.terminate()
+        self._resultados.put(None)
+        for hilo in self._hilos:
+            hilo.join()
+        self.arena.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_serving_pool():
+    """
+    Devuelve el pool de inferencia compartido por todas las sesiones del proceso.
+
+    Returns:
+        SharedInferencePool: Pool creado en la primera llamada
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SharedInferencePool()
+            atexit.register(_pool.close)
+        return _pool
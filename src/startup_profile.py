@@ -0,0 +1,110 @@
+"""
+Perfil de tiempos de importación al arrancar la aplicación.
+
+Uso:
+    python -m src.startup_profile [--top 15] [--json perfil.json]
+
+Cada escenario corresponde a lo que app.py carga en un modo dado y se mide
+en un intérprete nuevo con `python -X importtime`, así los módulos ya
+importados no ocultan su costo.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Lo que importa app.py en cada modo (ver sus funciones get_*)
+ESCENARIOS = {
+    "arranque": "import streamlit",
+    "subir_imagen": "import src.detector, src.cache, src.utils, src.vector",
+    "camara": "import streamlit_webrtc, src.realtime, src.serving",
+}
+
+
+def parse_importtime(texto):
+    """
+    Interpreta la salida de `python -X importtime`.
+
+    Args:
+        texto (str): Salida de error estándar del intérprete
+
+    Returns:
+        list: Diccionarios con "modulo", "propio_ms", "acumulado_ms" y
+            "nivel" (0 = importado directamente por el escenario)
+    """
+    modulos = []
+    for linea in texto.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        modulos.append({
+            "modulo": nombre.strip(),
+            "propio_ms": int(propio) / 1000,
+            "acumulado_ms": int(acumulado) / 1000,
+            "nivel": (len(nombre) - len(nombre.lstrip()) - 1) // 2,
+        })
+    return modulos
+
+
+def profile(codigo):
+    """
+    Ejecuta un escenario en un proceso nuevo y mide sus importaciones.
+
+    Args:
+        codigo (str): Código a ejecutar con `python -c`
+
+    Returns:
+        dict: "total_ms" (suma de importaciones de primer nivel),
+            "proceso_ms" (duración del proceso completo) y "modulos"
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    inicio = time.perf_counter()
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                             cwd=raiz, capture_output=True, text=True)
+    duracion = (time.perf_counter() - inicio) * 1000
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1])
+
+    modulos = parse_importtime(proceso.stderr)
+    return {
+        "total_ms": sum(m["acumulado_ms"] for m in modulos if m["nivel"] == 0),
+        "proceso_ms": duracion,
+        "modulos": modulos,
+    }
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Mide el tiempo de importación de cada modo de la aplicación."
+    )
+    parser.add_argument("escenarios", nargs="*",
+                        help=f"Escenarios a medir: {', '.join(ESCENARIOS)} (por defecto, todos)")
+    parser.add_argument("--top", type=int, default=15,
+                        help="Módulos más lentos a listar por escenario")
+    parser.add_argument("--json", default=None, help="Guardar el perfil completo en JSON")
+    args = parser.parse_args(argv)
+    desconocidos = set(args.escenarios) - set(ESCENARIOS)
+    if desconocidos:
+        parser.error(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+
+    perfiles = {}
+    for nombre in args.escenarios or ESCENARIOS:
+        perfil = perfiles[nombre] = profile(ESCENARIOS[nombre])
+        print(f"\n{nombre}: {perfil['total_ms']:.0f} ms en importaciones "
+              f"({perfil['proceso_ms']:.0f} ms el proceso completo)")
+        print(f"  {'acumulado':>10} {'propio':>8}  módulo")
+        mas_lentos = sorted(perfil["modulos"], key=lambda m: -m["acumulado_ms"])[:args.top]
+        for modulo in mas_lentos:
+            print(f"  {modulo['acumulado_ms']:8.1f} ms {modulo['propio_ms']:6.1f} ms  "
+                  f"{'  ' * modulo['nivel']}{modulo['modulo']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as archivo:
+            json.dump(perfiles, archivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
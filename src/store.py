@@ -0,0 +1,429 @@
+"""
+Almacén binario de landmarks, de solo agregado y legible con numpy.memmap.
+
+Formato del archivo:
+    - Cabecera fija de 64 bytes (ver _HEADER_DTYPE).
+    - Registros de tamaño fijo, uno por rostro (ver record_dtype), con la
+      caja en píxeles y el puntaje de detect() además de los landmarks. Las
+      imágenes sin rostros ocupan un registro con deteccion_exitosa = 0.
+    - Archivo auxiliar "<ruta>.names" con el nombre de cada imagen, una por
+      línea, en el orden de su identificador.
+
+Las coordenadas se guardan normalizadas (x, y en [0, 1]) en float32, float16
+o int16 cuantizado (valor * escala). Como el tamaño de registro es fijo, el
+registro i está en cabecera + i * tamaño y se accede sin cargar el archivo.
+
+Uso:
+    python -m src.store export resultados/landmarks.npz caras.flms --encoding int16
+"""
+import argparse
+import os
+
+import numpy as np
+
+from .config import STORE_ENCODING, STORE_INT16_SCALE, TOTAL_LANDMARKS
+
+MAGIC = b"FLMS"
+VERSION = 1
+HEADER_SIZE = 64
+
+_HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("codificacion", "<u2"),
+    ("landmarks", "<u4"),
+    ("escala", "<f4"),
+    ("tamano_registro", "<u4"),
+    ("registros", "<u8"),
+    ("imagenes", "<u8"),
+    ("reservado", "V28"),
+])
+
+# Tipo de dato de las coordenadas según la codificación
+ENCODINGS = {"float32": "<f4", "float16": "<f2", "int16": "<i2"}
+_CODIGOS = {nombre: codigo for codigo, nombre in enumerate(ENCODINGS)}
+
+
+def record_dtype(encoding=STORE_ENCODING, landmarks=TOTAL_LANDMARKS):
+    """
+    Tipo estructurado de un registro del almacén.
+
+    Args:
+        encoding (str): "float32", "float16" o "int16"
+        landmarks (int): Landmarks por rostro
+
+    Returns:
+        numpy.dtype: Tipo con disposición fija (little-endian, sin relleno implícito)
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Codificación no soportada: {encoding}")
+
+    return np.dtype([
+        ("imagen", "<u8"),
+        ("ancho", "<u4"),
+        ("alto", "<u4"),
+        ("rostro", "<u2"),
+        ("rostros_detectados", "<u2"),
+        ("deteccion_exitosa", "u1"),
+        ("reservado", "V3"),
+        ("caja", "<f4", (4,)),
+        ("puntaje", "<f4"),
+        ("landmarks", ENCODINGS[encoding], (landmarks, 3)),
+    ])
+
+
+def _quantize(normalizados, encoding, escala):
+    """Convierte coordenadas normalizadas float32 a la codificación del almacén."""
+    if encoding == "int16":
+        limite = np.iinfo(np.int16)
+        valores = np.rint(normalizados * escala)
+        return np.clip(valores, limite.min, limite.max).astype("<i2")
+    return normalizados.astype(ENCODINGS[encoding])
+
+
+def _dequantize(valores, encoding, escala):
+    """Convierte valores almacenados a coordenadas normalizadas float32."""
+    if encoding == "int16":
+        return valores.astype(np.float32) / np.float32(escala)
+    return valores.astype(np.float32)
+
+
+def _boxes(points_px):
+    """Caja de cada rostro a partir de sus landmarks en píxeles (como detector.face_boxes)."""
+    xy = np.asarray(points_px, dtype=np.float32)[..., :2].reshape(-1, points_px.shape[-2], 2)
+    return np.concatenate((xy.min(axis=1), xy.max(axis=1)), axis=1)
+
+
+def _read_header(ruta):
+    cabecera = np.fromfile(ruta, dtype=_HEADER_DTYPE, count=1)
+    if len(cabecera) != 1 or cabecera["magic"][0] != MAGIC:
+        raise ValueError(f"{ruta} no es un almacén de landmarks válido")
+    if cabecera["version"][0] != VERSION:
+        raise ValueError(f"Versión de almacén no soportada: {cabecera['version'][0]}")
+    return cabecera[0]
+
+
+class LandmarkStoreWriter:
+    """
+    Escritor de solo agregado. Si el archivo existe, continúa al final.
+    """
+
+    def __init__(self, path, encoding=STORE_ENCODING, landmarks=TOTAL_LANDMARKS,
+                 scale=STORE_INT16_SCALE):
+        """
+        Args:
+            path (str): Ruta del almacén
+            encoding (str): "float32", "float16" o "int16" (solo para archivos nuevos)
+            landmarks (int): Landmarks por rostro (solo para archivos nuevos)
+            scale (float): Escala de cuantización int16 (solo para archivos nuevos)
+        """
+        self.path = path
+
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            cabecera = _read_header(path)
+            encoding = list(ENCODINGS)[cabecera["codificacion"]]
+            landmarks = int(cabecera["landmarks"])
+            scale = float(cabecera["escala"])
+            self.dtype = record_dtype(encoding, landmarks)
+            # Un registro a medio escribir (corte abrupto) se descarta
+            self.registros = (os.path.getsize(path) - HEADER_SIZE) // self.dtype.itemsize
+            self._archivo = open(path, "r+b")
+            self._archivo.truncate(HEADER_SIZE + self.registros * self.dtype.itemsize)
+            self._archivo.seek(0, os.SEEK_END)
+            self.imagenes = self._ultima_imagen() + 1
+        else:
+            self.dtype = record_dtype(encoding, landmarks)
+            self.registros = 0
+            self.imagenes = 0
+            self._archivo = open(path, "w+b")
+            self._archivo.write(b"\0" * HEADER_SIZE)
+
+        self.encoding = encoding
+        self.landmarks = landmarks
+        self.scale = scale
+        self._nombres = open(path + ".names", "a", encoding="utf-8")
+        self._sincronizar_nombres()
+        self._escribir_cabecera()
+
+    def _ultima_imagen(self):
+        if self.registros == 0:
+            return -1
+        self._archivo.seek(HEADER_SIZE + (self.registros - 1) * self.dtype.itemsize)
+        ultimo = np.frombuffer(self._archivo.read(self.dtype.itemsize), dtype=self.dtype)
+        self._archivo.seek(0, os.SEEK_END)
+        return int(ultimo["imagen"][0])
+
+    def _sincronizar_nombres(self):
+        """Recorta o completa el archivo de nombres para que coincida con las imágenes."""
+        self._nombres.close()
+        ruta = self.path + ".names"
+        with open(ruta, encoding="utf-8") as archivo:
+            nombres = archivo.read().splitlines()[:self.imagenes]
+        nombres += [""] * (self.imagenes - len(nombres))
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            archivo.writelines(nombre + "\n" for nombre in nombres)
+        self._nombres = open(ruta, "a", encoding="utf-8")
+
+    def _escribir_cabecera(self):
+        cabecera = np.zeros(1, dtype=_HEADER_DTYPE)
+        cabecera["magic"] = MAGIC
+        cabecera["version"] = VERSION
+        cabecera["codificacion"] = _CODIGOS[self.encoding]
+        cabecera["landmarks"] = self.landmarks
+        cabecera["escala"] = self.scale
+        cabecera["tamano_registro"] = self.dtype.itemsize
+        cabecera["registros"] = self.registros
+        cabecera["imagenes"] = self.imagenes
+        posicion = self._archivo.tell()
+        self._archivo.seek(0)
+        self._archivo.write(cabecera.tobytes())
+        self._archivo.seek(posicion)
+
+    def append(self, landmarks, info, width, height, name="", boxes=None, scores=None):
+        """
+        Agrega los rostros de una imagen.
+
+        Args:
+            landmarks (numpy.ndarray): Coordenadas normalizadas (rostros, 478, 3),
+                como landmarks["normalizados"] de FaceLandmarkDetector.detect
+            info (dict): Información de detección
+            width (int): Ancho de la imagen en píxeles
+            height (int): Alto de la imagen en píxeles
+            name (str): Nombre o ruta de la imagen
+            boxes (numpy.ndarray): Cajas en píxeles (rostros, 4), como
+                landmarks["cajas"]; por defecto se calculan de los landmarks
+            scores (numpy.ndarray): Puntajes (rostros,); por defecto NaN
+
+        Returns:
+            int: Identificador de la imagen dentro del almacén
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float32).reshape(-1, self.landmarks, 3)
+        rostros = len(landmarks)
+
+        registros = np.zeros(max(rostros, 1), dtype=self.dtype)
+        registros["imagen"] = self.imagenes
+        registros["ancho"] = width
+        registros["alto"] = height
+        registros["rostros_detectados"] = rostros
+        registros["deteccion_exitosa"] = bool(info.get("deteccion_exitosa", rostros > 0))
+        if rostros:
+            registros["rostro"] = np.arange(rostros)
+            registros["landmarks"] = _quantize(landmarks, self.encoding, self.scale)
+            if boxes is None:
+                boxes = _boxes(landmarks * np.array([width, height, width], dtype=np.float32))
+            registros["caja"] = np.asarray(boxes, dtype=np.float32).reshape(rostros, 4)
+            registros["puntaje"] = np.nan if scores is None else scores
+        else:
+            registros["puntaje"] = np.nan
+
+        self._archivo.write(registros.tobytes())
+        self._nombres.write(str(name).replace("\n", " ") + "\n")
+        self.registros += len(registros)
+        self.imagenes += 1
+        return self.imagenes - 1
+
+    def flush(self):
+        """Actualiza la cabecera y vuelca los buffers a disco."""
+        self._escribir_cabecera()
+        self._archivo.flush()
+        self._nombres.flush()
+
+    def close(self):
+        """Cierra el almacén dejando la cabecera actualizada."""
+        if self._archivo.closed:
+            return
+        self.flush()
+        self._archivo.close()
+        self._nombres.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkStoreReader:
+    """
+    Lector basado en numpy.memmap: solo se leen del disco las páginas usadas.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Ruta del almacén
+        """
+        self.path = path
+        cabecera = _read_header(path)
+        self.encoding = list(ENCODINGS)[cabecera["codificacion"]]
+        self.scale = float(cabecera["escala"])
+        self.dtype = record_dtype(self.encoding, int(cabecera["landmarks"]))
+
+        # El tamaño del archivo manda: tolera cabeceras no actualizadas tras un corte
+        registros = (os.path.getsize(path) - HEADER_SIZE) // self.dtype.itemsize
+        self.records = np.memmap(path, dtype=self.dtype, mode="r", offset=HEADER_SIZE,
+                                 shape=(registros,)) if registros else np.empty(0, self.dtype)
+        self._nombres = None
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def names(self):
+        """Nombres de las imágenes, indexados por identificador (se leen una vez)."""
+        if self._nombres is None:
+            ruta = self.path + ".names"
+            if os.path.exists(ruta):
+                with open(ruta, encoding="utf-8") as archivo:
+                    self._nombres = archivo.read().splitlines()
+            else:
+                self._nombres = []
+        return self._nombres
+
+    def landmarks(self, selection=slice(None)):
+        """
+        Coordenadas normalizadas float32 de los registros seleccionados.
+
+        Args:
+            selection: Índice, slice o máscara sobre los registros
+
+        Returns:
+            numpy.ndarray: (registros, 478, 3)
+        """
+        return _dequantize(self.records["landmarks"][selection], self.encoding, self.scale)
+
+    def landmarks_px(self, selection=slice(None)):
+        """
+        Coordenadas en píxeles (x, y, z escalados al tamaño de cada imagen).
+
+        Returns:
+            numpy.ndarray: (registros, 478, 3) float32
+        """
+        registros = self.records[selection]
+        escala = np.stack([registros["ancho"], registros["alto"], registros["ancho"]],
+                          axis=-1).astype(np.float32)
+        return self.landmarks(selection) * escala[..., None, :]
+
+    def boxes(self, selection=slice(None)):
+        """
+        Cajas (x0, y0, x1, y1) en píxeles de los registros seleccionados.
+
+        Returns:
+            numpy.ndarray: (registros, 4) float32
+        """
+        return np.array(self.records["caja"][selection], dtype=np.float32)
+
+    def scores(self, selection=slice(None)):
+        """
+        Puntajes de detección de los registros seleccionados (NaN si no se conocen).
+
+        Returns:
+            numpy.ndarray: (registros,) float32
+        """
+        return np.array(self.records["puntaje"][selection], dtype=np.float32)
+
+    def image_records(self, image_id):
+        """
+        Registros de una imagen (contiguos, porque se agregan en orden).
+
+        Args:
+            image_id (int): Identificador devuelto por LandmarkStoreWriter.append
+
+        Returns:
+            slice: Rango de registros de la imagen
+        """
+        imagenes = self.records["imagen"]
+        inicio = int(np.searchsorted(imagenes, image_id, side="left"))
+        fin = int(np.searchsorted(imagenes, image_id, side="right"))
+        return slice(inicio, fin)
+
+    def faces(self):
+        """Máscara de los registros que contienen un rostro detectado."""
+        return self.records["deteccion_exitosa"].astype(bool)
+
+    def close(self):
+        """Libera el mapeo de memoria."""
+        mapeo = getattr(self.records, "_mmap", None)
+        self.records = np.empty(0, self.dtype)
+        if mapeo is not None:
+            mapeo.close()
+
+
+def export_results(results, path, encoding=STORE_ENCODING):
+    """
+    Guarda resultados de detección en un almacén.
+
+    Args:
+        results (iterable): Tuplas (nombre, landmarks, info, ancho, alto), donde
+            landmarks es el diccionario devuelto por FaceLandmarkDetector.detect
+        path (str): Ruta del almacén (se agrega al final si ya existe)
+        encoding (str): Codificación para almacenes nuevos
+
+    Returns:
+        int: Cantidad de imágenes exportadas
+    """
+    cantidad = 0
+    with LandmarkStoreWriter(path, encoding=encoding) as escritor:
+        for nombre, landmarks, info, ancho, alto in results:
+            escritor.append(landmarks["normalizados"], info, ancho, alto, nombre,
+                            landmarks.get("cajas"), landmarks.get("puntajes"))
+            cantidad += 1
+    return cantidad
+
+
+def export_batch_npz(npz_path, path, encoding=STORE_ENCODING):
+    """
+    Convierte la salida columnar de src.batch (landmarks.npz) a un almacén.
+
+    Args:
+        npz_path (str): Archivo consolidado o fragmento de src.batch
+        path (str): Ruta del almacén
+        encoding (str): Codificación para almacenes nuevos
+
+    Returns:
+        int: Cantidad de imágenes exportadas
+    """
+    with np.load(npz_path) as datos:
+        inicio = datos["rostro_inicio"]
+        landmarks = datos["landmarks"]
+        cajas = datos["cajas"]
+        puntajes = datos["puntajes"]
+        with LandmarkStoreWriter(path, encoding=encoding) as escritor:
+            for i, ruta in enumerate(datos["rutas"]):
+                rostros = slice(inicio[i], inicio[i + 1])
+                escritor.append(
+                    landmarks[rostros],
+                    {"deteccion_exitosa": bool(datos["deteccion_exitosa"][i])},
+                    int(datos["ancho"][i]), int(datos["alto"][i]), str(ruta),
+                    cajas[rostros], puntajes[rostros])
+        return len(datos["rutas"])
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Herramientas del almacén de landmarks.")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    exportar = subcomandos.add_parser("export", help="Convertir la salida de src.batch")
+    exportar.add_argument("npz", help="Archivo .npz generado por src.batch")
+    exportar.add_argument("store", help="Almacén de destino")
+    exportar.add_argument("--encoding", choices=list(ENCODINGS), default=STORE_ENCODING)
+
+    info = subcomandos.add_parser("info", help="Mostrar el resumen de un almacén")
+    info.add_argument("store", help="Almacén a inspeccionar")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "export":
+        cantidad = export_batch_npz(args.npz, args.store, args.encoding)
+        print(f"{cantidad} imágenes exportadas a {args.store}")
+    else:
+        lector = LandmarkStoreReader(args.store)
+        print(f"Codificación: {lector.encoding}  Registros: {len(lector)}  "
+              f"Rostros: {int(lector.faces().sum())}  Imágenes: {len(lector.names)}  "
+              f"Bytes por registro: {lector.dtype.itemsize}")
+        lector.close()
+
+
+if __name__ == "__main__":
+    main()
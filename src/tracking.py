@@ -0,0 +1,296 @@
+"""
+Tracking temporal para video y cámara.
+
+TrackingDetector envuelve a un detector en modo video y agrega dos cosas:
+
+- Una compuerta por diferencia de cuadros: si el cuadro casi no cambió
+  respecto del último procesado, se reutiliza ese resultado sin correr
+  ningún modelo. En sesiones largas y mayormente quietas, la mayoría de
+  los cuadros cuesta solo una miniatura y una resta.
+- Un filtro One Euro vectorizado sobre los arrays (rostros, 478, 3), que
+  elimina el temblor de los landmarks sin agregar retraso en movimientos
+  rápidos.
+
+La detección completa solo corre en cuadros clave: FaceMesh en modo video
+sigue la cara con la región del cuadro anterior, y RoiFaceLandmarkDetector
+con track=True reutiliza sus recortes (ver src.roi).
+"""
+import time
+
+import cv2
+import numpy as np
+
+from .config import (
+    LANDMARK_COLOR, TRACKING_GATE_SIZE, TRACKING_GATE_THRESHOLD, TRACKING_MAX_REUSE,
+    TRACKING_MIN_CUTOFF, TRACKING_BETA, TRACKING_D_CUTOFF
+)
+from .detector import face_boxes
+from .render import draw_points
+
+
+def _alpha(dt, cutoff):
+    """Factor de suavizado exponencial para una frecuencia de corte dada."""
+    tau = 1.0 / (2 * np.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """
+    Filtro One Euro aplicado elemento a elemento sobre arrays de NumPy.
+
+    Con poca velocidad el corte es bajo y el filtro elimina el temblor; al
+    moverse rápido el corte sube y la salida sigue a la entrada sin retraso.
+    Si cambia la forma de la entrada (por ejemplo, la cantidad de rostros),
+    el filtro se reinicia.
+    """
+
+    def __init__(self, min_cutoff=TRACKING_MIN_CUTOFF, beta=TRACKING_BETA,
+                 d_cutoff=TRACKING_D_CUTOFF):
+        """
+        Args:
+            min_cutoff (float): Frecuencia de corte mínima en Hz
+            beta (float): Aumento del corte por unidad de velocidad
+            d_cutoff (float): Frecuencia de corte de la derivada en Hz
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        """Olvida el estado: la próxima muestra se devuelve sin filtrar."""
+        self._x = None
+        self._dx = None
+        self._t = None
+
+    def __call__(self, values, timestamp):
+        """
+        Filtra una muestra.
+
+        Args:
+            values (numpy.ndarray): Muestra de cualquier forma
+            timestamp (float): Instante de la muestra en segundos
+
+        Returns:
+            numpy.ndarray: Muestra filtrada (array nuevo, mismo dtype)
+        """
+        valores = np.asarray(values)
+        if self._x is None or self._x.shape != valores.shape:
+            self._x = valores.astype(np.float64)
+            self._dx = np.zeros_like(self._x)
+            self._t = timestamp
+            return valores.copy()
+
+        dt = timestamp - self._t
+        if dt <= 0:
+            return self._x.astype(valores.dtype)
+
+        derivada = (valores - self._x) / dt
+        self._dx += _alpha(dt, self.d_cutoff) * (derivada - self._dx)
+        corte = self.min_cutoff + self.beta * np.abs(self._dx)
+        self._x += _alpha(dt, corte) * (valores - self._x)
+        self._t = timestamp
+        return self._x.astype(valores.dtype)
+
+
+class FrameGate:
+    """
+    Decide si un cuadro cambió lo suficiente como para volver a procesarlo.
+
+    Compara una miniatura del cuadro con la del último cuadro procesado, de
+    modo que los cambios lentos se acumulan hasta superar el umbral.
+    """
+
+    def __init__(self, threshold=TRACKING_GATE_THRESHOLD, size=TRACKING_GATE_SIZE,
+                 max_reuse=TRACKING_MAX_REUSE):
+        """
+        Args:
+            threshold (float): Diferencia absoluta media (0-255) que obliga a reprocesar
+            size (tuple): Tamaño (ancho, alto) de la miniatura
+            max_reuse (int): Cuadros seguidos que pueden omitirse antes de
+                reprocesar de todos modos
+        """
+        self.threshold = threshold
+        self.size = size
+        self.max_reuse = max_reuse
+        self._referencia = None
+        self._omitidos = 0
+
+    def changed(self, image):
+        """
+        Indica si el cuadro debe procesarse.
+
+        Args:
+            image (numpy.ndarray): Cuadro completo (cualquier orden de canales)
+
+        Returns:
+            bool: True si hay que procesarlo (y pasa a ser la nueva referencia)
+        """
+        miniatura = cv2.resize(image, self.size, interpolation=cv2.INTER_AREA)
+        if (self._referencia is None or self._omitidos >= self.max_reuse
+                or self._referencia.shape != miniatura.shape
+                or cv2.absdiff(miniatura, self._referencia).mean() > self.threshold):
+            self._referencia = miniatura
+            self._omitidos = 0
+            return True
+        self._omitidos += 1
+        return False
+
+    def reset(self):
+        """Obliga a procesar el próximo cuadro."""
+        self._referencia = None
+        self._omitidos = 0
+
+
+def _match_order(anteriores, actuales):
+    """
+    Ordena los rostros actuales para que sigan el orden del cuadro anterior.
+
+    Asigna de forma voraz cada rostro anterior al actual con el centro más
+    cercano, así el filtro suaviza siempre a la misma persona.
+
+    Returns:
+        numpy.ndarray: Índices que reordenan `actuales`
+    """
+    centros_anteriores = anteriores[:, :, :2].mean(axis=1)
+    centros_actuales = actuales[:, :, :2].mean(axis=1)
+    distancias = np.linalg.norm(
+        centros_anteriores[:, None, :] - centros_actuales[None, :, :], axis=2)
+
+    orden = np.full(len(actuales), -1, dtype=np.intp)
+    for _ in range(len(actuales)):
+        anterior, actual = np.unravel_index(np.argmin(distancias), distancias.shape)
+        orden[anterior] = actual
+        distancias[anterior, :] = np.inf
+        distancias[:, actual] = np.inf
+    return orden
+
+
+class TrackingDetector:
+    """
+    Detector para secuencias de cuadros con el mismo contrato que detect().
+
+    Además de las claves habituales, info incluye "reutilizado" (True si el
+    cuadro no se procesó porque casi no cambió) y, con RoiFaceLandmarkDetector,
+    "cuadro_clave" (True si se corrió la detección completa).
+    """
+
+    def __init__(self, detector=None, max_faces=None, smoothing=True, gate=True):
+        """
+        Args:
+            detector (FaceLandmarkDetector): Detector en modo video; si es None
+                se crea con create_detector(max_faces, static_image_mode=False)
+            max_faces (int): Rostros máximos del detector creado
+            smoothing (bool): Aplicar el filtro One Euro a los landmarks
+            gate (bool): Reutilizar el último resultado en cuadros sin cambios
+        """
+        if detector is None:
+            from .detector import create_detector
+            detector = create_detector(max_faces, static_image_mode=False)
+
+        self.detector = detector
+        self.config = {**detector.config, "tracking": True}
+        self.filter = OneEuroFilter() if smoothing else None
+        self.gate = FrameGate() if gate else None
+        self._ultimo = None
+
+        self.procesados = 0
+        self.reutilizados = 0
+        self.cuadros_clave = 0
+
+    def detect(self, image, draw=True, input_format="bgr", in_place=False, timestamp=None):
+        """
+        Detecta landmarks en el cuadro siguiente de la secuencia.
+
+        Args:
+            image (numpy.ndarray): Cuadro BGR o RGB
+            draw (bool): Dibujar los landmarks sobre el cuadro
+            input_format (str): "bgr" o "rgb"
+            in_place (bool): Dibujar sobre el cuadro recibido en lugar de una copia
+            timestamp (float): Instante del cuadro en segundos (por defecto, el
+                reloj monotónico); en archivos de video conviene pasar el del cuadro
+
+        Returns:
+            tuple: (imagen_procesada, landmarks, info) como en
+                FaceLandmarkDetector.detect
+        """
+        cambio = self.gate is None or self.gate.changed(image)
+        if self._ultimo is not None and not cambio:
+            self.reutilizados += 1
+            landmarks = {clave: array.copy() for clave, array in self._ultimo[0].items()}
+            info = {**self._ultimo[1], "reutilizado": True}
+        else:
+            _, landmarks, info = self.detector.detect(image, draw=False,
+                                                      input_format=input_format)
+            self.procesados += 1
+            info["reutilizado"] = False
+            redetectado = getattr(self.detector, "last_redetected", None)
+            if redetectado is not None:
+                info["cuadro_clave"] = redetectado
+                self.cuadros_clave += redetectado
+
+            if self.filter is not None:
+                self._suavizar(landmarks, image.shape, time.monotonic()
+                               if timestamp is None else timestamp)
+            self._ultimo = ({clave: array.copy() for clave, array in landmarks.items()},
+                            dict(info))
+
+        imagen_con_puntos = None
+        if draw:
+            color = LANDMARK_COLOR if input_format == "bgr" else LANDMARK_COLOR[::-1]
+            imagen_con_puntos = draw_points(image if in_place else image.copy(),
+                                            landmarks["pixeles"], color)
+        return imagen_con_puntos, landmarks, info
+
+    def _suavizar(self, landmarks, forma, timestamp):
+        """Filtra los píxeles en el lugar y recalcula normalizados y cajas."""
+        pixeles = landmarks["pixeles"]
+        if len(pixeles) == 0:
+            self.filter.reset()
+            return
+
+        anteriores = self._ultimo[0]["pixeles"] if self._ultimo else None
+        if anteriores is not None and anteriores.shape == pixeles.shape and len(pixeles) > 1:
+            orden = _match_order(anteriores, pixeles)
+            for clave in landmarks:
+                landmarks[clave] = landmarks[clave][orden]
+            pixeles = landmarks["pixeles"]
+
+        alto, ancho = forma[:2]
+        pixeles = self.filter(pixeles, timestamp)
+        landmarks["pixeles"] = pixeles
+        landmarks["normalizados"] = pixeles / np.array([ancho, alto, ancho], dtype=np.float32)
+        landmarks["cajas"] = face_boxes(pixeles)
+
+    def stats(self):
+        """
+        Contadores de la secuencia procesada.
+
+        Returns:
+            dict: Cuadros procesados, reutilizados, cuadros clave y tasa de reutilización
+        """
+        total = self.procesados + self.reutilizados
+        return {
+            "procesados": self.procesados,
+            "reutilizados": self.reutilizados,
+            "cuadros_clave": self.cuadros_clave,
+            "tasa_reutilizacion": self.reutilizados / total if total else 0.0,
+        }
+
+    def reset(self):
+        """Olvida el estado entre secuencias (por ejemplo, al cambiar de video)."""
+        self._ultimo = None
+        if self.filter is not None:
+            self.filter.reset()
+        if self.gate is not None:
+            self.gate.reset()
+        if hasattr(self.detector, "reset"):
+            self.detector.reset()
+
+    def warm_up(self):
+        """Precalienta el detector envuelto."""
+        self.detector.warm_up()
+
+    def close(self):
+        """Libera el detector envuelto."""
+        self.detector.close()
@@ -1,10 +1,23 @@
 # src/utils.py
 """
 Funciones auxiliares para procesamiento de imágenes.
+
+Propiedad de los buffers: cada función indica si devuelve un array nuevo
+(propiedad del llamador) o el mismo que recibió. El camino recomendado es
+RGB de punta a punta (pil_to_rgb -> resize_image -> detect(input_format="rgb")
+-> st.image), que evita las conversiones BGR<->RGB del camino OpenCV.
 """
+import os
+
 import cv2
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps
+
+from .config import SAMPLE_FACE_IMAGE
+
+# Valores del tag EXIF Orientation que rotan la imagen 90° (intercambian ancho y alto)
+_ORIENTACIONES_ROTADAS = (5, 6, 7, 8)
+_TAG_ORIENTACION = 0x0112
 
 
 def pil_to_cv2(pil_image):
@@ -15,13 +28,29 @@ def pil_to_cv2(pil_image):
         pil_image (PIL.Image): Imagen en formato PIL
 
     Returns:
-        numpy.ndarray: Imagen en formato OpenCV (BGR)
+        numpy.ndarray: Imagen en formato OpenCV (BGR), array nuevo del llamador
+    """
+    # Convertir PIL a RGB numpy array (copia propia)
+    rgb_array = pil_to_rgb(pil_image)
+    # Convertir RGB a BGR en el mismo buffer: no hace falta un segundo array
+    return cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR, dst=rgb_array)
+
+
+def pil_to_rgb(pil_image):
+    """
+    Convierte una imagen PIL a un array RGB sin pasar por BGR.
+
+    Args:
+        pil_image (PIL.Image): Imagen en formato PIL
+
+    Returns:
+        numpy.ndarray: Array RGB (alto, ancho, 3) uint8, nuevo y escribible.
+            Si la imagen ya está en modo RGB se omite convert(), que haría
+            una copia intermedia.
     """
-    # Convertir PIL a RGB numpy array
-    rgb_array = np.array(pil_image.convert('RGB'))
-    # Convertir RGB a BGR (formato OpenCV)
-    bgr_array = cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR)
-    return bgr_array
+    if pil_image.mode != 'RGB':
+        pil_image = pil_image.convert('RGB')
+    return np.array(pil_image)
 
 
 def cv2_to_pil(cv2_image):
@@ -33,6 +62,9 @@ def cv2_to_pil(cv2_image):
 
     Returns:
         PIL.Image: Imagen en formato PIL (RGB)
+
+    Nota: para mostrar en Streamlit no hace falta pasar por PIL; st.image
+    acepta arrays RGB directamente (o BGR con channels="BGR").
     """
     # Convertir BGR a RGB
     rgb_array = cv2.cvtColor(cv2_image, cv2.COLOR_BGR2RGB)
@@ -50,7 +82,8 @@ def resize_image(image, max_width=800):
         max_width (int): Ancho máximo deseado
 
     Returns:
-        numpy.ndarray: Imagen redimensionada
+        numpy.ndarray: Imagen redimensionada (array nuevo), o la misma
+            imagen recibida si no supera max_width
     """
     alto, ancho = image.shape[:2]
 
@@ -60,4 +93,68 @@ def resize_image(image, max_width=800):
         nuevo_alto = int(alto * ratio)
         image = cv2.resize(image, (nuevo_ancho, nuevo_alto))
 
-    return image
\ No newline at end of file
+    return image
+
+
+def load_image(source, max_width=800):
+    """
+    Abre una imagen decodificándola directamente a escala reducida.
+
+    En JPEG se usa el modo draft de PIL, que escala en el dominio DCT (1/2,
+    1/4 u 1/8) durante la decodificación: una foto de 24 MP nunca llega a
+    ocupar memoria a resolución completa. Luego se ajusta al ancho exacto
+    con resize_image. Se respeta la orientación EXIF.
+
+    Args:
+        source: Ruta o archivo binario (por ejemplo, el UploadedFile de
+            Streamlit); se lee en streaming, sin copiarlo a un buffer intermedio
+        max_width (int): Ancho máximo final (None = resolución original)
+
+    Returns:
+        numpy.ndarray: Imagen RGB (alto, ancho, 3) uint8, array nuevo del llamador
+    """
+    imagen = Image.open(source)
+    orientacion = imagen.getexif().get(_TAG_ORIENTACION, 1)
+
+    if max_width and imagen.format == "JPEG":
+        # El ancho que se verá es el alto crudo si la orientación rota 90°
+        ancho_visible = imagen.height if orientacion in _ORIENTACIONES_ROTADAS else imagen.width
+        if ancho_visible > max_width:
+            ratio = max_width / ancho_visible
+            # draft elige la mayor reducción que no quede por debajo de este tamaño
+            imagen.draft("RGB", (int(imagen.width * ratio), int(imagen.height * ratio)))
+
+    if orientacion != 1:
+        imagen = ImageOps.exif_transpose(imagen)
+
+    return resize_image(pil_to_rgb(imagen), max_width=max_width or imagen.width)
+
+
+def sample_face(width=None, height=None, path=SAMPLE_FACE_IMAGE):
+    """
+    Carga la cara de referencia incluida en el repositorio.
+
+    Con ancho y alto, la imagen se escala hasta cubrir ese tamaño y se
+    recorta al centro, así la cara queda entera a cualquier resolución.
+
+    Args:
+        width (int): Ancho final (None = tamaño original)
+        height (int): Alto final (None = tamaño original)
+        path (str): Ruta absoluta o relativa a la raíz del proyecto
+
+    Returns:
+        numpy.ndarray: Imagen BGR (array nuevo), o None si el archivo no existe
+    """
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+    imagen = cv2.imread(path, cv2.IMREAD_COLOR)
+    if imagen is None or not (width and height):
+        return imagen
+
+    alto, ancho = imagen.shape[:2]
+    escala = max(width / ancho, height / alto)
+    nuevo_ancho, nuevo_alto = max(width, round(ancho * escala)), max(height, round(alto * escala))
+    imagen = cv2.resize(imagen, (nuevo_ancho, nuevo_alto),
+                        interpolation=cv2.INTER_AREA if escala < 1 else cv2.INTER_LINEAR)
+    x0, y0 = (nuevo_ancho - width) // 2, (nuevo_alto - height) // 2
+    return np.ascontiguousarray(imagen[y0:y0 + height, x0:x0 + width])
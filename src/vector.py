@@ -0,0 +1,198 @@
+"""
+Overlay vectorial: los landmarks viajan como datos y el cliente los dibuja.
+
+En lugar de dibujar los puntos sobre la imagen y volver a codificarla, el
+servidor envía la imagen original una sola vez y el overlay por separado,
+en uno de dos formatos:
+
+- vector_payload: coordenadas cuantizadas a 16 bits más los índices de
+  conexión de cada capa, en un diccionario apto para JSON. Los índices no
+  dependen de la imagen, así que el cliente puede guardarlos.
+- overlay_svg: un documento SVG que el navegador compone sobre la imagen.
+
+Cambiar las capas visibles solo regenera este texto: no hay que volver a
+detectar ni a codificar la imagen.
+"""
+import base64
+import functools
+
+import cv2
+import numpy as np
+
+from .config import (
+    LANDMARK_COLOR, RENDER_LAYERS, VECTOR_QUANT_SCALE, VECTOR_DECIMALS, VECTOR_POINT_RADIUS,
+    VECTOR_JPEG_QUALITY, TOTAL_LANDMARKS
+)
+from .render import connection_indices, edge_trails
+
+
+@functools.lru_cache(maxsize=None)
+def layer_trails(layer):
+    """
+    Recorridos de una capa (ver render.edge_trails), calculados una vez por proceso.
+
+    Returns:
+        tuple: (índices de vértices concatenados, inicio de cada recorrido
+            salvo el primero), ambos de solo lectura
+    """
+    # La teselación de MediaPipe repite aristas (a veces invertidas): se deduplican
+    # como en OverlayRenderer
+    indices, cortes = edge_trails(np.unique(np.sort(connection_indices(layer), axis=1), axis=0))
+    indices.setflags(write=False)
+    cortes.setflags(write=False)
+    return indices, cortes
+
+
+def _normalizados(landmarks):
+    """Acepta el diccionario de detect() o un array (rostros, landmarks, 2 o 3)."""
+    if isinstance(landmarks, dict):
+        landmarks = landmarks["normalizados"]
+    return np.asarray(landmarks)
+
+
+def _capas_disponibles(layers, landmarks):
+    """Descarta el iris si los landmarks no lo incluyen (refine_landmarks=False)."""
+    return [capa for capa in layers if capa != "iris" or landmarks >= TOTAL_LANDMARKS]
+
+
+def _hex(color_bgr):
+    azul, verde, rojo = color_bgr
+    return f"#{rojo:02x}{verde:02x}{azul:02x}"
+
+
+def _b64(array):
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+
+def vector_payload(landmarks, width, height, layers=("teselacion",),
+                   include_connections=True, styles=None):
+    """
+    Codifica los landmarks como coordenadas cuantizadas y conexiones.
+
+    Args:
+        landmarks: Diccionario de detect() o array normalizado (rostros, landmarks, 2 o 3)
+        width (int): Ancho de la imagen
+        height (int): Alto de la imagen
+        layers (tuple): Capas de conexiones a incluir
+        include_connections (bool): Incluir los índices de cada capa (el
+            cliente puede omitirlos si ya los tiene)
+        styles (dict): Color BGR y grosor por capa (por defecto, RENDER_LAYERS)
+
+    Returns:
+        dict: "ancho", "alto", "escala", "rostros", "landmarks", "puntos"
+            (base64 de uint16 little-endian (rostros, landmarks, 2): x, y
+            normalizados por "escala") y "capas" con "color", "grosor" y,
+            si se piden, "indices" (uint16) y "cortes" (uint32) en base64
+    """
+    normalizados = _normalizados(landmarks)
+    rostros, puntos = normalizados.shape[:2]
+    cuantizados = np.rint(np.clip(normalizados[..., :2], 0.0, 1.0) * VECTOR_QUANT_SCALE)
+    estilos = styles or RENDER_LAYERS
+
+    capas = {}
+    for capa in _capas_disponibles(layers, puntos):
+        capas[capa] = {"color": _hex(estilos[capa]["color"]), "grosor": estilos[capa]["grosor"]}
+        if include_connections:
+            indices, cortes = layer_trails(capa)
+            capas[capa]["indices"] = _b64(indices.astype("<u2"))
+            capas[capa]["cortes"] = _b64(cortes.astype("<u4"))
+
+    return {
+        "ancho": int(width),
+        "alto": int(height),
+        "escala": VECTOR_QUANT_SCALE,
+        "rostros": int(rostros),
+        "landmarks": int(puntos),
+        "puntos": _b64(cuantizados.astype("<u2")),
+        "capas": capas,
+    }
+
+
+def decode_points(payload):
+    """
+    Recupera los landmarks en píxeles de un vector_payload.
+
+    Returns:
+        numpy.ndarray: float32 (rostros, landmarks, 2)
+    """
+    cuantizados = np.frombuffer(base64.b64decode(payload["puntos"]), dtype="<u2")
+    puntos = cuantizados.reshape(payload["rostros"], payload["landmarks"], 2).astype(np.float32)
+    return puntos / payload["escala"] * np.array([payload["ancho"], payload["alto"]],
+                                                   dtype=np.float32)
+
+
+def _coordenadas(puntos):
+    """Pares "x y" con VECTOR_DECIMALS decimales, separados por espacios."""
+    return " ".join(f"{x:.{VECTOR_DECIMALS}f} {y:.{VECTOR_DECIMALS}f}" for x, y in puntos.tolist())
+
+
+def overlay_svg(landmarks, width, height, layers=("teselacion",), points=True,
+                image_href=None, styles=None, point_color=LANDMARK_COLOR,
+                point_radius=VECTOR_POINT_RADIUS):
+    """
+    Genera el overlay como documento SVG.
+
+    Cada capa es un único <path> con un subrecorrido por cada recorrido de
+    edge_trails, y los puntos son un <path> de segmentos de largo cero con
+    extremos redondeados: el tamaño no depende de cuántos elementos haya.
+
+    Args:
+        landmarks: Diccionario de detect() o array normalizado (rostros, landmarks, 2 o 3)
+        width (int): Ancho de la imagen
+        height (int): Alto de la imagen
+        layers (tuple): Capas de conexiones ("teselacion", "contornos", "iris")
+        points (bool): Dibujar los puntos
+        image_href (str): URL o data URI de la imagen de fondo (ver
+            image_data_uri); sin ella, el SVG es solo el overlay transparente
+        styles (dict): Color BGR y grosor por capa (por defecto, RENDER_LAYERS)
+        point_color (tuple): Color BGR de los puntos
+        point_radius (float): Radio de los puntos en píxeles de la imagen
+
+    Returns:
+        str: Documento SVG con viewBox del tamaño de la imagen
+    """
+    normalizados = _normalizados(landmarks)
+    pixeles = normalizados[..., :2] * np.array([width, height], dtype=np.float32)
+    estilos = styles or RENDER_LAYERS
+
+    partes = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+              f'width="{width}" height="{height}">']
+    if image_href:
+        partes.append(f'<image href="{image_href}" width="{width}" height="{height}"/>')
+
+    if len(pixeles):
+        for capa in _capas_disponibles(layers, pixeles.shape[1]):
+            indices, cortes = layer_trails(capa)
+            trazos = [f"M{_coordenadas(recorrido)}"
+                      for rostro in pixeles
+                      for recorrido in np.split(rostro[indices], cortes)]
+            partes.append(f'<path d="{"".join(trazos)}" fill="none" '
+                          f'stroke="{_hex(estilos[capa]["color"])}" '
+                          f'stroke-width="{estilos[capa]["grosor"]}" stroke-linejoin="round"/>')
+        if points:
+            puntos = pixeles.reshape(-1, 2).tolist()
+            trazo = "".join(f"M{x:.{VECTOR_DECIMALS}f} {y:.{VECTOR_DECIMALS}f}h0"
+                            for x, y in puntos)
+            partes.append(f'<path d="{trazo}" stroke="{_hex(point_color)}" '
+                          f'stroke-width="{2 * point_radius}" stroke-linecap="round"/>')
+
+    partes.append("</svg>")
+    return "".join(partes)
+
+
+def image_data_uri(image_rgb, quality=VECTOR_JPEG_QUALITY):
+    """
+    Codifica la imagen original como data URI JPEG para usarla de fondo del SVG.
+
+    Args:
+        image_rgb (numpy.ndarray): Imagen RGB
+        quality (int): Calidad JPEG (0-100)
+
+    Returns:
+        str: "data:image/jpeg;base64,..."
+    """
+    ok, jpeg = cv2.imencode(".jpg", cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR),
+                            [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("No se pudo codificar la imagen")
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg.tobytes()).decode("ascii")
@@ -0,0 +1,248 @@
+"""
+Procesamiento de archivos de video en un pipeline por etapas.
+
+Uso:
+    python -m src.video VIDEO --landmarks landmarks.npz [--output anotado.mp4]
+
+Decodificación, conversión de color, inferencia, dibujo y codificación corren
+en hilos separados comunicados por colas acotadas. Así, mientras MediaPipe
+procesa el cuadro N, ya se está decodificando el N+1 y codificando el N-1, y
+el rendimiento se acerca al límite de la inferencia en lugar de a la suma de
+todas las etapas. OpenCV y MediaPipe liberan el GIL durante su trabajo pesado.
+"""
+import argparse
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .config import LANDMARK_COLOR, VIDEO_QUEUE_SIZE, VIDEO_FOURCC
+from .render import draw_points
+
+# Marca de fin de flujo entre etapas
+_FIN = object()
+
+
+class _Cuadro:
+    """Estado de un cuadro a medida que atraviesa el pipeline."""
+
+    __slots__ = ("indice", "tiempo_ms", "bgr", "rgb", "landmarks", "info")
+
+    def __init__(self, indice, tiempo_ms, bgr):
+        self.indice = indice
+        self.tiempo_ms = tiempo_ms
+        self.bgr = bgr
+        self.rgb = None
+        self.landmarks = None
+        self.info = None
+
+
+def _put(cola, item, parar):
+    """Encola respetando la contrapresión, pero abandona si se pidió parar."""
+    while not parar.is_set():
+        try:
+            cola.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(cola, parar):
+    """Desencola esperando, pero devuelve _FIN si se pidió parar."""
+    while not parar.is_set():
+        try:
+            return cola.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _FIN
+
+
+def _etapa(funcion, entrada, salida, parar, errores):
+    """Bucle de una etapa: aplica `funcion` a cada cuadro y lo pasa a la siguiente."""
+    try:
+        while True:
+            cuadro = _get(entrada, parar)
+            if cuadro is _FIN:
+                break
+            funcion(cuadro)
+            if not _put(salida, cuadro, parar):
+                return
+    except Exception as e:
+        errores.append(e)
+        parar.set()
+    _put(salida, _FIN, parar)
+
+
+def _decodificar(captura, salida, parar, errores):
+    """Primera etapa: lee cuadros del archivo."""
+    try:
+        indice = 0
+        while not parar.is_set():
+            ok, bgr = captura.read()
+            if not ok:
+                break
+            tiempo_ms = captura.get(cv2.CAP_PROP_POS_MSEC)
+            if not _put(salida, _Cuadro(indice, tiempo_ms, bgr), parar):
+                return
+            indice += 1
+    except Exception as e:
+        errores.append(e)
+        parar.set()
+    _put(salida, _FIN, parar)
+
+
+def process_video(source, output=None, draw=None, detector=None,
+                  queue_size=VIDEO_QUEUE_SIZE, max_faces=None, tracking=False):
+    """
+    Procesa un archivo de video cuadro a cuadro en modo tracking.
+
+    Args:
+        source (str): Ruta del video de entrada
+        output (str): Ruta del video anotado (None = no se codifica)
+        draw (bool): Dibujar landmarks en los cuadros (por defecto, solo si hay `output`)
+        detector (FaceLandmarkDetector): Detector a usar; si es None se crea
+            uno con static_image_mode=False y se cierra al terminar
+        queue_size (int): Cuadros máximos en cada cola entre etapas
+        max_faces (int): Rostros máximos por cuadro del detector creado
+            (ver detector.create_detector)
+        tracking (bool): Envolver el detector creado en un TrackingDetector:
+            reutiliza el resultado en cuadros sin cambios y suaviza los landmarks
+
+    Yields:
+        dict: Por cada cuadro, "indice", "tiempo_ms", "landmarks" e "info"
+            (mismo formato que FaceLandmarkDetector.detect)
+    """
+    captura = cv2.VideoCapture(source)
+    if not captura.isOpened():
+        raise IOError(f"No se pudo abrir el video: {source}")
+
+    draw = output is not None if draw is None else draw
+    propio = detector is None
+    if propio:
+        if tracking:
+            from .tracking import TrackingDetector
+            detector = TrackingDetector(max_faces=max_faces)
+        else:
+            from .detector import create_detector
+            detector = create_detector(max_faces, static_image_mode=False)
+    # El filtro temporal usa el tiempo del video, no el del reloj
+    con_tiempo = "tracking" in detector.config
+
+    fps = captura.get(cv2.CAP_PROP_FPS) or 30.0
+    escritor = None
+
+    def convertir(cuadro):
+        cuadro.rgb = cv2.cvtColor(cuadro.bgr, cv2.COLOR_BGR2RGB)
+
+    def inferir(cuadro):
+        extra = {"timestamp": cuadro.indice / fps} if con_tiempo else {}
+        _, cuadro.landmarks, cuadro.info = detector.detect(
+            cuadro.rgb, draw=False, input_format="rgb", **extra)
+        cuadro.rgb = None
+
+    def dibujar(cuadro):
+        # El cuadro decodificado pertenece al pipeline: se dibuja en el lugar
+        draw_points(cuadro.bgr, cuadro.landmarks["pixeles"], LANDMARK_COLOR)
+
+    def codificar(cuadro):
+        nonlocal escritor
+        if escritor is None:
+            alto, ancho = cuadro.bgr.shape[:2]
+            escritor = cv2.VideoWriter(
+                output, cv2.VideoWriter_fourcc(*VIDEO_FOURCC), fps, (ancho, alto))
+        escritor.write(cuadro.bgr)
+
+    etapas = [convertir, inferir]
+    if draw:
+        etapas.append(dibujar)
+    if output is not None:
+        etapas.append(codificar)
+
+    parar = threading.Event()
+    errores = []
+    colas = [queue.Queue(maxsize=queue_size) for _ in range(len(etapas) + 1)]
+    hilos = [threading.Thread(target=_decodificar, args=(captura, colas[0], parar, errores),
+                              name="video-decodificar", daemon=True)]
+    for numero, funcion in enumerate(etapas):
+        hilos.append(threading.Thread(
+            target=_etapa, args=(funcion, colas[numero], colas[numero + 1], parar, errores),
+            name=f"video-{funcion.__name__}", daemon=True))
+
+    for hilo in hilos:
+        hilo.start()
+
+    try:
+        while True:
+            cuadro = _get(colas[-1], parar)
+            if cuadro is _FIN:
+                break
+            yield {
+                "indice": cuadro.indice,
+                "tiempo_ms": cuadro.tiempo_ms,
+                "landmarks": cuadro.landmarks,
+                "info": cuadro.info,
+            }
+    finally:
+        # También se ejecuta si el consumidor abandona el generador
+        parar.set()
+        for hilo in hilos:
+            hilo.join()
+        captura.release()
+        if escritor is not None:
+            escritor.release()
+        if propio:
+            detector.close()
+
+    if errores:
+        raise errores[0]
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Detecta landmarks faciales cuadro a cuadro en un archivo de video."
+    )
+    parser.add_argument("source", help="Video de entrada")
+    parser.add_argument("-o", "--output", default=None, help="Video anotado de salida")
+    parser.add_argument("-l", "--landmarks", default=None,
+                        help="Archivo .npz con los landmarks por cuadro")
+    parser.add_argument("--max-faces", type=int, default=None,
+                        help="Rostros máximos por cuadro")
+    parser.add_argument("--tracking", action="store_true",
+                        help="Reutilizar cuadros sin cambios y suavizar los landmarks")
+    args = parser.parse_args(argv)
+
+    tiempos, rostros = [], []
+    inicio = time.perf_counter()
+
+    for resultado in process_video(args.source, output=args.output,
+                                   max_faces=args.max_faces, tracking=args.tracking):
+        tiempos.append(resultado["tiempo_ms"])
+        landmarks = resultado["landmarks"]
+        rostros.append({campo: landmarks[campo]
+                        for campo in ("normalizados", "cajas", "puntajes")})
+
+    duracion = time.perf_counter() - inicio
+    print(f"{len(tiempos)} cuadros en {duracion:.1f} s "
+          f"({len(tiempos) / duracion if duracion > 0 else 0:.1f} fps)", file=sys.stderr)
+
+    if args.landmarks:
+        # Mismo esquema columnar que src.batch: rostro_inicio indexa cada cuadro
+        from .detector import stack_faces
+
+        apilado = stack_faces(rostros)
+        np.savez(args.landmarks,
+                 tiempo_ms=np.array(tiempos, dtype=np.float64),
+                 rostros_detectados=np.diff(apilado["inicio"]).astype(np.int32),
+                 rostro_inicio=apilado["inicio"],
+                 landmarks=apilado["normalizados"],
+                 cajas=apilado["cajas"],
+                 puntajes=apilado["puntajes"])
+
+
+if __name__ == "__main__":
+    main()
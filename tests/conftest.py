@@ -0,0 +1,7 @@
+"""
+Configuración compartida de las pruebas (python -m pytest desde la raíz).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
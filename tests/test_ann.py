@@ -0,0 +1,110 @@
+"""
+Pruebas del índice IVF de rostros: altas, bajas, consultas y persistencia.
+"""
+import numpy as np
+import pytest
+
+from src.ann import LandmarkIndex, synthetic_faces
+
+
+@pytest.fixture(scope="module")
+def rostros():
+    return synthetic_faces(1200, seed=3)
+
+
+def _indice(rostros, **opciones):
+    indice = LandmarkIndex(dimensions=8, lists=8, nprobe=8, **opciones)
+    return indice.fit(rostros[:600])
+
+
+def _listas_consistentes(indice):
+    """Cada vector está en el rango CSR de su lista."""
+    listas = np.repeat(np.arange(len(indice.centroids)), np.diff(indice._inicios))
+    return np.array_equal(listas, indice._listas)
+
+
+def test_busqueda_con_todas_las_listas_coincide_con_la_exhaustiva(rostros):
+    indice = _indice(rostros)
+    indice.add(rostros)
+    consultas = indice.encode(rostros[:20])
+    ids, distancias = indice.search_vectors(consultas, k=5)
+    np.testing.assert_array_equal(ids, indice.exact_search(consultas, k=5))
+    # Cada rostro se encuentra a sí mismo primero
+    np.testing.assert_array_equal(ids[:, 0], np.arange(20))
+    assert (np.diff(distancias, axis=1) >= 0).all()
+
+
+def test_altas_pendientes_e_intercaladas_dan_el_mismo_resultado(rostros):
+    consultas = None
+    resultados = []
+    for max_pending in (10_000, 100):
+        indice = _indice(rostros, max_pending=max_pending)
+        for desde in range(0, 1200, 150):
+            indice.add(rostros[desde:desde + 150])
+        consultas = indice.encode(rostros[::97]) if consultas is None else consultas
+        resultados.append(indice.search_vectors(consultas, k=7, nprobe=3))
+    # Con max_pending=10000 todo quedó pendiente; con 100, todo se intercaló
+    np.testing.assert_array_equal(resultados[0][0], resultados[1][0])
+    np.testing.assert_allclose(resultados[0][1], resultados[1][1], rtol=1e-4, atol=1e-5)
+
+
+def test_intercalar_no_reasigna_lo_guardado(rostros):
+    indice = _indice(rostros, max_pending=200)
+    indice.add(rostros[:400])
+    listas_previas = dict(zip(indice._ids, indice._listas))
+    indice.add(rostros[400:700])
+    assert len(indice._pendientes["ids"]) == 0
+    assert _listas_consistentes(indice)
+    assert all(listas_previas[i] == l for i, l in zip(indice._ids, indice._listas)
+               if i in listas_previas)
+    for lista in range(len(indice.centroids)):
+        ids = indice._ids[indice._inicios[lista]:indice._inicios[lista + 1]]
+        # Dentro de cada lista se conserva el orden de llegada
+        assert (np.diff(ids) > 0).all()
+
+
+def test_bajas_quedan_marcadas_y_no_aparecen(rostros):
+    indice = _indice(rostros, max_pending=500)
+    ids = indice.add(rostros[:700])  # 500 intercaladas y 200 pendientes
+    tamano = len(indice._ids)
+    assert indice.remove([0, 650, 650, 9999]) == 2
+    assert len(indice) == 698
+    # Sin compactar: el vector sigue guardado, solo marcado
+    assert len(indice._ids) == tamano
+
+    consultas = indice.encode(rostros[[0, 650]])
+    encontrados, _ = indice.search_vectors(consultas, k=10)
+    assert not np.isin([0, 650], encontrados).any()
+    assert not np.isin([0, 650], indice.exact_search(consultas, k=10)).any()
+    assert indice.remove(ids[:1]) == 0
+
+
+def test_busqueda_exhaustiva_con_k_mayor_que_el_indice(rostros):
+    indice = _indice(rostros)
+    indice.add(rostros[:3])
+    indice.remove([1])
+    exactos = indice.exact_search(indice.encode(rostros[:2]), k=5)
+    assert exactos.shape == (2, 5)
+    np.testing.assert_array_equal(exactos[0], [0, 2, -1, -1, -1])
+    ids, distancias = indice.search_vectors(indice.encode(rostros[:1]), k=5)
+    np.testing.assert_array_equal(ids[0, 2:], [-1, -1, -1])
+    assert np.isinf(distancias[0, 2:]).all()
+
+
+def test_guardar_y_cargar_descarta_bajas_y_sigue_aceptando_altas(rostros, tmp_path):
+    indice = _indice(rostros)
+    indice.add(rostros[:500])
+    indice.remove(np.arange(0, 500, 2))
+    ruta = str(tmp_path / "indice.npz")
+    indice.save(ruta)
+
+    cargado = LandmarkIndex.load(ruta)
+    assert len(cargado) == 250 and len(cargado._ids) == 250
+    assert _listas_consistentes(cargado)
+    consultas = indice.encode(rostros[1:40:2])
+    np.testing.assert_array_equal(cargado.search_vectors(consultas, k=4)[0],
+                                  indice.search_vectors(consultas, k=4)[0])
+
+    nuevos = cargado.add(rostros[500:510])
+    np.testing.assert_array_equal(nuevos, np.arange(500, 510))
+    assert cargado.search(rostros[505:506], k=1)[0][0, 0] == 505
@@ -0,0 +1,85 @@
+"""
+Pruebas del procesamiento por lotes: fragmentos, reanudación y consolidación.
+"""
+import glob
+import os
+import shutil
+
+import numpy as np
+
+from src import batch
+from src.config import SAMPLE_FACE_IMAGE
+
+
+def _resultado(ruta, rostros=1, valor=0.5, error=""):
+    if error:
+        return {"ruta": ruta, "ancho": 0, "alto": 0, "landmarks": None, "info": None,
+                "error": error}
+    return {
+        "ruta": ruta, "ancho": 64, "alto": 48, "error": "",
+        "landmarks": {
+            "normalizados": np.full((rostros, 478, 3), valor, dtype=np.float32),
+            "cajas": np.full((rostros, 4), valor, dtype=np.float32),
+            "puntajes": np.full(rostros, valor, dtype=np.float32),
+        },
+        "info": {"rostros_detectados": rostros, "deteccion_exitosa": rostros > 0},
+    }
+
+
+def test_completed_paths_no_cuenta_los_errores(tmp_path):
+    batch._write_shard(str(tmp_path), 0, [_resultado("a.jpg"),
+                                          _resultado("b.jpg", error="No se pudo leer")])
+    hechas, siguiente = batch.completed_paths(str(tmp_path))
+    assert hechas == {"a.jpg"}
+    assert siguiente == 1
+
+
+def test_merge_une_fragmentos_y_conserva_el_ultimo_intento(tmp_path):
+    directorio = str(tmp_path)
+    batch._write_shard(directorio, 0, [_resultado("a.jpg", rostros=2, valor=0.1),
+                                       _resultado("largo/b.jpg", error="No se pudo leer")])
+    batch._write_shard(directorio, 1, [_resultado("c.jpg", rostros=0)])
+    # Reintento de b.jpg en un fragmento posterior
+    batch._write_shard(directorio, 2, [_resultado("largo/b.jpg", rostros=1, valor=0.7)])
+
+    with np.load(batch.merge_shards(directorio)) as datos:
+        assert datos["rutas"].tolist() == ["a.jpg", "c.jpg", "largo/b.jpg"]
+        assert datos["error"].tolist() == ["", "", ""]
+        assert datos["rostros_detectados"].tolist() == [2, 0, 1]
+        assert datos["rostro_inicio"].tolist() == [0, 2, 2, 3]
+        assert datos["landmarks"].shape == (3, 478, 3)
+        assert np.allclose(datos["landmarks"][:2], 0.1)
+        assert np.allclose(datos["landmarks"][2], 0.7)
+        assert np.allclose(datos["cajas"][2], 0.7)
+        assert datos["puntajes"].tolist() == np.float32([0.1, 0.1, 0.7]).tolist()
+
+
+def test_run_registra_el_error_y_lo_reintenta_al_retomar(tmp_path):
+    imagenes = tmp_path / "imagenes"
+    salida = str(tmp_path / "salida")
+    imagenes.mkdir()
+    shutil.copy(SAMPLE_FACE_IMAGE, imagenes / "rostro.jpg")
+    (imagenes / "roto.jpg").write_bytes(b"no es una imagen")
+
+    resumen = batch.run(str(imagenes), salida, workers=1, shard_size=1)
+    assert resumen["procesadas"] == 2 and resumen["errores"] == 1
+    with np.load(resumen["archivo"]) as datos:
+        errores = dict(zip(map(os.path.basename, datos["rutas"].tolist()),
+                           datos["error"].tolist()))
+    assert errores["rostro.jpg"] == "" and errores["roto.jpg"] != ""
+
+    # Al reparar la imagen, la corrida siguiente solo reintenta la que falló
+    shutil.copy(SAMPLE_FACE_IMAGE, imagenes / "roto.jpg")
+    resumen = batch.run(str(imagenes), salida, workers=1, shard_size=1)
+    assert resumen["procesadas"] == 1 and resumen["omitidas"] == 1
+    assert resumen["errores"] == 0
+    assert len(glob.glob(os.path.join(salida, batch.PATRON_FRAGMENTO))) == 3
+
+    with np.load(resumen["archivo"]) as datos:
+        assert sorted(map(os.path.basename, datos["rutas"].tolist())) == ["rostro.jpg",
+                                                                         "roto.jpg"]
+        assert datos["error"].tolist() == ["", ""]
+        assert datos["rostros_detectados"].tolist() == [1, 1]
+        assert datos["deteccion_exitosa"].all()
+        assert datos["landmarks"].shape == (2, 478, 3)
+        assert np.allclose(datos["landmarks"][0], datos["landmarks"][1], atol=1e-3)
@@ -0,0 +1,27 @@
+"""
+Pruebas de las entradas por defecto y la comparación contra la línea base.
+"""
+from src.benchmark import compare, default_images
+
+
+def _resultados(**casos):
+    return {"casos": {nombre: {"p50_ms": valor} for nombre, valor in casos.items()}}
+
+
+def test_imagenes_por_defecto_usan_la_cara_incluida():
+    imagenes = default_images([(640, 480), (320, 240)])
+    assert list(imagenes) == ["rostro_640x480", "rostro_320x240"]
+    assert imagenes["rostro_640x480"].shape == (480, 640, 3)
+
+
+def test_compare_marca_solo_aumentos_sobre_el_umbral():
+    regresiones = compare(_resultados(a=12.0, b=10.5), _resultados(a=10.0, b=10.0),
+                          threshold=0.15, min_delta_ms=0.05)
+    assert [regresion["caso"] for regresion in regresiones] == ["a"]
+
+
+def test_compare_ignora_metricas_ausentes_o_none():
+    actuales = _resultados(a=None, b=20.0, c=20.0, nuevo=5.0)
+    actuales["casos"]["d"] = {"rostros": 0}
+    base = _resultados(a=10.0, b=None, c=10.0, d=10.0)
+    assert [regresion["caso"] for regresion in compare(actuales, base)] == ["c"]
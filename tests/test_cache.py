@@ -0,0 +1,216 @@
+"""
+Pruebas de LandmarkCache: claves, LRU en memoria y capa en disco.
+"""
+import numpy as np
+import pytest
+
+from src import cache as modulo_cache
+from src.cache import LandmarkCache, config_fingerprint, get_landmark_cache
+from src.detector import empty_landmarks
+
+
+def _landmarks(rostros=1, valor=0.5):
+    normalizados = np.full((rostros, 478, 3), valor, dtype=np.float32)
+    return {
+        "normalizados": normalizados,
+        "pixeles": normalizados * 100,
+        "cajas": np.zeros((rostros, 4), dtype=np.float32),
+        "puntajes": np.full(rostros, np.nan, dtype=np.float32),
+    }
+
+
+def _info(rostros=1):
+    return {"rostros_detectados": rostros, "deteccion_exitosa": rostros > 0,
+            "tiempos_ms": {"total": 1.0}}
+
+
+class DetectorFalso:
+    def __init__(self, config=None):
+        self.config = config
+        self.llamadas = 0
+
+    def detect(self, image, draw=True, input_format="bgr"):
+        self.llamadas += 1
+        return None, _landmarks(valor=float(image.mean()) / 255), _info()
+
+
+def test_clave_depende_del_contenido_formato_y_configuracion():
+    imagen = np.zeros((4, 4, 3), dtype=np.uint8)
+    cache = LandmarkCache()
+    otra = LandmarkCache(config={"max_num_faces": 3})
+    assert cache.key(imagen) == cache.key(imagen.copy())
+    assert cache.key(imagen) != cache.key(imagen, input_format="rgb")
+    assert cache.key(imagen) != cache.key(imagen + 1)
+    assert cache.key(imagen) != otra.key(imagen)
+    assert config_fingerprint({"a": 1}) != config_fingerprint({"a": 2})
+
+
+def test_put_guarda_copias_de_solo_lectura_sin_tiempos():
+    cache = LandmarkCache()
+    original = _landmarks()
+    landmarks, info = cache.put("k", original, _info())
+    original["pixeles"][:] = -1
+    guardados, info_guardado = cache.get("k")
+    assert not guardados["pixeles"].flags.writeable
+    assert (guardados["pixeles"] == 50).all()
+    assert "tiempos_ms" not in info_guardado
+    info_guardado["extra"] = 1
+    assert "extra" not in cache.get("k")[1]
+
+
+def test_get_entrega_diccionarios_propios():
+    cache = LandmarkCache()
+    landmarks, _ = cache.put("k", _landmarks(), {**_info(), "lista": [1]})
+    landmarks["pixeles"] = None
+    guardados, info = cache.get("k")
+    assert guardados["pixeles"] is not None
+    guardados.clear()
+    info["lista"].append(2)
+    assert len(cache.get("k")[0]) == 4 and cache.get("k")[1]["lista"] == [1]
+    with pytest.raises(ValueError):
+        cache.get("k")[0]["normalizados"][0] = 0
+
+
+def test_lru_desaloja_el_menos_usado_dentro_del_presupuesto():
+    tamano = sum(a.nbytes for a in _landmarks().values()) + 512
+    cache = LandmarkCache(max_bytes=2 * tamano)
+    cache.put("a", _landmarks(), _info())
+    cache.put("b", _landmarks(), _info())
+    cache.get("a")
+    cache.put("c", _landmarks(), _info())
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    estadisticas = cache.stats()
+    assert estadisticas["evictions"] == 1 and estadisticas["bytes"] <= 2 * tamano
+
+
+def test_no_guarda_en_memoria_entradas_mayores_al_presupuesto():
+    cache = LandmarkCache(max_bytes=10)
+    cache.put("a", _landmarks(), _info())
+    assert cache.stats()["entradas"] == 0
+
+
+def test_capa_en_disco_sobrevive_a_una_cache_nueva(tmp_path):
+    LandmarkCache(disk_dir=str(tmp_path)).put("abcd", _landmarks(2), _info(2))
+    nueva = LandmarkCache(disk_dir=str(tmp_path))
+    landmarks, info = nueva.get("abcd")
+    assert landmarks["pixeles"].shape == (2, 478, 3)
+    assert info["rostros_detectados"] == 2
+    assert nueva.stats()["hits_disco"] == 1
+    nueva.get("abcd")
+    assert nueva.stats()["hits_memoria"] == 1
+
+
+def test_entrada_corrupta_en_disco_es_un_fallo(tmp_path):
+    cache = LandmarkCache(disk_dir=str(tmp_path))
+    cache.put("abcd", _landmarks(), _info())
+    with open(cache._ruta_disco("abcd"), "wb") as archivo:
+        archivo.write(b"basura")
+    assert LandmarkCache(disk_dir=str(tmp_path)).get("abcd") is None
+
+
+def test_sin_rostros_tambien_se_cachea(tmp_path):
+    cache = LandmarkCache(disk_dir=str(tmp_path))
+    cache.put("vacia", empty_landmarks(), _info(0))
+    landmarks, _ = LandmarkCache(disk_dir=str(tmp_path)).get("vacia")
+    assert landmarks["normalizados"].shape == (0, 478, 3)
+
+
+def test_detect_infiere_una_sola_vez_por_imagen():
+    cache = LandmarkCache()
+    detector = DetectorFalso(cache.config)
+    imagen = np.full((8, 8, 3), 51, dtype=np.uint8)
+    _, primero, _ = cache.detect(imagen, detector, draw=False)
+    procesada, segundo, _ = cache.detect(imagen, detector)
+    assert detector.llamadas == 1
+    assert segundo["normalizados"] is primero["normalizados"]
+    assert procesada is not imagen and procesada.shape == imagen.shape
+
+
+def test_detect_rechaza_un_detector_con_otra_configuracion():
+    cache = LandmarkCache()
+    with pytest.raises(ValueError):
+        cache.detect(np.zeros((4, 4, 3), np.uint8), DetectorFalso({"max_num_faces": 9}))
+
+
+def test_huella_incluye_backend_y_modelo(monkeypatch):
+    legacy = config_fingerprint({"a": 1}, "legacy")
+    tasks = config_fingerprint({"a": 1}, "tasks")
+    assert legacy != tasks
+    monkeypatch.setattr(modulo_cache, "TASKS_MODEL_PATH", "models/otro.task")
+    assert config_fingerprint({"a": 1}, "tasks") != tasks
+    assert config_fingerprint({"a": 1}, "legacy") == legacy
+
+
+def test_huella_incluye_salidas_de_tasks_y_parametros_roi(monkeypatch):
+    tasks = config_fingerprint({"a": 1}, "tasks")
+    monkeypatch.setattr(modulo_cache, "TASKS_BLENDSHAPES", True)
+    assert config_fingerprint({"a": 1}, "tasks") != tasks
+
+    roi = config_fingerprint({"modo": "roi"}, "legacy")
+    simple = config_fingerprint({"a": 1}, "legacy")
+    monkeypatch.setattr(modulo_cache, "ROI_DETECTION_SIZE", 320)
+    assert config_fingerprint({"modo": "roi"}, "legacy") != roi
+    # Sin modo "roi" esos parámetros no intervienen
+    assert config_fingerprint({"a": 1}, "legacy") == simple
+
+
+def test_detect_rechaza_un_detector_de_otro_backend():
+    cache = LandmarkCache(backend="tasks")
+    detector = DetectorFalso(cache.config)
+    detector.backend = "legacy"
+    with pytest.raises(ValueError):
+        cache.detect(np.zeros((4, 4, 3), np.uint8), detector)
+
+
+def test_cache_compartida_separa_backends(monkeypatch):
+    monkeypatch.setattr(modulo_cache, "_caches", {})
+    monkeypatch.setenv("FACE_BACKEND", "legacy")
+    legacy = get_landmark_cache(1)
+    monkeypatch.setenv("FACE_BACKEND", "tasks")
+    tasks = get_landmark_cache(1)
+    assert legacy is not tasks and legacy.fingerprint != tasks.fingerprint
+    assert get_landmark_cache(1) is tasks
+
+
+def test_clear_vacia_memoria_y_disco(tmp_path):
+    cache = LandmarkCache(disk_dir=str(tmp_path))
+    cache.put("abcd", _landmarks(), _info())
+    cache.clear()
+    assert cache.get("abcd") is None
+
+
+def test_dos_configuraciones_conviven_en_disco(tmp_path):
+    una = LandmarkCache(disk_dir=str(tmp_path), config={"max_num_faces": 1})
+    una.put("abcd", _landmarks(1), _info(1))
+    otra = LandmarkCache(disk_dir=str(tmp_path), config={"max_num_faces": 4})
+    otra.put("abcd", _landmarks(3), _info(3))
+
+    # Volver a la primera configuración no debe borrar la segunda (ni al revés)
+    una = LandmarkCache(disk_dir=str(tmp_path), config={"max_num_faces": 1})
+    assert una.get("abcd")[1]["rostros_detectados"] == 1
+    assert otra.get("abcd")[1]["rostros_detectados"] == 3
+    assert LandmarkCache(disk_dir=str(tmp_path),
+                         config={"max_num_faces": 4}).get("abcd") is not None
+
+
+def test_purga_carpetas_de_formatos_anteriores(tmp_path):
+    vieja = tmp_path / "0123456789abcdef"
+    (vieja / "ab").mkdir(parents=True)
+    (vieja / "FORMATO").write_text("1")
+    sin_marca = tmp_path / "fedcba9876543210"
+    sin_marca.mkdir()
+    ilegible = tmp_path / "00000000ffffffff"
+    ilegible.mkdir()
+    (ilegible / "FORMATO").write_text("datos")
+    futura = tmp_path / "1111111122222222"
+    futura.mkdir()
+    (futura / "FORMATO").write_text("99")
+    ajena = tmp_path / "otra-cosa"
+    ajena.mkdir()
+
+    LandmarkCache(disk_dir=str(tmp_path))
+    assert not vieja.exists()
+    # Sin una marca de formato anterior, la carpeta no se toca
+    assert sin_marca.exists() and ilegible.exists() and futura.exists()
+    assert ajena.exists()
@@ -0,0 +1,177 @@
+"""
+Pruebas del pool de detectores con detectores falsos (sin cargar MediaPipe).
+"""
+import threading
+from collections import OrderedDict
+
+import pytest
+
+from src import detector as detector_module
+from src.detector import DetectorPool
+
+
+class DetectorFalso:
+    creados = 0
+
+    def __init__(self, max_faces=None):
+        DetectorFalso.creados += 1
+        self.max_faces = max_faces
+        self.calentado = False
+        self.cerrado = False
+
+    def warm_up(self):
+        self.calentado = True
+
+    def close(self):
+        self.cerrado = True
+
+
+def test_reutiliza_el_ultimo_detector_devuelto():
+    pool = DetectorPool(size=2, factory=DetectorFalso)
+    primero = pool.acquire()
+    segundo = pool.acquire()
+    pool.release(primero)
+    pool.release(segundo)
+    assert pool.acquire() is segundo
+    assert primero.calentado and segundo.calentado
+
+
+def test_acquire_espera_y_vence_sin_capacidad():
+    pool = DetectorPool(size=1, factory=DetectorFalso)
+    pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+
+
+def test_acquire_despierta_al_devolver():
+    pool = DetectorPool(size=1, factory=DetectorFalso)
+    detector = pool.acquire()
+    temporizador = threading.Timer(0.05, pool.release, args=(detector,))
+    temporizador.start()
+    assert pool.acquire(timeout=2) is detector
+    temporizador.join()
+
+
+def test_crea_detectores_bajo_demanda_sin_precalentar():
+    pool = DetectorPool(size=2, factory=DetectorFalso, warm=False)
+    assert pool.stats() == {"libres": 0, "en_uso": 0, "capacidad": 2}
+    pool.acquire()
+    assert pool.stats()["en_uso"] == 1
+
+
+def test_descarta_detector_con_errores_consecutivos():
+    pool = DetectorPool(size=1, max_errors=2, factory=DetectorFalso)
+    detector = pool.acquire()
+    pool.release(detector, healthy=False)
+    assert pool.acquire() is detector
+    pool.release(detector, healthy=False)
+    assert detector.cerrado
+    reemplazo = pool.acquire()
+    assert reemplazo is not detector
+
+
+def test_un_exito_reinicia_los_errores():
+    pool = DetectorPool(size=1, max_errors=2, factory=DetectorFalso)
+    detector = pool.acquire()
+    pool.release(detector, healthy=False)
+    pool.release(pool.acquire())
+    pool.release(pool.acquire(), healthy=False)
+    assert not detector.cerrado
+
+
+def test_checkout_marca_no_sano_si_falla():
+    pool = DetectorPool(size=1, max_errors=1, factory=DetectorFalso)
+    with pytest.raises(RuntimeError):
+        with pool.checkout() as detector:
+            raise RuntimeError("falla")
+    assert detector.cerrado
+    assert pool.stats()["en_uso"] == 0
+
+
+def test_release_rechaza_detectores_ajenos():
+    pool = DetectorPool(size=1, factory=DetectorFalso)
+    with pytest.raises(ValueError):
+        pool.release(DetectorFalso())
+
+
+def test_evict_idle_conserva_min_idle():
+    pool = DetectorPool(size=3, min_idle=1, idle_timeout=0, factory=DetectorFalso)
+    libres = list(pool._libres)
+    assert pool.evict_idle() == 2
+    assert pool.stats()["libres"] == 1
+    # Se conserva el usado más recientemente
+    assert pool._libres[0].detector is libres[-1].detector
+    assert sum(entrada.detector.cerrado for entrada in libres) == 2
+
+
+def test_close_cierra_libres_y_en_uso_al_devolver():
+    pool = DetectorPool(size=2, factory=DetectorFalso)
+    en_uso = pool.acquire()
+    libre = pool._libres[0].detector
+    pool.close()
+    assert libre.cerrado and not en_uso.cerrado
+    pool.release(en_uso)
+    assert en_uso.cerrado
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_get_detector_pool_retira_el_menos_usado(monkeypatch):
+    monkeypatch.setattr(detector_module, "_pools", OrderedDict())
+    monkeypatch.setattr(detector_module, "create_detector", DetectorFalso)
+    monkeypatch.setattr(detector_module, "DETECTOR_POOL_MAX_CONFIGS", 2)
+
+    uno = detector_module.get_detector_pool(size=1, max_faces=1)
+    dos = detector_module.get_detector_pool(size=1, max_faces=2)
+    assert detector_module.get_detector_pool(max_faces=1) is uno
+    tres = detector_module.get_detector_pool(size=1, max_faces=3)
+
+    assert list(detector_module._pools) == [1, 3]
+    assert dos._retirado and not uno._retirado and not tres._retirado
+    assert dos.stats()["libres"] == 0
+    assert uno.acquire().max_faces == 1
+    assert detector_module.get_detector_pool(size=1, max_faces=2) is not dos
+
+
+def test_pool_retirado_sigue_atendiendo_a_quien_lo_tenia(monkeypatch):
+    monkeypatch.setattr(detector_module, "_pools", OrderedDict())
+    monkeypatch.setattr(detector_module, "create_detector", DetectorFalso)
+    monkeypatch.setattr(detector_module, "DETECTOR_POOL_MAX_CONFIGS", 1)
+
+    uno = detector_module.get_detector_pool(size=1, max_faces=1)
+    en_uso = uno.acquire()
+    detector_module.get_detector_pool(size=1, max_faces=2)
+    # Retirado con un detector en uso: se cierra recién al devolverlo
+    assert not en_uso.cerrado
+    uno.release(en_uso)
+    assert en_uso.cerrado
+
+    # Una sesión que guardó la referencia sigue pudiendo detectar
+    with uno.checkout(timeout=1) as detector:
+        assert detector.max_faces == 1 and not detector.cerrado
+    assert detector.cerrado and uno.stats()["libres"] == 0
+
+
+def test_precalentar_no_bloquea_otras_configuraciones(monkeypatch):
+    monkeypatch.setattr(detector_module, "_pools", OrderedDict())
+    liberar = threading.Event()
+    calentando = threading.Event()
+
+    class DetectorLento(DetectorFalso):
+        def warm_up(self):
+            if self.max_faces == 1:
+                calentando.set()
+                liberar.wait(5)
+
+    monkeypatch.setattr(detector_module, "create_detector", DetectorLento)
+    hilo = threading.Thread(target=detector_module.get_detector_pool,
+                            kwargs={"size": 1, "max_faces": 1})
+    hilo.start()
+    assert calentando.wait(5)
+    try:
+        otro = detector_module.get_detector_pool(size=1, max_faces=2)
+        assert otro.stats()["libres"] == 1
+    finally:
+        liberar.set()
+        hilo.join()
+    assert detector_module._pools[1].stats()["libres"] == 1
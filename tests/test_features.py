@@ -0,0 +1,76 @@
+"""
+Pruebas de las medidas geométricas sobre la cara de referencia (assets/rostro.jpg).
+"""
+import cv2
+import numpy as np
+import pytest
+
+from src.detector import create_detector
+from src.features import extract_features, head_pose
+from src.utils import sample_face
+
+
+@pytest.fixture(scope="module")
+def detector():
+    detector = create_detector()
+    yield detector
+    detector.close()
+
+
+@pytest.fixture(scope="module")
+def landmarks(detector):
+    _, landmarks, info = detector.detect(sample_face(), draw=False)
+    assert info["rostros_detectados"] == 1
+    return landmarks
+
+
+def _girar(puntos, grados):
+    """Rota los landmarks en el plano de la imagen alrededor de su centro."""
+    angulo = np.radians(grados)
+    rotacion = np.array([[np.cos(angulo), -np.sin(angulo)], [np.sin(angulo), np.cos(angulo)]])
+    centro = puntos[..., :2].mean(axis=1, keepdims=True)
+    girados = puntos.astype(np.float64)
+    girados[..., :2] = (puntos[..., :2] - centro) @ rotacion.T + centro
+    return girados
+
+
+def test_ojos_abiertos_y_boca_cerrada(landmarks):
+    medidas = extract_features(landmarks)
+    assert medidas["apertura_ojos"].shape == (1, 2)
+    assert ((medidas["apertura_ojos"] > 0.2) & (medidas["apertura_ojos"] < 0.45)).all()
+    assert medidas["apertura_boca"][0] < 0.3
+    # Los ojos se miden iguales con el tamaño de imagen y los normalizados
+    alto, ancho = sample_face().shape[:2]
+    normalizados = extract_features(landmarks, image_size=(ancho, alto))
+    np.testing.assert_allclose(normalizados["apertura_ojos"], medidas["apertura_ojos"],
+                               rtol=1e-4)
+
+
+def test_roll_sigue_una_rotacion_en_el_plano(landmarks):
+    puntos = landmarks["pixeles"]
+    base, _ = head_pose(puntos)
+    # En la imagen, y crece hacia abajo: girar los puntos en sentido horario baja el roll
+    for grados in (-30, 15):
+        girada, _ = head_pose(_girar(puntos, grados))
+        np.testing.assert_allclose(girada - base, [[0, 0, -grados]], atol=1e-6)
+
+
+def test_roll_de_una_imagen_girada(detector, landmarks):
+    imagen = sample_face()
+    alto, ancho = imagen.shape[:2]
+    matriz = cv2.getRotationMatrix2D((ancho / 2, alto / 2), 20, 1.0)
+    _, girados, info = detector.detect(cv2.warpAffine(imagen, matriz, (ancho, alto)),
+                                       draw=False)
+    assert info["rostros_detectados"] == 1
+    diferencia = head_pose(girados["pixeles"])[0] - head_pose(landmarks["pixeles"])[0]
+    assert abs(diferencia[0, 2] - 20) < 3
+    assert (np.abs(diferencia[0, :2]) < 3).all()
+
+
+def test_lote_vacio():
+    medidas = extract_features(np.zeros((0, 478, 3), dtype=np.float32))
+    assert medidas["apertura_ojos"].shape == (0, 2)
+    assert medidas["apertura_boca"].shape == (0,)
+    assert medidas["orientacion"].shape == (0, 3)
+    assert medidas["posicion_iris"].shape == (0, 2, 2)
+    assert medidas["distancia_interocular"].shape == (0,)
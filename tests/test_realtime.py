@@ -0,0 +1,49 @@
+"""
+Pruebas del worker de inferencia del modo cámara con un detector falso.
+"""
+import time
+
+import numpy as np
+
+from src.realtime import LatestFrameWorker
+
+
+class DetectorQueFalla:
+    """Falla en el primer cuadro y responde normalmente en los siguientes."""
+
+    def __init__(self):
+        self.llamadas = 0
+
+    def detect(self, image, draw=True, input_format="bgr"):
+        self.llamadas += 1
+        if self.llamadas == 1:
+            raise RuntimeError("falla")
+        return None, {"normalizados": np.zeros((0, 478, 3), dtype=np.float32)}, {}
+
+    def close(self):
+        pass
+
+
+def _esperar(condicion, limite=2.0):
+    fin = time.perf_counter() + limite
+    while not condicion() and time.perf_counter() < fin:
+        time.sleep(0.005)
+    return condicion()
+
+
+def test_un_cuadro_fallido_no_detiene_el_worker():
+    worker = LatestFrameWorker(detector=DetectorQueFalla())
+    cuadro = np.zeros((4, 4, 3), dtype=np.uint8)
+    try:
+        worker.submit(cuadro)
+        assert _esperar(lambda: worker.stats()["errores"] == 1)
+        assert worker.latest() is None
+
+        worker.submit(cuadro)
+        assert _esperar(lambda: worker.latest() is not None)
+        estadisticas = worker.stats()
+        assert estadisticas["cuadros_procesados"] == 1
+        assert estadisticas["errores"] == 1
+        assert "latencia_ms" in worker.latest()[1]
+    finally:
+        worker.close()
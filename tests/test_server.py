@@ -0,0 +1,118 @@
+"""
+Pruebas del servicio HTTP: cola acotada (429/413) y reparto de micro-lotes.
+"""
+import asyncio
+import base64
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import server
+from src.server import LandmarkServer, MicroBatcher, RequestTooLarge, ServerBusy
+
+
+@pytest.fixture
+def lotes(monkeypatch):
+    """Reemplaza al trabajador real: registra el tamaño de cada lote."""
+    tamanos = []
+    lock = threading.Lock()
+
+    def detectar(imagenes):
+        with lock:
+            tamanos.append(len(imagenes))
+        time.sleep(0.02)
+        return [{"error": "", "datos": datos} for datos in imagenes]
+
+    monkeypatch.setattr(server, "_detect_many", detectar)
+    return tamanos
+
+
+def test_lotes_se_reparten_entre_trabajadores_libres(lotes):
+    async def probar():
+        with ThreadPoolExecutor(4) as executor:
+            batcher = MicroBatcher(executor, max_batch=8, max_wait_ms=1, queue_size=16,
+                                   max_in_flight=4)
+            pedido = asyncio.create_task(batcher.submit([bytes([i]) for i in range(8)]))
+            await asyncio.sleep(0)
+            despachador = asyncio.create_task(batcher.run())
+            resultados = await pedido
+            despachador.cancel()
+            return resultados
+
+    resultados = asyncio.run(probar())
+    assert [r["datos"] for r in resultados] == [bytes([i]) for i in range(8)]
+    assert sum(lotes) == 8 and max(lotes) == 2
+
+
+def test_un_trabajador_recibe_el_lote_completo(lotes):
+    async def probar():
+        with ThreadPoolExecutor(1) as executor:
+            batcher = MicroBatcher(executor, max_batch=8, max_wait_ms=1, queue_size=16)
+            pedido = asyncio.create_task(batcher.submit([b"x"] * 6))
+            await asyncio.sleep(0)
+            despachador = asyncio.create_task(batcher.run())
+            await pedido
+            despachador.cancel()
+
+    asyncio.run(probar())
+    assert lotes == [6]
+
+
+def test_cola_llena_y_peticion_demasiado_grande():
+    async def probar():
+        batcher = MicroBatcher(None, queue_size=4)
+        with pytest.raises(RequestTooLarge):
+            await batcher.submit([b"x"] * 5)
+        # Sin despachador, la cola no se vacía
+        pendiente = asyncio.create_task(batcher.submit([b"x"] * 3))
+        await asyncio.sleep(0)
+        with pytest.raises(ServerBusy):
+            await batcher.submit([b"x"] * 2)
+        pendiente.cancel()
+
+    asyncio.run(probar())
+
+
+def _pedir(servidor, peticion):
+    """Envía una petición HTTP cruda y devuelve (status, encabezados)."""
+    async def probar():
+        socket = await asyncio.start_server(servidor._atender, "127.0.0.1", 0)
+        puerto = socket.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", puerto)
+        writer.write(peticion.encode())
+        respuesta = (await reader.read()).decode()
+        writer.close()
+        socket.close()
+        await socket.wait_closed()
+        linea, *encabezados = respuesta.split("\r\n\r\n")[0].split("\r\n")
+        return int(linea.split()[1]), encabezados
+
+    return asyncio.run(probar())
+
+
+def _pedir_bulk(servidor, imagenes):
+    """Envía un POST /v1/landmarks/bulk y devuelve (status, encabezados)."""
+    cuerpo = json.dumps({"imagenes": [base64.b64encode(i).decode() for i in imagenes]})
+    return _pedir(servidor, f"POST /v1/landmarks/bulk HTTP/1.1\r\nContent-Length: {len(cuerpo)}"
+                            "\r\nConnection: close\r\n\r\n" + cuerpo)
+
+
+def test_http_responde_413_y_429():
+    servidor = LandmarkServer(queue_size=4)
+    servidor.batcher = MicroBatcher(None, queue_size=4)
+    status, encabezados = _pedir_bulk(servidor, [b"x"] * 5)
+    assert status == 413 and "Retry-After: 1" not in encabezados
+
+    servidor.batcher._cola.put_nowait(None)
+    status, encabezados = _pedir_bulk(servidor, [b"x"] * 4)
+    assert status == 429 and "Retry-After: 1" in encabezados
+
+
+def test_content_length_negativo_responde_400():
+    servidor = LandmarkServer(queue_size=4)
+    status, _ = _pedir(servidor, "POST /v1/landmarks HTTP/1.1\r\nContent-Length: -5\r\n"
+                                 "Connection: close\r\n\r\n")
+    assert status == 400
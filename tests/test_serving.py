@@ -0,0 +1,91 @@
+"""
+Pruebas de SharedInferencePool ante trabajadores que mueren a mitad de un cuadro.
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+from src import serving
+from src.serving import FrameArena, SharedInferencePool
+
+
+def _trabajador_falso(nombre, slots, max_width, max_height, tareas, resultados, max_faces,
+                      listos):
+    """Como _worker_loop, sin detector: un cuadro blanco tira el proceso."""
+    arena = FrameArena(slots, max_width, max_height, name=nombre)
+    listos.release()
+    while True:
+        tarea = tareas.get()
+        if tarea is None:
+            return
+        numero, ranura, alto, ancho = tarea
+        if arena.view(ranura, alto, ancho).min() == 255:
+            os._exit(3)
+        resultado = (np.empty((0, 478, 3), np.float32), np.empty(0, np.float32))
+        resultados.put((numero, ranura, resultado, 1.0, None))
+
+
+def _esperar(condicion, limite=20.0):
+    fin = time.monotonic() + limite
+    while not condicion():
+        if time.monotonic() > fin:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(serving, "_worker_loop", _trabajador_falso)
+    pool = SharedInferencePool(workers=1, slots=3, max_width=8, max_height=8,
+                               watch_interval=0.05)
+    assert pool.wait_ready(timeout=60)
+    yield pool
+    pool.close()
+
+
+def test_trabajador_caido_libera_su_ranura_y_se_reemplaza(pool):
+    sesion = pool.session(smoothing=False, gate=False)
+    pid = pool.worker_pids[0]
+
+    sesion.submit(np.full((8, 8, 3), 255, np.uint8))
+    assert _esperar(lambda: sesion.errores == 1)
+    estado = pool.stats()
+    assert estado["reinicios"] == 1
+    assert estado["ranuras_libres"] == 3 and estado["ranuras_en_curso"] == 0
+    assert pool.worker_pids[0] != pid
+
+    # El reemplazo atiende los cuadros siguientes
+    sesion.submit(np.zeros((8, 8, 3), np.uint8))
+    assert _esperar(lambda: sesion.latest() is not None)
+    assert sesion.latest()[1]["rostros_detectados"] == 0
+    assert pool.stats()["trabajadores"] == 1
+
+
+def test_trabajador_caido_sin_cuadro_tambien_se_reemplaza(pool):
+    pool._procesos[0].kill()
+    assert _esperar(lambda: pool.stats()["reinicios"] == 1)
+    sesion = pool.session(smoothing=False, gate=False)
+    sesion.submit(np.zeros((8, 8, 3), np.uint8))
+    assert _esperar(lambda: sesion.latest() is not None)
+    assert sesion.errores == 0
+
+
+def _trabajador_roto(*argumentos):
+    """No llega a cargar el detector."""
+    os._exit(1)
+
+
+def test_trabajador_que_no_arranca_deja_de_reemplazarse(monkeypatch):
+    monkeypatch.setattr(serving, "_worker_loop", _trabajador_roto)
+    pool = SharedInferencePool(workers=1, slots=2, max_width=8, max_height=8,
+                               watch_interval=0.05, max_restarts=2)
+    try:
+        assert _esperar(lambda: pool.stats()["reinicios"] == 2
+                        and pool.stats()["trabajadores"] == 0)
+        time.sleep(0.5)
+        assert pool.stats()["reinicios"] == 2
+    finally:
+        pool.close()
@@ -0,0 +1,134 @@
+"""
+Pruebas del almacén binario de landmarks: codificación, reanudación y formato.
+"""
+import numpy as np
+import pytest
+
+from src.batch import _shard_arrays
+from src.store import (
+    LandmarkStoreReader, LandmarkStoreWriter, _HEADER_DTYPE, export_batch_npz, export_results
+)
+
+
+def _normalizados(rostros, semilla=0):
+    return np.random.default_rng(semilla).random((rostros, 478, 3), dtype=np.float32)
+
+
+def _landmarks(rostros, ancho=200, alto=100, semilla=0):
+    normalizados = _normalizados(rostros, semilla)
+    pixeles = normalizados * np.array([ancho, alto, ancho], dtype=np.float32)
+    return {
+        "normalizados": normalizados,
+        "pixeles": pixeles,
+        "cajas": np.concatenate((pixeles[..., :2].min(1), pixeles[..., :2].max(1)), axis=1),
+        "puntajes": np.linspace(0.5, 0.9, rostros).astype(np.float32),
+    }
+
+
+@pytest.mark.parametrize("encoding, tolerancia", [
+    ("float32", 0.0), ("float16", 5e-4), ("int16", 0.5 / 16384),
+])
+def test_ida_y_vuelta_por_codificacion(tmp_path, encoding, tolerancia):
+    ruta = str(tmp_path / "caras.flms")
+    normalizados = _normalizados(3)
+    with LandmarkStoreWriter(ruta, encoding=encoding) as escritor:
+        escritor.append(normalizados, {"deteccion_exitosa": True}, 200, 100, "a.jpg")
+
+    lector = LandmarkStoreReader(ruta)
+    assert lector.encoding == encoding and len(lector) == 3
+    np.testing.assert_allclose(lector.landmarks(), normalizados, atol=tolerancia)
+    np.testing.assert_allclose(lector.landmarks_px()[..., 0], normalizados[..., 0] * 200,
+                               atol=tolerancia * 200)
+    assert list(lector.records["rostro"]) == [0, 1, 2]
+    assert lector.names == ["a.jpg"]
+    lector.close()
+
+
+def test_imagen_sin_rostros_ocupa_un_registro(tmp_path):
+    ruta = str(tmp_path / "caras.flms")
+    with LandmarkStoreWriter(ruta) as escritor:
+        escritor.append(_normalizados(2), {}, 10, 10, "dos")
+        assert escritor.append(np.empty((0, 478, 3)), {"deteccion_exitosa": False},
+                               10, 10, "ninguna") == 1
+        escritor.append(_normalizados(1), {}, 10, 10, "una")
+
+    lector = LandmarkStoreReader(ruta)
+    assert list(lector.faces()) == [True, True, False, True]
+    assert lector.image_records(1) == slice(2, 3)
+    assert lector.image_records(2) == slice(3, 4)
+    assert np.isnan(lector.scores(2))
+    lector.close()
+
+
+def test_cajas_y_puntajes_se_conservan(tmp_path):
+    ruta = str(tmp_path / "caras.flms")
+    landmarks = _landmarks(2)
+    export_results([("a.jpg", landmarks, {"deteccion_exitosa": True}, 200, 100)], ruta)
+
+    lector = LandmarkStoreReader(ruta)
+    np.testing.assert_allclose(lector.boxes(), landmarks["cajas"], rtol=1e-6)
+    np.testing.assert_allclose(lector.scores(), landmarks["puntajes"])
+    lector.close()
+
+
+def test_sin_cajas_se_calculan_de_los_landmarks(tmp_path):
+    ruta = str(tmp_path / "caras.flms")
+    landmarks = _landmarks(1)
+    with LandmarkStoreWriter(ruta) as escritor:
+        escritor.append(landmarks["normalizados"], {}, 200, 100)
+
+    lector = LandmarkStoreReader(ruta)
+    np.testing.assert_allclose(lector.boxes(), landmarks["cajas"], rtol=1e-5)
+    assert np.isnan(lector.scores()).all()
+    lector.close()
+
+
+def test_reanuda_al_final_y_descarta_registro_incompleto(tmp_path):
+    ruta = str(tmp_path / "caras.flms")
+    with LandmarkStoreWriter(ruta) as escritor:
+        escritor.append(_normalizados(1), {}, 10, 10, "a")
+        escritor.append(_normalizados(1), {}, 10, 10, "b")
+    # Corte a mitad de un registro
+    with open(ruta, "ab") as archivo:
+        archivo.write(b"\1" * 100)
+
+    with LandmarkStoreWriter(ruta) as escritor:
+        assert escritor.registros == 2
+        assert escritor.append(_normalizados(1, semilla=7), {}, 10, 10, "c") == 2
+
+    lector = LandmarkStoreReader(ruta)
+    assert len(lector) == 3 and lector.names == ["a", "b", "c"]
+    np.testing.assert_array_equal(lector.landmarks(2), _normalizados(1, semilla=7)[0])
+    lector.close()
+
+
+def test_version_desconocida_se_rechaza(tmp_path):
+    ruta = tmp_path / "otro.flms"
+    cabecera = np.zeros(1, dtype=_HEADER_DTYPE)
+    cabecera["magic"], cabecera["version"] = b"FLMS", 99
+    ruta.write_bytes(cabecera.tobytes())
+    with pytest.raises(ValueError):
+        LandmarkStoreReader(str(ruta))
+
+
+def test_exporta_fragmentos_de_batch_con_cajas_y_puntajes(tmp_path):
+    resultados = [
+        {"ruta": "a.jpg", "ancho": 200, "alto": 100, "error": "",
+         "info": {"deteccion_exitosa": True}, "landmarks": _landmarks(2)},
+        {"ruta": "b.jpg", "ancho": 200, "alto": 100, "error": "no se pudo leer",
+         "info": None, "landmarks": None},
+        {"ruta": "c.jpg", "ancho": 200, "alto": 100, "error": "",
+         "info": {"deteccion_exitosa": True}, "landmarks": _landmarks(1, semilla=5)},
+    ]
+    fragmento = str(tmp_path / "parte.npz")
+    np.savez(fragmento, **_shard_arrays(resultados))
+    ruta = str(tmp_path / "caras.flms")
+    assert export_batch_npz(fragmento, ruta) == 3
+
+    lector = LandmarkStoreReader(ruta)
+    assert list(lector.faces()) == [True, True, False, True]
+    cajas = np.concatenate([resultados[0]["landmarks"]["cajas"],
+                            resultados[2]["landmarks"]["cajas"]])
+    np.testing.assert_allclose(lector.boxes(lector.faces()), cajas, rtol=1e-6)
+    np.testing.assert_allclose(lector.scores([0, 1, 3]), [0.5, 0.9, 0.5])
+    lector.close()